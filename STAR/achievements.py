@@ -3,15 +3,19 @@ StarChan Bot Achievements System
 Handles achievement definitions, tracking, and persistent storage.
 """
 
-import json
 import logging
 import time
 import os
 import shutil
 import datetime
+import threading
+from bisect import bisect_right
 import discord
-from typing import Dict, Any, List, Optional, Set
-from dataclasses import dataclass, asdict
+from typing import Dict, Any, List, Optional, Set, Tuple, Callable
+from dataclasses import dataclass
+from persistence import io_service, atomic_write_json
+from ranked_index import RankedIndex
+import json_codec
 
 # Set up module logger
 logger = logging.getLogger('StarChan.Achievements')
@@ -33,30 +37,63 @@ class Achievement:
         if self.requirements is None:
             self.requirements = {}
 
-@dataclass
 class UserAchievement:
-    """Represents a user's achievement progress."""
-    achievement_id: str
-    user_id: int
-    unlocked: bool = False
-    progress: Dict[str, Any] = None
-    unlock_date: Optional[str] = None
+    """Represents a user's achievement progress.
     
-    def __post_init__(self):
-        if self.progress is None:
-            self.progress = {}
+    Only unlocked achievements are stored; "not started" is implicit. progress is the
+    user's shared counter map, so every achievement of a user sees the same stats.
+    """
+    __slots__ = ("achievement_id", "user_id", "unlocked", "progress", "unlock_date")
+    
+    def __init__(self, achievement_id: str, user_id: int, unlocked: bool = False,
+                 progress: Optional[Dict[str, Any]] = None, unlock_date: Optional[str] = None):
+        self.achievement_id = achievement_id
+        self.user_id = user_id
+        self.unlocked = unlocked
+        self.progress = progress if progress is not None else {}
+        self.unlock_date = unlock_date
+    
+    def __repr__(self):
+        return (f"UserAchievement(achievement_id={self.achievement_id!r}, user_id={self.user_id!r}, "
+                f"unlocked={self.unlocked!r}, unlock_date={self.unlock_date!r})")
 
 class AchievementSystem:
     """Main achievements system class."""
     
+    # Compact the journal into a fresh snapshot once it grows past this many bytes
+    JOURNAL_COMPACT_BYTES = 1024 * 1024
+    PROGRESS_SAVE_INTERVAL = 30  # Seconds between progress flushes
+    # Short category names accepted by the leaderboard
+    CATEGORY_ALIASES = {"message": "messaging", "command": "commands", "milestone": "milestones",
+                        "level": "leveling", "game": "gaming"}
+    
     def __init__(self, data_file: str = "achievements_data.txt"):
         self.data_file = data_file
+        # Append-only log of per-(user, achievement) changes since the last snapshot
+        self.journal_file = f"{data_file}.journal"
         self.achievements: Dict[str, Achievement] = {}
-        self.user_data: Dict[int, Dict[str, UserAchievement]] = {}
-        self._progress_updated = False  # Flag to track if progress needs saving
+        self.user_data: Dict[int, Dict[str, UserAchievement]] = {}  # Unlocked achievements only
+        self.user_counters: Dict[int, Dict[str, Any]] = {}  # One shared progress map per user
+        # The in-memory data is authoritative; the files are only written, never re-read at runtime.
+        self.generation = 0  # Bumped on every in-memory change
+        self._unlocked: Set[Tuple[int, str]] = set()  # (user_id, achievement_id) pairs already unlocked
+        self._unlock_lock = threading.Lock()
+        self._dirty: Set[int] = set()  # Users whose counters changed since they were last journaled
+        self._pending_unlocks: Set[Tuple[int, str]] = set()  # Unlocks whose journal write failed
+        self._needs_compaction = False  # Set when a change can't be expressed as journal records
+        self._journal_bytes = 0
         self._last_progress_save = time.time()  # Timestamp of last progress save
+        self.scheduled_saves = False  # True once a scheduler job flushes progress; checks then never save inline
+        # Materialized leaderboard aggregates, rebuilt after loading and updated on every unlock
+        self._aggregates_ready = False
+        self._unlocked_ranking = RankedIndex()  # str(user_id) -> unlocked count
+        self._category_rankings: Dict[str, RankedIndex] = {}  # category -> str(user_id) -> unlocked in it
+        self._achievement_points: Dict[int, int] = {}  # user_id -> reward points of unlocked achievements
+        self._category_totals: Dict[str, int] = {}
         self._initialize_achievements()
         self._load_user_data()
+        self._replay_journal()
+        self._rebuild_unlock_index()
     
     def _initialize_achievements(self):
         """Initialize all available achievements."""
@@ -926,46 +963,67 @@ class AchievementSystem:
             reward_points=100,
             requirements={"long_message": True}
         )
+        
+        self._build_requirement_index()
+    
+    def _build_requirement_index(self):
+        """Index achievements by the stat keys their requirements depend on.
+        
+        Numeric requirements are kept sorted by threshold per stat key so an update only
+        has to look at the user's next unmet threshold; boolean requirements are listed per key.
+        """
+        numeric: Dict[str, List[Tuple[float, str]]] = {}
+        boolean: Dict[str, List[str]] = {}
+        for achievement in self.achievements.values():
+            for req_key, req_value in achievement.requirements.items():
+                if isinstance(req_value, bool):
+                    boolean.setdefault(req_key, []).append(achievement.id)
+                elif isinstance(req_value, (int, float)):
+                    numeric.setdefault(req_key, []).append((req_value, achievement.id))
+        
+        # stat key -> (sorted thresholds, achievement ids in the same order)
+        self._threshold_index: Dict[str, Tuple[List[float], List[str]]] = {}
+        for req_key, entries in numeric.items():
+            entries.sort()
+            self._threshold_index[req_key] = ([value for value, _ in entries], [aid for _, aid in entries])
+        self._boolean_index: Dict[str, List[str]] = boolean
+        # (user_id, stat key) -> position of the user's first not-yet-unlocked threshold
+        self._threshold_cursors: Dict[Tuple[int, str], int] = {}
     
     def _load_user_data(self):
         """Load user achievement data from file with integrity verification."""
         try:
-            with open(self.data_file, 'r') as f:
-                data = json.load(f)
+            data = json_codec.load_file(self.data_file)
                 
             # Verify data integrity
             if not isinstance(data, dict):
                 raise ValueError("Invalid data format: root is not a dictionary")
+            
+            if data.get("version") == 2:
+                users = data.get("users", {})
+            else:
+                # Legacy format: {user_id: {achievement_id: {achievement_id, user_id, unlocked, progress, unlock_date}}}
+                users = self._convert_legacy_user_data(data)
                 
             loaded_users = 0
-            for user_id_str, achievements_data in data.items():
+            for user_id_str, user_entry in users.items():
                 try:
                     user_id = int(user_id_str)
-                    self.user_data[user_id] = {}
                     
-                    if not isinstance(achievements_data, dict):
+                    if not isinstance(user_entry, dict):
                         logger.warning(f"Invalid achievement data for user {user_id}")
                         continue
                     
-                    for achievement_id, achievement_data in achievements_data.items():
+                    counters = user_entry.get("counters", {})
+                    if counters:
+                        self.user_counters[user_id] = counters
+                    
+                    for achievement_id, unlock_date in user_entry.get("unlocked", {}).items():
                         # Verify achievement exists in system
                         if achievement_id not in self.achievements:
                             logger.warning(f"Unknown achievement {achievement_id} for user {user_id}")
                             continue
-                            
-                        # Verify required fields
-                        required_fields = ["achievement_id", "user_id", "unlocked", "progress"]
-                        if not all(field in achievement_data for field in required_fields):
-                            logger.warning(f"Missing fields in achievement {achievement_id} for user {user_id}")
-                            continue
-                            
-                        self.user_data[user_id][achievement_id] = UserAchievement(
-                            achievement_id=achievement_data["achievement_id"],
-                            user_id=achievement_data["user_id"],
-                            unlocked=achievement_data["unlocked"],
-                            progress=achievement_data["progress"],
-                            unlock_date=achievement_data.get("unlock_date")
-                        )
+                        self._store_unlock(user_id, achievement_id, unlock_date)
                     
                     loaded_users += 1
                     
@@ -973,7 +1031,7 @@ class AchievementSystem:
                     logger.error(f"Error loading data for user {user_id_str}: {user_error}")
                     continue
                     
-            logger.debug(f"Loaded achievement data for {loaded_users} users ({len(data)} total entries)")
+            logger.debug(f"Loaded achievement data for {loaded_users} users ({len(users)} total entries)")
             
             # Verification: Check for any corrupted unlock states
             corrupted_count = 0
@@ -986,9 +1044,10 @@ class AchievementSystem:
             if corrupted_count > 0:
                 logger.warning(f"Found {corrupted_count} corrupted achievement entries")
             
-        except (FileNotFoundError, json.JSONDecodeError) as e:
+        except (FileNotFoundError, json_codec.JSONDecodeError) as e:
             logger.warning(f"Could not load achievement data: {e}. Starting fresh.")
             self.user_data = {}
+            self.user_counters = {}
             
         except Exception as e:
             logger.error(f"Unexpected error loading achievement data: {e}")
@@ -997,8 +1056,7 @@ class AchievementSystem:
                 backup_file = f"{self.data_file}.backup"
                 if os.path.exists(backup_file):
                     logger.info("Attempting to load from backup file")
-                    with open(backup_file, 'r') as f:
-                        data = json.load(f)
+                    data = json_codec.load_file(backup_file)
                     # Recursive call with backup data
                     self.data_file = backup_file
                     self._load_user_data()
@@ -1006,20 +1064,180 @@ class AchievementSystem:
                 else:
                     logger.error("No backup file available, starting fresh")
                     self.user_data = {}
+                    self.user_counters = {}
             except Exception as backup_error:
                 logger.error(f"Failed to load from backup: {backup_error}")
                 self.user_data = {}
+                self.user_counters = {}
+    
+    def _convert_legacy_user_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Fold the old per-achievement records into one counter map and unlock map per user."""
+        users = {}
+        for user_id_str, achievements_data in data.items():
+            if not isinstance(achievements_data, dict):
+                continue
+            counters: Dict[str, Any] = {}
+            unlocked: Dict[str, Optional[str]] = {}
+            for achievement_id, achievement_data in achievements_data.items():
+                if not isinstance(achievement_data, dict):
+                    continue
+                for key, value in (achievement_data.get("progress") or {}).items():
+                    # The same stat was copied into several achievements; keep the highest count
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        if value > counters.get(key, 0):
+                            counters[key] = value
+                if achievement_data.get("unlocked"):
+                    unlocked[achievement_id] = achievement_data.get("unlock_date")
+            users[user_id_str] = {"counters": counters, "unlocked": unlocked}
+        self._needs_compaction = True  # Rewrite in the compact format on the next save
+        return users
+    
+    def _store_unlock(self, user_id: int, achievement_id: str, unlock_date: Optional[str]) -> UserAchievement:
+        """Store an unlocked achievement record for a user."""
+        user_achievement = UserAchievement(
+            achievement_id=achievement_id,
+            user_id=user_id,
+            unlocked=True,
+            progress=self.get_user_counters(user_id),
+            unlock_date=unlock_date
+        )
+        user_achievements = self.user_data.setdefault(user_id, {})
+        is_new = achievement_id not in user_achievements
+        user_achievements[achievement_id] = user_achievement
+        if is_new and self._aggregates_ready:
+            self._count_unlock(user_id, self.achievements[achievement_id])
+        return user_achievement
+    
+    def _count_unlock(self, user_id: int, achievement: Achievement):
+        """Add one unlock to the leaderboard aggregates."""
+        key = str(user_id)
+        self._unlocked_ranking.increment(key, 1)
+        self._category_rankings[achievement.category].increment(key, 1)
+        self._achievement_points[user_id] = self._achievement_points.get(user_id, 0) + achievement.reward_points
+    
+    def _rebuild_aggregates(self):
+        """Recompute every leaderboard aggregate from user_data (after loading or bulk removals)."""
+        self._category_totals = {}
+        for achievement in self.achievements.values():
+            self._category_totals[achievement.category] = self._category_totals.get(achievement.category, 0) + 1
+        
+        unlocked: Dict[str, int] = {}
+        categories: Dict[str, Dict[str, int]] = {category: {} for category in self._category_totals}
+        self._achievement_points = {}
+        for user_id, user_achievements in self.user_data.items():
+            key = str(user_id)
+            for achievement_id, user_achievement in user_achievements.items():
+                achievement = self.achievements.get(achievement_id)
+                if achievement is None or not user_achievement.unlocked:
+                    continue
+                unlocked[key] = unlocked.get(key, 0) + 1
+                counts = categories[achievement.category]
+                counts[key] = counts.get(key, 0) + 1
+                self._achievement_points[user_id] = self._achievement_points.get(user_id, 0) + achievement.reward_points
+        
+        self._unlocked_ranking.load(unlocked.items())
+        self._category_rankings = {category: RankedIndex(counts) for category, counts in categories.items()}
+        self._aggregates_ready = True
+    
+    def _replay_journal(self):
+        """Apply journal records written after the last snapshot."""
+        if not os.path.exists(self.journal_file):
+            return
+        
+        applied = 0
+        try:
+            with open(self.journal_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json_codec.loads(line)
+                    except json_codec.JSONDecodeError:
+                        # A torn final line from a crash mid-append; everything before it is intact
+                        logger.warning(f"Skipping corrupted journal record in {self.journal_file}")
+                        continue
+                    
+                    user_id = int(record["u"])
+                    if "c" in record:
+                        counters = self.get_user_counters(user_id)
+                        counters.clear()
+                        counters.update(record["c"])
+                    if "p" in record:
+                        # Per-achievement progress records written before counters were shared
+                        self.get_user_counters(user_id).update(record["p"])
+                    achievement_id = record.get("a")
+                    if achievement_id in self.achievements and record.get("x", True):
+                        self._store_unlock(user_id, achievement_id, record.get("d"))
+                    applied += 1
+            self._journal_bytes = os.path.getsize(self.journal_file)
+            logger.debug(f"Replayed {applied} achievement journal records")
+        except Exception as e:
+            logger.error(f"Error replaying achievement journal: {e}")
+    
+    def _counters_record(self, user_id: int) -> Dict[str, Any]:
+        """Full counter map of one user; replaying it is idempotent."""
+        return {"u": user_id, "c": dict(self.user_counters.get(user_id, {}))}
+    
+    def _unlock_record(self, user_id: int, achievement_id: str) -> Dict[str, Any]:
+        """One unlocked achievement; replaying it is idempotent."""
+        return {"u": user_id, "a": achievement_id, "d": self.user_data[user_id][achievement_id].unlock_date}
+    
+    def _append_journal(self, records: List[Dict[str, Any]], sync: bool = False,
+                        on_error: Optional[Callable[[Exception], None]] = None) -> bool:
+        """Queue records for the journal. Cost is proportional to the records, not the user base.
+        
+        Records must not share mutable state with the live data; they are serialized on the
+        I/O thread, and on_error runs on the loop if the append fails.
+        """
+        if not records:
+            return True
+        io_service.submit("achievement_journal", self._write_journal, records, sync, on_error=on_error)
+        return True
+    
+    def _write_journal(self, records: List[Dict[str, Any]], sync: bool) -> None:
+        """Append records to the journal file (I/O thread)."""
+        with open(self.journal_file, 'a', encoding='utf-8') as f:
+            f.write("".join(json_codec.dumps(record) + "\n" for record in records))
+            f.flush()
+            if sync:
+                os.fsync(f.fileno())
+            self._journal_bytes = f.tell()
     
     def _save_user_data(self):
-        """Save user achievement data to file with backup mechanism."""
+        """Snapshot everything on the loop; the I/O thread writes it and truncates the journal it supersedes."""
         try:
-            # Convert to serializable format
-            data = {}
-            for user_id, achievements in self.user_data.items():
-                data[str(user_id)] = {}
-                for achievement_id, user_achievement in achievements.items():
-                    data[str(user_id)][achievement_id] = asdict(user_achievement)
+            # Convert to serializable format; users with nothing started are left out
+            start = time.perf_counter()
+            users = {}
+            for user_id in set(self.user_data) | set(self.user_counters):
+                counters = self.user_counters.get(user_id)
+                unlocked = {
+                    achievement_id: user_achievement.unlock_date
+                    for achievement_id, user_achievement in self.user_data.get(user_id, {}).items()
+                }
+                if counters or unlocked:
+                    users[str(user_id)] = {"counters": dict(counters or {}), "unlocked": unlocked}
+            data = {"version": 2, "users": users}
+            io_service.note_snapshot(time.perf_counter() - start)
+            
+            self._dirty.clear()
+            self._pending_unlocks.clear()
+            self._needs_compaction = False
             
+            def retry_compaction(error):
+                self._needs_compaction = True
+            
+            io_service.submit("achievement_snapshot", self._write_snapshot, data, on_error=retry_compaction)
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error saving achievement data: {e}")
+            return False
+    
+    def _write_snapshot(self, data: Dict[str, Any]) -> None:
+        """Write a compaction snapshot and truncate the journal (I/O thread)."""
+        try:
             # Create backup of existing file first
             if os.path.exists(self.data_file):
                 backup_file = f"{self.data_file}.backup"
@@ -1029,16 +1247,18 @@ class AchievementSystem:
                 except Exception as backup_error:
                     logger.warning(f"Failed to create backup: {backup_error}")
             
-            # Write to temporary file first, then rename (atomic operation)
-            temp_file = f"{self.data_file}.tmp"
-            with open(temp_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            # Temp file, fsync, atomic rename, fsync of the directory: the snapshot is
+            # durable before the journal it supersedes is truncated
+            atomic_write_json(self.data_file, data)
             
-            # Atomic rename
-            os.replace(temp_file, self.data_file)
+            # Everything in the journal is now in the snapshot. Appends queued after this
+            # snapshot run after the truncate (one I/O thread), and a crash before it is
+            # harmless: replaying full-state records over the new snapshot is idempotent.
+            with open(self.journal_file, 'w', encoding='utf-8'):
+                pass
+            self._journal_bytes = 0
                 
-            logger.debug("Achievement data saved successfully")
-            return True
+            logger.debug("Achievement snapshot saved and journal compacted")
             
         except Exception as e:
             logger.error(f"Error saving achievement data: {e}")
@@ -1050,17 +1270,97 @@ class AchievementSystem:
                     logger.info("Restored from backup after save failure")
             except Exception as restore_error:
                 logger.error(f"Failed to restore from backup: {restore_error}")
-            return False
+            raise
+    
+    def _rebuild_unlock_index(self):
+        """Rebuild the in-process unlock set from user_data (after loading or bulk removals)."""
+        self._threshold_cursors.clear()
+        with self._unlock_lock:
+            self._unlocked = {
+                (user_id, achievement_id)
+                for user_id, user_achievements in self.user_data.items()
+                for achievement_id, user_achievement in user_achievements.items()
+                if user_achievement.unlocked
+            }
+            self._rebuild_aggregates()
+    
+    def mark_progress_updated(self, user_id: Optional[int] = None):
+        """Record that a user's counters changed and still have to be written to disk.
+        
+        Without a user_id the next save falls back to a full snapshot.
+        """
+        self.generation += 1
+        if user_id is not None:
+            self._dirty.add(user_id)
+        else:
+            self._needs_compaction = True
+    
+    @property
+    def _progress_updated(self) -> bool:
+        """True while there are in-memory changes that haven't been written yet."""
+        return bool(self._dirty) or bool(self._pending_unlocks) or self._needs_compaction
+    
+    @_progress_updated.setter
+    def _progress_updated(self, value: bool):
+        if value:
+            self.mark_progress_updated()
+        else:
+            self._dirty.clear()
+            self._pending_unlocks.clear()
+            self._needs_compaction = False
+    
+    def is_unlocked(self, user_id: int, achievement_id: str) -> bool:
+        """O(1) unlock check against the in-process unlock set."""
+        return (user_id, achievement_id) in self._unlocked
+    
+    def _compare_and_set_unlock(self, user_id: int, achievement_id: str) -> Optional[str]:
+        """Atomically flip an achievement from locked to unlocked.
+        
+        Returns the unlock timestamp if this call performed the unlock, None if it was already unlocked.
+        """
+        key = (user_id, achievement_id)
+        with self._unlock_lock:
+            if key in self._unlocked:
+                return None
+            self._unlocked.add(key)
+            unlock_timestamp = datetime.datetime.now().isoformat()
+            self._store_unlock(user_id, achievement_id, unlock_timestamp)
+            self.generation += 1
+            return unlock_timestamp
     
     def _save_progress_updates(self):
         """Save progress updates if any have been made."""
+        if not self._progress_updated:
+            return
+        
+        if self._needs_compaction or self._journal_bytes >= self.JOURNAL_COMPACT_BYTES:
+            saved = self._save_user_data()
+        else:
+            users, self._dirty = self._dirty, set()
+            unlocks, self._pending_unlocks = self._pending_unlocks, set()
+            records = [self._counters_record(user_id) for user_id in users]
+            records.extend(
+                self._unlock_record(user_id, achievement_id)
+                for user_id, achievement_id in unlocks
+                if achievement_id in self.user_data.get(user_id, {})
+            )
+            
+            def requeue(error):
+                self._dirty |= users
+                self._pending_unlocks |= unlocks
+            
+            saved = self._append_journal(records, on_error=requeue)
+        
+        if saved:
+            self._last_progress_save = time.time()
+            logger.debug("Progress updates saved successfully")
+        else:
+            logger.warning("Failed to save progress updates")
+    
+    def flush_progress(self) -> None:
+        """Save pending progress if there is any (scheduled job, off the command path)."""
         if self._progress_updated:
-            if self._save_user_data():
-                self._progress_updated = False
-                self._last_progress_save = time.time()
-                logger.debug("Progress updates saved successfully")
-            else:
-                logger.warning("Failed to save progress updates")
+            self._save_progress_updates()
     
     def force_save_progress(self):
         """Force save any pending progress updates."""
@@ -1068,23 +1368,31 @@ class AchievementSystem:
             self._save_progress_updates()
             logger.info("Forced save of progress updates completed")
     
+    def get_user_counters(self, user_id: int) -> Dict[str, Any]:
+        """Get the user's shared progress counters (messages, reactions_added, ...)."""
+        counters = self.user_counters.get(user_id)
+        if counters is None:
+            counters = self.user_counters[user_id] = {}
+        return counters
+    
     def get_user_achievements(self, user_id: int) -> Dict[str, UserAchievement]:
-        """Get all achievements for a user."""
-        if user_id not in self.user_data:
-            self.user_data[user_id] = {}
-        return self.user_data[user_id]
+        """Get all unlocked achievements for a user."""
+        return self.user_data.get(user_id, {})
     
     def get_user_achievement(self, user_id: int, achievement_id: str) -> UserAchievement:
-        """Get specific achievement for a user."""
-        user_achievements = self.get_user_achievements(user_id)
-        
-        if achievement_id not in user_achievements:
-            user_achievements[achievement_id] = UserAchievement(
+        """Get specific achievement for a user.
+        
+        Achievements that aren't unlocked get a lightweight record that isn't stored;
+        its progress is still the user's shared counter map, so updates to it persist.
+        """
+        user_achievement = self.user_data.get(user_id, {}).get(achievement_id)
+        if user_achievement is None:
+            user_achievement = UserAchievement(
                 achievement_id=achievement_id,
-                user_id=user_id
+                user_id=user_id,
+                progress=self.get_user_counters(user_id)
             )
-        
-        return user_achievements[achievement_id]
+        return user_achievement
     
     def check_achievement(self, user_id: int, achievement_id: str, current_stats: Dict[str, Any]) -> bool:
         """Check if user has unlocked an achievement with fail-safe duplicate prevention."""
@@ -1093,52 +1401,104 @@ class AchievementSystem:
             return False
         
         achievement = self.achievements[achievement_id]
-        user_achievement = self.get_user_achievement(user_id, achievement_id)
         
-        # CRITICAL: Skip if already unlocked (primary duplicate prevention)
-        if user_achievement.unlocked:
+        # CRITICAL: Skip if already unlocked (duplicate prevention via the in-process unlock set)
+        if self.is_unlocked(user_id, achievement_id):
             logger.debug(f"Achievement {achievement_id} already unlocked for user {user_id}")
             return False
         
-        # FAIL-SAFE: Double-check unlock status by re-loading from file
-        try:
-            self._load_user_data()  # Refresh from file
-            user_achievement = self.get_user_achievement(user_id, achievement_id)
-            if user_achievement.unlocked:
-                logger.warning(f"FAIL-SAFE: Achievement {achievement_id} already unlocked for user {user_id} (detected after reload)")
-                return False
-        except Exception as e:
-            logger.error(f"Error during fail-safe check for achievement {achievement_id}: {e}")
+        if self._requirements_met(achievement, current_stats):
+            return self.unlock_achievement(user_id, achievement_id)
         
-        # Check requirements
-        requirements_met = True
+        # Update the user's shared progress counters and mark them for saving
+        self._update_counters(user_id, current_stats)
+        
+        # Without the scheduler job, save progress periodically (every 30 seconds) to avoid too frequent I/O
+        if not self.scheduled_saves and time.time() - self._last_progress_save > self.PROGRESS_SAVE_INTERVAL:
+            self._save_progress_updates()
+        
+        return False
+    
+    def _update_counters(self, user_id: int, stats: Dict[str, Any]):
+        """Copy numeric stats into the user's shared counter map, marking it dirty if anything changed."""
+        counters = self.get_user_counters(user_id)
+        changed = False
+        for stat_key, value in stats.items():
+            # Boolean stats are per-event flags (early_message, long_message, ...), not counters
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            if counters.get(stat_key) != value:
+                counters[stat_key] = value
+                changed = True
+        if changed:
+            self.mark_progress_updated(user_id)
+    
+    @staticmethod
+    def _requirements_met(achievement: Achievement, current_stats: Dict[str, Any]) -> bool:
+        """True if every requirement of the achievement is satisfied by the stats."""
         for req_key, req_value in achievement.requirements.items():
             if req_key not in current_stats:
-                requirements_met = False
-                break
+                return False
             
             if isinstance(req_value, bool):
                 if not current_stats[req_key]:
-                    requirements_met = False
-                    break
+                    return False
             elif isinstance(req_value, (int, float)):
                 if current_stats[req_key] < req_value:
-                    requirements_met = False
-                    break
+                    return False
+        return True
+    
+    def evaluate_stats(self, user_id: int, stats: Dict[str, Any], scope: Optional[Set[str]] = None) -> List[Achievement]:
+        """Unlock whatever the given stats newly satisfy, using the requirement index.
+        
+        For each numeric stat only thresholds between the user's first unmet threshold and
+        the current value are visited (bisect), so the common case is a single comparison.
+        scope optionally limits which achievement IDs may be unlocked.
+        """
+        candidates: List[str] = []
+        
+        for stat_key, value in stats.items():
+            boolean_ids = self._boolean_index.get(stat_key)
+            if boolean_ids and value:
+                candidates.extend(boolean_ids)
+            
+            entry = self._threshold_index.get(stat_key)
+            if entry is None or not isinstance(value, (int, float)):
+                continue
+            thresholds, achievement_ids = entry
+            
+            cursor_key = (user_id, stat_key)
+            cursor = self._threshold_cursors.get(cursor_key, 0)
+            while cursor < len(achievement_ids) and self.is_unlocked(user_id, achievement_ids[cursor]):
+                cursor += 1
+            self._threshold_cursors[cursor_key] = cursor
+            
+            if cursor >= len(thresholds):
+                continue  # Every achievement on this stat is unlocked
+            
+            # Fast path: value below the first unmet threshold means a single comparison
+            if value >= thresholds[cursor]:
+                candidates.extend(achievement_ids[cursor:bisect_right(thresholds, value)])
         
-        if requirements_met:
-            return self.unlock_achievement(user_id, achievement_id)
+        self._update_counters(user_id, stats)
         
-        # Update progress and mark for saving
-        user_achievement.progress.update(current_stats)
-        self._progress_updated = True
+        newly_unlocked = []
+        seen = set()
+        for achievement_id in candidates:
+            if achievement_id in seen or (scope is not None and achievement_id not in scope):
+                continue
+            seen.add(achievement_id)
+            if self.is_unlocked(user_id, achievement_id):
+                continue
+            achievement = self.achievements[achievement_id]
+            if self._requirements_met(achievement, stats) and self.unlock_achievement(user_id, achievement_id):
+                newly_unlocked.append(achievement)
         
-        # Save progress periodically (every 30 seconds) to avoid too frequent I/O
-        current_time = time.time()
-        if current_time - self._last_progress_save > 30:  # 30 seconds
+        # Without the scheduler job, progress is flushed periodically (every 30 seconds) to avoid too frequent I/O
+        if not self.scheduled_saves and time.time() - self._last_progress_save > self.PROGRESS_SAVE_INTERVAL:
             self._save_progress_updates()
         
-        return False
+        return newly_unlocked
     
     def unlock_achievement(self, user_id: int, achievement_id: str) -> bool:
         """Unlock an achievement for a user with robust duplicate prevention."""
@@ -1146,44 +1506,22 @@ class AchievementSystem:
             logger.error(f"Achievement {achievement_id} not found")
             return False
         
-        # FAIL-SAFE: Reload data before unlock attempt
-        try:
-            self._load_user_data()
-        except Exception as e:
-            logger.error(f"Failed to reload data before unlock: {e}")
-        
-        user_achievement = self.get_user_achievement(user_id, achievement_id)
-        
-        # CRITICAL: Check if already unlocked (with logging for debugging)
-        if user_achievement.unlocked:
+        # ATOMIC UNLOCK: compare-and-set against the in-process unlock set
+        unlock_timestamp = self._compare_and_set_unlock(user_id, achievement_id)
+        if unlock_timestamp is None:
             logger.warning(f"DUPLICATE PREVENTION: Achievement {achievement_id} already unlocked for user {user_id}")
             return False
         
-        # ATOMIC UNLOCK: Set all unlock properties at once
-        unlock_timestamp = datetime.datetime.now().isoformat()
-        user_achievement.unlocked = True
-        user_achievement.unlock_date = unlock_timestamp
+        # Persist right away as one journal line (fsynced on the I/O thread); on failure the
+        # unlock stays authoritative in memory and remains pending for the next progress flush.
+        def retry_unlock(error):
+            self._pending_unlocks.add((user_id, achievement_id))
+            logger.warning(f"Save failed for achievement {achievement_id}, will retry on next flush")
         
-        # FAIL-SAFE: Immediate save with retry mechanism
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                if self._save_user_data():
-                    logger.info(f"Achievement {achievement_id} unlocked for user {user_id} at {unlock_timestamp}")
-                    return True
-                else:
-                    logger.warning(f"Save attempt {attempt + 1} failed for achievement {achievement_id}")
-            except Exception as e:
-                logger.error(f"Save attempt {attempt + 1} error for achievement {achievement_id}: {e}")
-            
-            if attempt < max_retries - 1:
-                time.sleep(0.1)  # Brief delay before retry
+        self._append_journal([self._unlock_record(user_id, achievement_id)], sync=True, on_error=retry_unlock)
         
-        # If all saves failed, revert the unlock to prevent inconsistent state
-        user_achievement.unlocked = False
-        user_achievement.unlock_date = None
-        logger.error(f"CRITICAL: Failed to save achievement {achievement_id} for user {user_id} after {max_retries} attempts")
-        return False
+        logger.info(f"Achievement {achievement_id} unlocked for user {user_id} at {unlock_timestamp}")
+        return True
     
     def get_unlocked_achievements(self, user_id: int) -> List[Achievement]:
         """Get all unlocked achievements for a user."""
@@ -1204,8 +1542,7 @@ class AchievementSystem:
             if achievement.hidden and not include_hidden:
                 continue
             
-            user_achievement = self.get_user_achievement(user_id, achievement.id)
-            if not user_achievement.unlocked:
+            if not self.is_unlocked(user_id, achievement.id):
                 available.append(achievement)
         
         return available
@@ -1269,38 +1606,40 @@ class AchievementSystem:
         return stats
     
     def get_user_stats(self, user_id: int) -> Dict[str, Any]:
-        """Get achievement statistics for a user."""
-        user_achievements = self.get_user_achievements(user_id)
-        
-        unlocked_count = sum(1 for ua in user_achievements.values() if ua.unlocked)
+        """Get achievement statistics for a user from the materialized aggregates."""
+        key = str(user_id)
+        unlocked_count = self._unlocked_ranking.score(key)
         total_count = len(self.achievements)
         
-        # Calculate points from achievements
-        total_points = 0
-        for achievement_id, user_achievement in user_achievements.items():
-            if user_achievement.unlocked and achievement_id in self.achievements:
-                total_points += self.achievements[achievement_id].reward_points
-        
-        # Get unlocked by category
-        categories = {}
-        for achievement in self.achievements.values():
-            category = achievement.category
-            if category not in categories:
-                categories[category] = {"total": 0, "unlocked": 0}
-            categories[category]["total"] += 1
-            
-            user_achievement = self.get_user_achievement(user_id, achievement.id)
-            if user_achievement.unlocked:
-                categories[category]["unlocked"] += 1
+        categories = {
+            category: {"total": total, "unlocked": self._category_rankings[category].score(key)}
+            for category, total in self._category_totals.items()
+        }
         
         return {
             "unlocked_count": unlocked_count,
             "total_count": total_count,
             "completion_percentage": (unlocked_count / total_count) * 100 if total_count > 0 else 0,
-            "total_points": total_points,
+            "total_points": self._achievement_points.get(user_id, 0),
             "categories": categories
         }
     
+    def resolve_category(self, name: str) -> Optional[str]:
+        """Catalog category for a name or short alias (e.g. "message"), or None if unknown."""
+        name = name.lower()
+        name = self.CATEGORY_ALIASES.get(name, name)
+        return name if name in self._category_totals else None
+    
+    def get_categories(self) -> Dict[str, int]:
+        """Category -> number of achievements in it."""
+        return dict(self._category_totals)
+    
+    def get_leaderboard_ranking(self, category: Optional[str] = None) -> RankedIndex:
+        """Ranked index of unlocked counts (str user id keys), overall or for one catalog category."""
+        if category is None:
+            return self._unlocked_ranking
+        return self._category_rankings[category]
+    
     def get_total_contribution_points(self, user_id: int) -> int:
         """Get total contribution points for a user."""
         total_points = 0
@@ -1321,6 +1660,8 @@ class AchievementSystem:
             "total_users": len(self.user_data),
             "data_file_exists": os.path.exists(self.data_file),
             "backup_file_exists": os.path.exists(f"{self.data_file}.backup"),
+            "journal_bytes": self._journal_bytes,
+            "pending_changes": len(self._dirty) + len(self._pending_unlocks),
             "data_file_size": 0,
             "total_unlocked": 0,
             "categories": {},
@@ -1342,7 +1683,7 @@ class AchievementSystem:
                         # Check if unlocked in last 24 hours
                         if user_achievement.unlock_date:
                             try:
-                                unlock_time = datetime.fromisoformat(user_achievement.unlock_date)
+                                unlock_time = datetime.datetime.fromisoformat(user_achievement.unlock_date)
                                 if (now - unlock_time).days < 1:
                                     status["recent_unlocks"] += 1
                             except ValueError:
@@ -1350,17 +1691,12 @@ class AchievementSystem:
                         else:
                             status["integrity_issues"] += 1
             
-            # Count by category
-            for achievement_id, achievement in self.achievements.items():
-                category = achievement.category
-                if category not in status["categories"]:
-                    status["categories"][category] = {"total": 0, "unlocked": 0}
-                status["categories"][category]["total"] += 1
-                
-                # Count unlocked in this category
-                for user_id, user_achievements in self.user_data.items():
-                    if achievement_id in user_achievements and user_achievements[achievement_id].unlocked:
-                        status["categories"][category]["unlocked"] += 1
+            # Count by category from the leaderboard aggregates
+            for category, total in self._category_totals.items():
+                status["categories"][category] = {
+                    "total": total,
+                    "unlocked": sum(self._category_rankings[category].items().values())
+                }
                         
         except Exception as e:
             logger.error(f"Error generating system status: {e}")
@@ -1368,6 +1704,36 @@ class AchievementSystem:
             
         return status
 
+    def remove_users(self, user_ids: List[Any]) -> int:
+        """Delete the unlocks and counters of several users in one pass. Returns how many had data."""
+        removed = 0
+        with self._unlock_lock:
+            for user_id in user_ids:
+                try:
+                    user_id = int(user_id)
+                except ValueError:
+                    continue
+                unlocked = self.user_data.pop(user_id, None)
+                counters = self.user_counters.pop(user_id, None)
+                if unlocked is None and counters is None:
+                    continue
+                removed += 1
+                for achievement_id in unlocked or ():
+                    self._unlocked.discard((user_id, achievement_id))
+                key = str(user_id)
+                self._unlocked_ranking.remove(key)
+                for ranking in self._category_rankings.values():
+                    ranking.remove(key)
+                self._achievement_points.pop(user_id, None)
+                self._dirty.discard(user_id)
+        if removed:
+            self._pending_unlocks = {pending for pending in self._pending_unlocks if pending[0] in self.user_data}
+            self._threshold_cursors.clear()
+            # Removals can't be journaled; the next save writes a fresh snapshot
+            self.mark_progress_updated()
+            self._save_progress_updates()
+        return removed
+    
     def cleanup_invalid_users(self, guild) -> Dict[str, int]:
         """Remove users from achievement data who have left the server or are bots."""
         if not guild:
@@ -1378,7 +1744,7 @@ class AchievementSystem:
         users_to_remove = []
         
         try:
-            for user_id_str in self.user_data.keys():
+            for user_id_str in set(self.user_data) | set(self.user_counters):
                 try:
                     user_id = int(user_id_str)
                     member = guild.get_member(user_id)
@@ -1396,13 +1762,8 @@ class AchievementSystem:
                     removed_count += 1
                     
             # Remove the invalid users
-            for user_id_str in users_to_remove:
-                del self.user_data[user_id_str]
-                logger.info(f"Removed achievement data for invalid user: {user_id_str}")
-            
-            # Save the cleaned data if any users were removed
-            if removed_count > 0:
-                self._save_user_data()
+            if users_to_remove:
+                self.remove_users(users_to_remove)
                 logger.info(f"Achievement cleanup: Removed {removed_count} invalid users, kept {kept_count} valid users")
             
             return {
@@ -1418,6 +1779,62 @@ class AchievementSystem:
 # Global achievement system instance
 achievement_system = AchievementSystem()
 
+# Achievement IDs each check_* helper is allowed to unlock
+MESSAGE_ACHIEVEMENTS = frozenset([
+    "first_message", "chatty", "chatterbox", "conversation_master", 
+    "mega_chatter", "legendary_speaker",
+    "level_up", "level_10", "level_25", "level_50", "level_75", 
+    "level_100", "level_150",
+    "early_bird", "night_owl", "midnight_messenger",
+    "morning_person", "afternoon_chatter", "evening_socializer",
+    "emoji_user", "exclamation_enthusiast", "question_master",
+    "link_sharer", "attachment_sender", "mention_master"
+])
+
+GAMING_ACHIEVEMENTS = frozenset([
+    "first_tictactoe", "tictactoe_winner", "tictactoe_master",
+    "blackjack_winner", "blackjack_master", "jackpot_winner", 
+    "lucky_seven", "gaming_addict",
+    "first_hangman", "hangman_winner", "hangman_master",
+    "perfect_hangman", "hangman_speedster"
+])
+
+SOCIAL_ACHIEVEMENTS = frozenset([
+    "hugger", "super_hugger", "patter", "pat_master", "social_butterfly",
+    "first_reaction", "reaction_enthusiast", "quick_responder", 
+    "birthday_celebration", "mention_master"
+])
+
+ECONOMY_ACHIEVEMENTS = frozenset([
+    "first_purchase", "shopaholic", "big_spender", "whale", "millionaire"
+])
+
+COUNTING_ACHIEVEMENTS = frozenset([
+    "counting_contributor", "counting_hero", "counting_legend",
+    "perfectionist", "milestone_hunter"
+])
+
+COMMAND_ACHIEVEMENTS = frozenset([
+    "pun_lover", "fortune_seeker", "animal_lover", "helper"
+])
+
+TIME_ACHIEVEMENTS = frozenset([
+    "weekender", "daily_visitor", "dedication", "annual_member",
+    "weekend_warrior", "monthly_visitor", "holiday_spirit",
+    "early_riser", "late_night_regular", "weekday_warrior", 
+    "seasonal_visitor", "hourly_chatter"
+])
+
+MILESTONE_ACHIEVEMENTS = frozenset([
+    "first_week", "first_month", "server_veteran", "og_member"
+])
+
+SPECIAL_ACHIEVEMENTS = frozenset([
+    "emoji_enthusiast", "reaction_collector",
+    "question_master", "caps_lock_warrior",
+    "short_and_sweet", "novelist"
+])
+
 def check_message_achievements(user_id: int, message_count: int, level: int, hour: int, 
                               has_emoji: bool = False, has_exclamation: bool = False, 
                               has_question: bool = False, has_link: bool = False, 
@@ -1440,152 +1857,39 @@ def check_message_achievements(user_id: int, message_count: int, level: int, hou
         "mentions_sent": mention_count
     }
     
-    achievements_to_check = [
-        "first_message", "chatty", "chatterbox", "conversation_master", 
-        "mega_chatter", "legendary_speaker",
-        "level_up", "level_10", "level_25", "level_50", "level_75", 
-        "level_100", "level_150",
-        "early_bird", "night_owl", "midnight_messenger",
-        "morning_person", "afternoon_chatter", "evening_socializer",
-        "emoji_user", "exclamation_enthusiast", "question_master",
-        "link_sharer", "attachment_sender", "mention_master"
-    ]
-    
-    newly_unlocked = []
-    for achievement_id in achievements_to_check:
-        if achievement_system.check_achievement(user_id, achievement_id, stats):
-            newly_unlocked.append(achievement_system.achievements[achievement_id])
-    
-    return newly_unlocked
+    return achievement_system.evaluate_stats(user_id, stats, MESSAGE_ACHIEVEMENTS)
 
 def check_gaming_achievements(user_id: int, game_stats: Dict[str, Any]):
     """Check achievements related to gaming."""
-    achievements_to_check = [
-        "first_tictactoe", "tictactoe_winner", "tictactoe_master",
-        "blackjack_winner", "blackjack_master", "jackpot_winner", 
-        "lucky_seven", "gaming_addict",
-        "first_hangman", "hangman_winner", "hangman_master",
-        "perfect_hangman", "hangman_speedster"
-    ]
-    
-    newly_unlocked = []
-    for achievement_id in achievements_to_check:
-        if achievement_system.check_achievement(user_id, achievement_id, game_stats):
-            newly_unlocked.append(achievement_system.achievements[achievement_id])
-    
-    return newly_unlocked
+    return achievement_system.evaluate_stats(user_id, game_stats, GAMING_ACHIEVEMENTS)
 
 def check_social_achievements(user_id: int, social_stats: Dict[str, Any]):
     """Check achievements related to social interactions."""
-    achievements_to_check = [
-        "hugger", "super_hugger", "patter", "pat_master", "social_butterfly",
-        "first_reaction", "reaction_enthusiast", "quick_responder", 
-        "birthday_celebration", "mention_master"
-    ]
-    
-    newly_unlocked = []
-    for achievement_id in achievements_to_check:
-        if achievement_system.check_achievement(user_id, achievement_id, social_stats):
-            newly_unlocked.append(achievement_system.achievements[achievement_id])
-    
-    return newly_unlocked
+    return achievement_system.evaluate_stats(user_id, social_stats, SOCIAL_ACHIEVEMENTS)
 
 def check_economy_achievements(user_id: int, economy_stats: Dict[str, Any]):
     """Check achievements related to economy."""
-    achievements_to_check = [
-        "first_purchase", "shopaholic", "big_spender", "whale", "millionaire"
-    ]
-    
-    newly_unlocked = []
-    for achievement_id in achievements_to_check:
-        if achievement_system.check_achievement(user_id, achievement_id, economy_stats):
-            newly_unlocked.append(achievement_system.achievements[achievement_id])
-    
-    return newly_unlocked
+    return achievement_system.evaluate_stats(user_id, economy_stats, ECONOMY_ACHIEVEMENTS)
 
 def check_counting_achievements(user_id: int, counting_stats: Dict[str, Any]):
     """Check achievements related to counting game."""
-    achievements_to_check = [
-        "counting_contributor", "counting_hero", "counting_legend",
-        "perfectionist", "milestone_hunter"
-    ]
-    
-    newly_unlocked = []
-    for achievement_id in achievements_to_check:
-        if achievement_system.check_achievement(user_id, achievement_id, counting_stats):
-            newly_unlocked.append(achievement_system.achievements[achievement_id])
-    
-    return newly_unlocked
+    return achievement_system.evaluate_stats(user_id, counting_stats, COUNTING_ACHIEVEMENTS)
 
 def check_command_achievements(user_id: int, command_stats: Dict[str, Any]):
     """Check achievements related to command usage."""
-    achievements_to_check = [
-        "pun_lover", "fortune_seeker", "animal_lover", "helper"
-    ]
-    
-    newly_unlocked = []
-    for achievement_id in achievements_to_check:
-        if achievement_system.check_achievement(user_id, achievement_id, command_stats):
-            newly_unlocked.append(achievement_system.achievements[achievement_id])
-    
-    return newly_unlocked
+    return achievement_system.evaluate_stats(user_id, command_stats, COMMAND_ACHIEVEMENTS)
 
 def check_time_achievements(user_id: int, time_stats: Dict[str, Any]):
     """Check achievements related to time and activity."""
-    achievements_to_check = [
-        "weekender", "daily_visitor", "dedication", "annual_member",
-        "weekend_warrior", "monthly_visitor", "holiday_spirit",
-        "early_riser", "late_night_regular", "weekday_warrior", 
-        "seasonal_visitor", "hourly_chatter"
-    ]
-    
-    newly_unlocked = []
-    for achievement_id in achievements_to_check:
-        if achievement_system.check_achievement(user_id, achievement_id, time_stats):
-            newly_unlocked.append(achievement_system.achievements[achievement_id])
-    
-    return newly_unlocked
+    return achievement_system.evaluate_stats(user_id, time_stats, TIME_ACHIEVEMENTS)
 
 def check_milestone_achievements(user_id: int, milestone_stats: Dict[str, Any]):
     """Check achievements related to server milestones."""
-    achievements_to_check = [
-        "first_week", "first_month", "server_veteran", "og_member"
-    ]
-    
-    newly_unlocked = []
-    for achievement_id in achievements_to_check:
-        if achievement_system.check_achievement(user_id, achievement_id, milestone_stats):
-            newly_unlocked.append(achievement_system.achievements[achievement_id])
-    
-    return newly_unlocked
+    return achievement_system.evaluate_stats(user_id, milestone_stats, MILESTONE_ACHIEVEMENTS)
 
 def check_special_achievements(user_id: int, special_stats: Dict[str, Any]):
     """Check achievements related to special behaviors."""
-    achievements_to_check = [
-        "emoji_enthusiast", "reaction_collector",
-        "question_master", "caps_lock_warrior",
-        "short_and_sweet", "novelist"
-    ]
-    
-    newly_unlocked = []
-    for achievement_id in achievements_to_check:
-        if achievement_system.check_achievement(user_id, achievement_id, special_stats):
-            newly_unlocked.append(achievement_system.achievements[achievement_id])
-    
-    return newly_unlocked
-
-def check_milestone_achievements(user_id: int, milestone_stats: Dict[str, Any]):
-    """Check achievements related to server milestones."""
-    achievements_to_check = [
-        "first_week", "first_month", "server_veteran", "og_member"
-    ]
-    
-    newly_unlocked = []
-    for achievement_id in achievements_to_check:
-        if achievement_system.check_achievement(user_id, achievement_id, milestone_stats):
-            newly_unlocked.append(achievement_system.achievements[achievement_id])
-    
-    return newly_unlocked
+    return achievement_system.evaluate_stats(user_id, special_stats, SPECIAL_ACHIEVEMENTS)
 
 def save_jackpot_winner_to_file(username: str):
     """Save jackpot winner username to text file without Discord mentions."""
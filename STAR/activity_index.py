@@ -0,0 +1,190 @@
+"""
+StarChan Bot Activity Index
+Users bucketed by the UTC day they were last active, and each guild's human
+members sorted by join time, so "joined before T and inactive since T" (the
+lurker list) is two range queries instead of a scan of every member.
+"""
+
+import logging
+from bisect import bisect_left, insort
+from typing import Dict, Any, Optional, List, Set, Tuple, Iterable
+
+# Set up module logger
+logger = logging.getLogger('StarChan.ActivityIndex')
+
+DAY_SECONDS = 24 * 3600
+
+
+def day_of(timestamp: float) -> int:
+    """UTC day number of a Unix timestamp."""
+    return int(timestamp // DAY_SECONDS)
+
+
+class ActivityIndex:
+    """Last-active day per user plus the users of every day, with the days kept sorted."""
+
+    def __init__(self, last_active: Optional[Dict[str, float]] = None):
+        self._day: Dict[str, int] = {}
+        self._buckets: Dict[int, Set[str]] = {}
+        self._days: List[int] = []
+        if last_active:
+            self.load(last_active.items())
+
+    def __len__(self) -> int:
+        return len(self._day)
+
+    def load(self, items: Iterable[Tuple[str, float]]) -> None:
+        """Replace the contents from (user_id, last_active) pairs."""
+        self._day = {}
+        self._buckets = {}
+        for user_id, timestamp in items:
+            day = day_of(timestamp)
+            self._day[user_id] = day
+            self._buckets.setdefault(day, set()).add(user_id)
+        self._days = sorted(self._buckets)
+
+    def _discard(self, user_id: str, day: int) -> None:
+        bucket = self._buckets[day]
+        bucket.discard(user_id)
+        if not bucket:
+            del self._buckets[day]
+            del self._days[bisect_left(self._days, day)]
+
+    def touch(self, user_id: str, timestamp: float) -> None:
+        """Record activity; only moves the user when the day changed."""
+        day = day_of(timestamp)
+        old = self._day.get(user_id)
+        if old is not None and old >= day:
+            return
+        if old is not None:
+            self._discard(user_id, old)
+        self._day[user_id] = day
+        bucket = self._buckets.get(day)
+        if bucket is None:
+            bucket = self._buckets[day] = set()
+            insort(self._days, day)
+        bucket.add(user_id)
+
+    def remove(self, user_id: str) -> bool:
+        """Forget a user. Returns False if they weren't indexed."""
+        day = self._day.pop(user_id, None)
+        if day is None:
+            return False
+        self._discard(user_id, day)
+        return True
+
+    def last_day(self, user_id: str) -> Optional[int]:
+        """Day a user was last active, or None if never."""
+        return self._day.get(user_id)
+
+    def active_since(self, timestamp: float) -> Set[str]:
+        """Users active on or after the day of the timestamp."""
+        start = bisect_left(self._days, day_of(timestamp))
+        active: Set[str] = set()
+        for day in self._days[start:]:
+            active |= self._buckets[day]
+        return active
+
+
+class JoinIndex:
+    """One guild's human members ordered by join time."""
+
+    def __init__(self, members: Iterable[Any] = ()):
+        self._joined: Dict[int, float] = {}
+        self._order: List[Tuple[float, int]] = []
+        for member in members:
+            if not member.bot and member.joined_at is not None:
+                self._joined[member.id] = member.joined_at.timestamp()
+        self._order = sorted((joined, member_id) for member_id, joined in self._joined.items())
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def add(self, member) -> None:
+        """Index a member who just joined."""
+        if member.bot or member.joined_at is None:
+            return
+        self.remove(member.id)
+        joined = member.joined_at.timestamp()
+        self._joined[member.id] = joined
+        insort(self._order, (joined, member.id))
+
+    def remove(self, member_id: int) -> bool:
+        """Drop a member who left. Returns False if they weren't indexed."""
+        joined = self._joined.pop(member_id, None)
+        if joined is None:
+            return False
+        del self._order[bisect_left(self._order, (joined, member_id))]
+        return True
+
+    def joined_before(self, timestamp: float) -> List[Tuple[float, int]]:
+        """(joined_at, member_id) of members who joined before the timestamp, oldest first."""
+        return self._order[:bisect_left(self._order, (timestamp, -1))]
+
+
+class LurkerIndex:
+    """Activity index shared by all guilds plus a lazily built join index per guild."""
+
+    def __init__(self, last_active: Optional[Dict[str, float]] = None):
+        self.activity = ActivityIndex(last_active)
+        self._joins: Dict[int, JoinIndex] = {}
+        self.stats = {"queries": 0, "join_index_builds": 0, "last_query_results": 0}
+
+    def touch(self, user_id: str, timestamp: float) -> None:
+        """Record a user's activity (message pipeline)."""
+        self.activity.touch(user_id, timestamp)
+
+    def forget_user(self, user_id: str) -> None:
+        """Drop a purged user's activity."""
+        self.activity.remove(user_id)
+
+    def member_joined(self, member) -> None:
+        """Keep a built join index in step with on_member_join."""
+        joins = self._joins.get(member.guild.id)
+        if joins is not None:
+            joins.add(member)
+
+    def member_left(self, guild_id: int, member_id: int) -> None:
+        """Keep a built join index in step with on_member_remove."""
+        joins = self._joins.get(guild_id)
+        if joins is not None:
+            joins.remove(member_id)
+
+    def forget_guild(self, guild_id: int) -> None:
+        """Drop the join index of a guild the bot left."""
+        self._joins.pop(guild_id, None)
+
+    def _join_index(self, guild) -> JoinIndex:
+        joins = self._joins.get(guild.id)
+        if joins is None:
+            joins = JoinIndex(guild.members)
+            # Only keep it once the member list is complete; otherwise rebuild next time
+            if getattr(guild, "chunked", True):
+                self._joins[guild.id] = joins
+            self.stats["join_index_builds"] += 1
+        return joins
+
+    def lurkers(self, guild, cutoff: float) -> List[Tuple[int, float, Optional[int]]]:
+        """Members who joined before the cutoff and weren't active since it.
+
+        Returns (member_id, joined_at, last_active_day or None), never-active members
+        first, then the longest inactive.
+        """
+        active = self.activity.active_since(cutoff)
+        results = [
+            (member_id, joined, self.activity.last_day(str(member_id)))
+            for joined, member_id in self._join_index(guild).joined_before(cutoff)
+            if str(member_id) not in active
+        ]
+        results.sort(key=lambda row: -1 if row[2] is None else row[2])
+        self.stats["queries"] += 1
+        self.stats["last_query_results"] = len(results)
+        return results
+
+    def get_status(self) -> Dict[str, Any]:
+        """Return index metrics for debug commands."""
+        status = dict(self.stats)
+        status["indexed_users"] = len(self.activity)
+        status["active_days"] = len(self.activity._days)
+        status["join_indexes"] = {guild_id: len(joins) for guild_id, joins in self._joins.items()}
+        return status
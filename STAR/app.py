@@ -5,25 +5,37 @@ import re
 from discord.ext import commands
 from discord.ext.commands import CommandOnCooldown
 from discord.ext.commands import cooldown, BucketType
-import json
 import os
 import time
 import collections
 import datetime
+import io
+import csv
 import requests
 import logging
 import traceback
 from typing import Optional, Dict, Any, List
 
 # IMPORTS - Real functionality
-from bot_utils import roast_command, praise_command, dadjoke_command, send_achievement_notification, ShopHelper, WeeklyContributionManager, ChatterBot, SHOP_ROLES as BOT_UTILS_SHOP_ROLES
+from bot_utils import roast_command, praise_command, dadjoke_command, ShopHelper, WeeklyContributionManager, ChatterBot, SHOP_ROLES as BOT_UTILS_SHOP_ROLES
+from bot_utils import ChannelHelper, channel_cache, achievement_notifier, queue_achievement_notification
+from persistence import WriteBehindStore, store_manager, io_service
+import json_codec
+from economy_db import economy_db, SqliteTableBackend, InsufficientFundsError
+from message_pipeline import MessagePipeline, MessageActivity
+from message_features import MessageFeatures, extract_features
+from scheduler import Scheduler, next_daily_boundary, next_weekly_boundary
+from level_engine import LevelEngine, level_for_points, points_for_level
+from reaction_aggregator import ReactionAggregator
+from ledger import StripedLockManager, Ledger
+from membership import MembershipPruner
+from activity_index import LurkerIndex, DAY_SECONDS
 from achievements import (
     AchievementSystem, achievement_system, 
     check_counting_achievements, check_special_achievements,
     check_message_achievements, check_gaming_achievements,
     check_social_achievements, check_command_achievements,
     check_time_achievements, check_milestone_achievements,
-    send_achievement_notification,
     debug_check_time_achievements, debug_check_message_achievements,
     debug_check_social_achievements, debug_check_milestone_achievements,
     debug_check_easy_achievements
@@ -68,7 +80,22 @@ BOT_CONFIG = {
     "PREFIX": "!",
     "VERSION": "1.0.0",
     "owner_id": 000000000000000000,  # Replace with your Discord user ID
-    "VIP_ROLE_NAME": "⚜️ VIP ⚜️"
+    "VIP_ROLE_NAME": "⚜️ VIP ⚜️",
+    "PERSISTENCE_FLUSH_INTERVAL": 10,  # Seconds between write-behind flushes
+    "PERSISTENCE_DIRTY_THRESHOLD": 250,  # Flush early once this many users changed
+    "MESSAGE_BATCH_WINDOW": 0.25,  # Seconds the message pipeline coalesces activity per user
+    "MESSAGE_QUEUE_SIZE": 5000,  # Bounded pipeline queue; beyond this the overflow policy applies
+    "MESSAGE_OVERFLOW_POLICY": "merge",  # "merge" folds bursts per user, "drop" discards them
+    "ACHIEVEMENT_FLUSH_INTERVAL": 30,  # Seconds between scheduled achievement progress saves
+    "CLEANUP_HOUR_UTC": 4,  # Daily membership reconciliation runs at this hour (off-peak)
+    "MEMBER_PURGE_GRACE_DAYS": 7,  # Departed members' data is kept this long in case they rejoin
+    "MEMBER_PURGE_BATCH": 500,  # Users purged per batch; the loop runs other events between batches
+    "MEMBER_PURGE_INTERVAL": 3600,  # Seconds between purges of tombstones past the grace period
+    "LEVELUP_COALESCE_WINDOW": 2.0,  # Seconds level-ups wait so a multi-level jump is announced once
+    "REACTION_FLUSH_INTERVAL": 2.0,  # Seconds reaction points are aggregated before being credited
+    "REACTION_EVAL_INTERVAL": 10.0,  # Reaction achievements are evaluated at most this often per user
+    "BALANCE_LOCK_STRIPES": 64,  # Per-user balance locks; users on different stripes never contend
+    "NOTIFICATION_DRAIN_TIMEOUT": 10  # Seconds shutdown waits for queued achievement notifications
 }
 
 # GLOBAL DATA STRUCTURES
@@ -88,52 +115,45 @@ class DataManager:
     def load_json_file(filename):
         """Load data from JSON file with error handling"""
         try:
+            # A write still queued on the I/O thread is newer than the file
+            pending = io_service.pending_json(filename)
+            if pending is not None:
+                return pending
             if os.path.exists(filename):
-                with open(filename, "r") as f:
-                    return json.load(f)
+                return json_codec.load_file(filename)
         except Exception as e:
             logger.error(f"Error loading {filename}: {e}")
         return {}
     
     @staticmethod 
     def save_json_file(filename, data):
-        """Save data to JSON file with error handling"""
+        """Snapshot data and write it (compact, atomically) on the I/O thread"""
         try:
-            with open(filename, "w") as f:
-                json.dump(data, f, indent=2)
-            logger.debug(f"Saved data to {filename}")
+            io_service.write_json(filename, data)
+            logger.debug(f"Queued save of {filename}")
         except Exception as e:
             logger.error(f"Error saving {filename}: {e}")
     
     @staticmethod
     def load_contributions():
-        """Load contributions from file"""
-        return DataManager.load_json_file("contributions.txt")
+        """Load contributions from the economy database"""
+        return economy_db.load_table("contributions")
     
     @staticmethod
     def load_counting_state():
-        """Load counting state from file"""
-        return DataManager.load_json_file("counting_state.txt")
+        """Load counting state from the economy database"""
+        return economy_db.get_state("counting_state", {})
 
     @staticmethod
     def load_lifetime_earnings():
-        """Load lifetime earnings from file"""
-        return DataManager.load_json_file("lifetime_earnings.txt")
+        """Load lifetime earnings from the economy database"""
+        return economy_db.load_table("lifetime_earnings")
 
     @staticmethod
     def load_last_active():
-        """Load last active data from file with TXT fallback"""
+        """Load last active data from the economy database"""
         try:
-            # First try TXT file
-            if os.path.exists("last_active.txt"):
-                with open("last_active.txt", "r") as f:
-                    return json.load(f)
-            # Fallback to JSON for backward compatibility
-            elif os.path.exists("last_active.json"):
-                with open("last_active.json", "r") as f:
-                    content = f.read().strip()
-                    if content:
-                        return json.loads(content)
+            return economy_db.load_table("last_active")
         except Exception as e:
             logger.error(f"Error in DataManager loading last active: {e}")
         return {}
@@ -451,6 +471,8 @@ BUYABLE_ROLES = {
     "platinum": "Platinum Supporter"
 }
 
+# Contributions, lifetime earnings, counting state, last active and weekly contributions are
+# stored in the economy database; their .txt entries are only read by the one-shot importer
 DATA_FILES = {
     "RIDDLE_STATE": "riddle_state.txt",
     "CONTRIBUTIONS": "contributions.txt",
@@ -492,12 +514,8 @@ class LevelSystem:
     @staticmethod
     def calculate_level(points):
         """Calculate level based on points (level = sqrt(points/100))"""
-        if points <= 0:
-            return 1
-        # Square root formula for smooth progression
-        import math
-        level = int(math.sqrt(points / 100)) + 1
-        return max(1, level)
+        # Square root formula for smooth progression, in integer math
+        return level_for_points(points)
     
     @staticmethod
     def get_level(points):
@@ -510,15 +528,14 @@ class LevelSystem:
         try:
             user_id_str = str(user_id)
             lifetime_points = lifetime_earnings.get(user_id_str, 0)
-            current_level = LevelSystem.calculate_level(lifetime_points)
+            current_level = level_engine.get_level(user_id_str, lifetime_points)
             
             # Calculate points needed for next level
-            next_level = current_level + 1
-            next_level_points = (next_level - 1) ** 2 * 100
+            next_level_points = level_engine.get_next_threshold(user_id_str, lifetime_points)
             points_to_next = next_level_points - lifetime_points
             
             # Calculate progress within current level
-            current_level_points = (current_level - 1) ** 2 * 100
+            current_level_points = points_for_level(current_level)
             progress_points = lifetime_points - current_level_points
             level_span = next_level_points - current_level_points
             progress_percentage = (progress_points / level_span) * 100 if level_span > 0 else 100
@@ -572,24 +589,25 @@ class EmbedHelper:
         return discord.Embed(title=title, description=description, color=discord.Color.blue())
 
 # REAL DATA ACCESS FUNCTIONS
+# Economy data lives in SQLite (economy_db.py); the old .txt files are imported once on first start
+economy_db.import_legacy_files(DATA_FILES)
+
 def load_counting_state():
-    """Load counting state from file with error handling"""
+    """Load counting state from the database with error handling"""
     try:
-        filename = DATA_FILES.get("COUNTING_STATE", "counting_state.txt")
-        if os.path.exists(filename):
-            with open(filename, "r") as f:
-                data = json.load(f)
-                # Ensure all required fields exist
-                if "current" not in data:
-                    data["current"] = data.get("current_count", 0)
-                if "channel_id" not in data:
-                    data["channel_id"] = 000000000000000000  # Replace with your counting channel ID
-                logger.info(f"Loaded counting state: current={data.get('current', 0)}, channel={data.get('channel_id')}")
-                return data
+        data = economy_db.get_state("counting_state")
+        if data:
+            # Ensure all required fields exist
+            if "current" not in data:
+                data["current"] = data.get("current_count", 0)
+            if "channel_id" not in data:
+                data["channel_id"] = 000000000000000000  # Replace with your counting channel ID
+            logger.info(f"Loaded counting state: current={data.get('current', 0)}, channel={data.get('channel_id')}")
+            return data
     except Exception as e:
         logger.error(f"Error loading counting state: {e}")
     
-    # Return default state if file doesn't exist or error occurred
+    # Return default state if nothing is stored or error occurred
     default_state = {
         "current_count": 0, 
         "last_user": None,
@@ -600,152 +618,64 @@ def load_counting_state():
     return default_state
 
 def save_counting_state(state):
-    """Save counting state to file with error handling"""
+    """Save counting state to the database (single-row upsert on the I/O thread)"""
     try:
-        filename = DATA_FILES.get("COUNTING_STATE", "counting_state.txt")
-        with open(filename, "w") as f:
-            json.dump(state, f, indent=2)
-        logger.debug(f"Saved counting state: current={state.get('current', 0)}")
+        io_service.submit("counting_state", economy_db.set_state, "counting_state", dict(state))
+        logger.debug(f"Queued counting state save: current={state.get('current', 0)}")
     except Exception as e:
         logger.error(f"Error saving counting state: {e}")
 
 def load_contributions():
-    """Load contributions from .txt file with fallback to JSON"""
+    """Load contributions from the database"""
     try:
-        # First try to load from contributions.txt
-        if os.path.exists("contributions.txt"):
-            data = {}
-            with open("contributions.txt", "r", encoding='utf-8') as f:
-                content = f.read().strip()
-                if content:
-                    try:
-                        # Try JSON format first
-                        data = json.loads(content)
-                        logger.info(f"Loaded contributions from contributions.txt (JSON format) for {len(data)} users")
-                        return data
-                    except json.JSONDecodeError:
-                        # Try line-by-line format: user_id:points
-                        for line in f.readlines():
-                            line = line.strip()
-                            if ':' in line:
-                                user_id, points = line.split(':', 1)
-                                try:
-                                    data[user_id.strip()] = int(points.strip())
-                                except ValueError:
-                                    logger.warning(f"Invalid contribution entry: {line}")
-                        logger.info(f"Loaded contributions from contributions.txt (line format) for {len(data)} users")
-                        return data
-        
-        # Fallback to JSON file
-        filename = DATA_FILES.get("CONTRIBUTIONS", "contributions.txt")
-        if os.path.exists(filename):
-            with open(filename, "r") as f:
-                data = json.load(f)
-                logger.info(f"Loaded contributions from {filename} for {len(data)} users")
-                return data
-                
+        data = economy_db.load_table("contributions")
+        logger.info(f"Loaded contributions for {len(data)} users")
+        return data
     except Exception as e:
         logger.error(f"Error loading contributions: {e}")
-    
-    logger.info("No contributions data found, starting with empty data")
     return {}
 
 def save_contributions(data):
-    """Save contributions to TXT file"""
+    """Replace all stored contributions with data (prefer contributions_store for single users)"""
     try:
-        # Save to contributions.txt (JSON format for reliability)
-        filename = DATA_FILES.get("CONTRIBUTIONS", "contributions.txt")
-        with open(filename, "w", encoding='utf-8') as f:
-            json.dump(data, f, indent=2)
-            
-        logger.debug(f"Saved contributions for {len(data)} users to TXT file")
+        io_service.submit("contributions", economy_db.replace_table, "contributions", dict(data))
+        logger.debug(f"Saved contributions for {len(data)} users")
     except Exception as e:
         logger.error(f"Error saving contributions: {e}")
 
 def load_lifetime_earnings():
-    """Load lifetime earnings from .txt file with fallback to JSON"""
+    """Load lifetime earnings from the database"""
     try:
-        # First try to load from lifetime_earnings.txt
-        if os.path.exists("lifetime_earnings.txt"):
-            data = {}
-            with open("lifetime_earnings.txt", "r", encoding='utf-8') as f:
-                content = f.read().strip()
-                if content:
-                    try:
-                        # Try JSON format first
-                        data = json.loads(content)
-                        logger.info(f"Loaded lifetime earnings from lifetime_earnings.txt (JSON format) for {len(data)} users")
-                        return data
-                    except json.JSONDecodeError:
-                        # Try line-by-line format: user_id:points
-                        lines = content.split('\n')
-                        for line in lines:
-                            line = line.strip()
-                            if ':' in line:
-                                user_id, points = line.split(':', 1)
-                                try:
-                                    data[user_id.strip()] = int(points.strip())
-                                except ValueError:
-                                    logger.warning(f"Invalid lifetime earnings entry: {line}")
-                        logger.info(f"Loaded lifetime earnings from lifetime_earnings.txt (line format) for {len(data)} users")
-                        return data
-        
-        # Fallback to JSON file
-        filename = DATA_FILES.get("LIFETIME_EARNINGS", "lifetime_earnings.txt")
-        if os.path.exists(filename):
-            with open(filename, "r") as f:
-                data = json.load(f)
-                logger.info(f"Loaded lifetime earnings from {filename} for {len(data)} users")
-                return data
-                
+        data = economy_db.load_table("lifetime_earnings")
+        logger.info(f"Loaded lifetime earnings for {len(data)} users")
+        return data
     except Exception as e:
         logger.error(f"Error loading lifetime earnings: {e}")
-    
-    logger.info("No lifetime earnings data found, starting with empty data")
     return {}
 
 def save_lifetime_earnings(data):
-    """Save lifetime earnings to TXT file"""
+    """Replace all stored lifetime earnings with data"""
     try:
-        # Save to lifetime_earnings.txt (JSON format for reliability)
-        filename = DATA_FILES.get("LIFETIME_EARNINGS", "lifetime_earnings.txt")
-        with open(filename, "w", encoding='utf-8') as f:
-            json.dump(data, f, indent=2)
-            
-        logger.debug(f"Saved lifetime earnings for {len(data)} users to TXT file")
+        io_service.submit("lifetime_earnings", economy_db.replace_table, "lifetime_earnings", dict(data))
+        logger.debug(f"Saved lifetime earnings for {len(data)} users")
     except Exception as e:
         logger.error(f"Error saving lifetime earnings: {e}")
 
 def load_last_active():
-    """Load last active data from TXT or JSON file"""
+    """Load last active data from the database"""
     try:
-        # First try to load from TXT file
-        if os.path.exists("last_active.txt"):
-            with open("last_active.txt", "r") as f:
-                data = json.load(f)
-                logger.info(f"Loaded last active data for {len(data)} users from TXT")
-                return data
-        # Fallback to JSON file for backward compatibility
-        elif os.path.exists("last_active.json"):
-            with open("last_active.json", "r") as f:
-                content = f.read().strip()
-                if content:
-                    data = json.loads(content)
-                    logger.info(f"Loaded last active data for {len(data)} users from JSON, converting to TXT")
-                    # Convert to TXT format for future use
-                    save_last_active(data)
-                    return data
+        data = economy_db.load_table("last_active")
+        logger.info(f"Loaded last active data for {len(data)} users")
+        return data
     except Exception as e:
         logger.error(f"Error loading last active: {e}")
     return {}
 
 def save_last_active(data):
-    """Save last active data to TXT file"""
+    """Replace all stored last active timestamps with data"""
     try:
-        # Save as TXT (primary format)
-        with open("last_active.txt", "w") as f:
-            json.dump(data, f, indent=2)
-        logger.debug(f"Saved last active data for {len(data)} users to TXT")
+        io_service.submit("last_active", economy_db.replace_table, "last_active", dict(data))
+        logger.debug(f"Saved last active data for {len(data)} users")
     except Exception as e:
         logger.error(f"Error saving last active: {e}")
 
@@ -754,7 +684,33 @@ counting_state = load_counting_state()
 last_active = load_last_active()
 contributions = load_contributions()
 lifetime_earnings = load_lifetime_earnings()
-contrib_lock = asyncio.Lock()
+
+# Write-behind stores: hot paths mark users dirty, a background task writes batched snapshots
+contributions_store = store_manager.register(WriteBehindStore(
+    "contributions", SqliteTableBackend(economy_db, "contributions"), contributions,
+    flush_interval=BOT_CONFIG["PERSISTENCE_FLUSH_INTERVAL"],
+    dirty_threshold=BOT_CONFIG["PERSISTENCE_DIRTY_THRESHOLD"]
+))
+lifetime_earnings_store = store_manager.register(WriteBehindStore(
+    "lifetime_earnings", SqliteTableBackend(economy_db, "lifetime_earnings"), lifetime_earnings,
+    flush_interval=BOT_CONFIG["PERSISTENCE_FLUSH_INTERVAL"],
+    dirty_threshold=BOT_CONFIG["PERSISTENCE_DIRTY_THRESHOLD"]
+))
+last_active_store = store_manager.register(WriteBehindStore(
+    "last_active", SqliteTableBackend(economy_db, "last_active"), last_active,
+    flush_interval=BOT_CONFIG["PERSISTENCE_FLUSH_INTERVAL"],
+    dirty_threshold=BOT_CONFIG["PERSISTENCE_DIRTY_THRESHOLD"]
+))
+# Last-active days and join order for !showlurkers range queries
+lurker_index = LurkerIndex(last_active)
+
+# Cached levels and next-level thresholds; level-ups are announced by its consumer task
+level_engine = LevelEngine(coalesce_window=BOT_CONFIG["LEVELUP_COALESCE_WINDOW"])
+
+# Striped per-user locks and atomic debit/credit/transfer for spending commands
+balance_locks = StripedLockManager(BOT_CONFIG["BALANCE_LOCK_STRIPES"])
+ledger = Ledger(contributions_store, balance_locks, earn=lambda user_id, amount, *args: apply_contribution(user_id, amount, *args),
+                database=economy_db)
 
 
 @bot.command()
@@ -779,19 +735,17 @@ async def blackjack(ctx, bet: int = None):
         return
     
     user_id = str(ctx.author.id)
-    user_points = contributions.get(user_id, 0)
-    
-    if bet > user_points:
-        await ctx.send(f"❌ You don't have enough contribution points! You have **{user_points:,}** points.")
-        return
     
     if bet < 10:
         await ctx.send("❌ Minimum bet is **10** contribution points!")
         return
     
-    # Deduct bet from user's points
-    contributions[user_id] = user_points - bet
-    await save_contributions_async(contributions)
+    # Deduct bet from user's points (checked and taken atomically)
+    try:
+        await ledger.debit(user_id, bet)
+    except InsufficientFundsError:
+        await ctx.send(f"❌ You don't have enough contribution points! You have **{ledger.balance(user_id):,}** points.")
+        return
     
     # Create deck and shuffle
     suits = ['♠️', '♥️', '♦️', '♣️']
@@ -881,7 +835,7 @@ async def blackjack(ctx, bet: int = None):
             inline=False
         )
         embed.color = discord.Color.from_rgb(255, 215, 0)  # Gold
-        await add_points_direct(user_id, bet)
+        await ledger.credit(user_id, bet)
         await ctx.send(embed=embed)
         return
     elif player_blackjack:
@@ -892,7 +846,7 @@ async def blackjack(ctx, bet: int = None):
             inline=False
         )
         embed.color = discord.Color.from_rgb(255, 215, 0)  # Gold
-        await add_points_direct(user_id, winnings)
+        await ledger.credit(user_id, winnings)
         
         # Track blackjack win achievement
         try:
@@ -901,7 +855,7 @@ async def blackjack(ctx, bet: int = None):
             newly_unlocked = check_gaming_achievements(ctx.author.id, {"blackjack_wins": blackjack_wins})
             
             for achievement in newly_unlocked:
-                await send_achievement_notification(bot, ctx.author, achievement)
+                queue_achievement_notification(bot, ctx.author, achievement)
                 if achievement.reward_points > 0:
                     await add_contribution(ctx.author.id, achievement.reward_points * 10, ctx.channel, ctx.author)
         except Exception as e:
@@ -1006,7 +960,7 @@ async def blackjack(ctx, bet: int = None):
                 inline=False
             )
             embed.color = discord.Color.from_rgb(255, 165, 0)  # Orange
-            await add_points_direct(user_id, bet)
+            await ledger.credit(user_id, bet)
             await game_message.edit(embed=embed)
             return
     
@@ -1070,9 +1024,7 @@ async def blackjack(ctx, bet: int = None):
             inline=False
         )
         embed.color = discord.Color.from_rgb(255, 215, 0)  # Gold
-        contributions[user_id] = contributions.get(user_id, 0) + winnings
-        # Update lifetime earnings too since this is earning points
-        lifetime_earnings[user_id] = lifetime_earnings.get(user_id, 0) + winnings
+        await ledger.credit(user_id, winnings)
         
         # Track blackjack win achievement
         try:
@@ -1081,7 +1033,7 @@ async def blackjack(ctx, bet: int = None):
             newly_unlocked = check_gaming_achievements(ctx.author.id, {"blackjack_wins": blackjack_wins})
             
             for achievement in newly_unlocked:
-                await send_achievement_notification(bot, ctx.author, achievement)
+                queue_achievement_notification(bot, ctx.author, achievement)
                 if achievement.reward_points > 0:
                     await add_contribution(ctx.author.id, achievement.reward_points * 10, ctx.channel, ctx.author)
         except Exception as e:
@@ -1100,7 +1052,7 @@ async def blackjack(ctx, bet: int = None):
             inline=False
         )
         embed.color = discord.Color.from_rgb(255, 215, 0)  # Gold
-        await add_points_direct(user_id, winnings)
+        await ledger.credit(user_id, winnings)
         
         # Track blackjack win achievement
         try:
@@ -1109,7 +1061,7 @@ async def blackjack(ctx, bet: int = None):
             newly_unlocked = check_gaming_achievements(ctx.author.id, {"blackjack_wins": blackjack_wins})
             
             for achievement in newly_unlocked:
-                await send_achievement_notification(bot, ctx.author, achievement)
+                queue_achievement_notification(bot, ctx.author, achievement)
                 if achievement.reward_points > 0:
                     await add_contribution(ctx.author.id, achievement.reward_points * 10, ctx.channel, ctx.author)
         except Exception as e:
@@ -1127,7 +1079,7 @@ async def blackjack(ctx, bet: int = None):
             inline=False
         )
         embed.color = discord.Color.from_rgb(255, 165, 0)  # Orange
-        await add_points_direct(user_id, bet)
+        await ledger.credit(user_id, bet)
     else:
         # Dealer wins
         embed.add_field(
@@ -1137,8 +1089,6 @@ async def blackjack(ctx, bet: int = None):
         )
         embed.color = discord.Color.from_rgb(139, 0, 0)  # Dark red
     
-    await save_contributions_async(contributions)
-    
     # Show final balance with enhanced styling
     final_points = contributions.get(user_id, 0)
     embed.add_field(
@@ -1160,35 +1110,21 @@ async def blackjack(ctx, bet: int = None):
     
 
 async def save_contributions_async(data: Dict[str, int]):
-    """Save contributions asynchronously with error handling."""
+    """Schedule a write-behind flush of contributions (written off the event loop)."""
     try:
-        async with contrib_lock:
-            save_contributions(data)
-            logger.debug(f"Async saved contributions for {len(data)} users")
+        contributions_store.mark_all_dirty()
+        logger.debug(f"Scheduled contributions flush for {len(data)} users")
     except Exception as e:
         logger.error(f"Error saving contributions async: {e}")
 
 async def save_lifetime_earnings_async(data: Dict[str, int]):
-    """Save lifetime earnings asynchronously with error handling."""
+    """Schedule a write-behind flush of lifetime earnings (written off the event loop)."""
     try:
-        async with contrib_lock:
-            save_lifetime_earnings(data)
-            logger.debug(f"Async saved lifetime earnings for {len(data)} users")
+        lifetime_earnings_store.mark_all_dirty()
+        logger.debug(f"Scheduled lifetime earnings flush for {len(data)} users")
     except Exception as e:
         logger.error(f"Error saving lifetime earnings async: {e}")
 
-async def add_points_direct(user_id: str, points: int):
-    """Add points directly to both current balance and lifetime earnings."""
-    # Add to current balance (spendable)
-    contributions[user_id] = contributions.get(user_id, 0) + points
-    # Add to lifetime earnings (for level calculation)
-    lifetime_earnings[user_id] = lifetime_earnings.get(user_id, 0) + points
-    # Add to weekly contributions
-    WeeklyContributionManager.add_weekly_points(user_id, points)
-    # Save both files
-    await save_contributions_async(contributions)
-    await save_lifetime_earnings_async(lifetime_earnings)
-
 async def _award_gambler_role(ctx, bet_amount: int):
     """Award the Gambler role for winning a high-stakes blackjack game."""
     try:
@@ -1252,6 +1188,11 @@ async def _award_gambler_role(ctx, bet_amount: int):
 
 async def add_contribution(user_id: int, amount: int, channel: Optional[discord.TextChannel] = None, member: Optional[discord.Member] = None):
     """Add contribution points to a user with role multiplier support."""
+    apply_contribution(user_id, amount, channel, member)
+
+
+def apply_contribution(user_id: int, amount: int, channel: Optional[discord.TextChannel] = None, member: Optional[discord.Member] = None) -> int:
+    """Synchronous body of add_contribution for batch paths. Returns the points actually credited."""
     user_id_str = str(user_id)
     
     # Check for special role multipliers if member is provided
@@ -1262,71 +1203,24 @@ async def add_contribution(user_id: int, amount: int, channel: Optional[discord.
             actual_amount = amount * 2  # 2x points for Star Contributors
             logger.info(f"Star Contributor multiplier applied: User {user_id} received {actual_amount} points (base {amount} x2)")
     
-    # Add to current balance (spendable)
-    contributions[user_id_str] = contributions.get(user_id_str, 0) + actual_amount
-    # Add to lifetime earnings (for level calculation)
-    lifetime_earnings[user_id_str] = lifetime_earnings.get(user_id_str, 0) + actual_amount
+    # Add to current balance (spendable) and lifetime earnings (for level calculation).
+    # The stores only mark the user dirty; the write happens in the background flush.
+    contributions_store.increment(user_id_str, actual_amount)
+    new_lifetime = lifetime_earnings_store.increment(user_id_str, actual_amount)
     
-    # Save both files
-    save_contributions(contributions)
-    save_lifetime_earnings(lifetime_earnings)
+    # One comparison against the cached next-level threshold; crossings become level-up events
+    level_engine.record_points(user_id_str, new_lifetime - actual_amount, new_lifetime, channel, member)
     
     # Also add to weekly tracking
     WeeklyContributionManager.add_weekly_points(user_id_str, actual_amount)
+    return actual_amount
 
 
 async def find_suitable_channel(guild: discord.Guild, member: discord.Member, preferred_channel: Optional[discord.TextChannel] = None) -> Optional[discord.TextChannel]:
     """Find a suitable channel to send messages with error handling."""
-    try:
-        # Use preferred channel if valid
-        if (preferred_channel and 
-            hasattr(preferred_channel, "send") and 
-            preferred_channel.permissions_for(guild.me).send_messages):
-            return preferred_channel
-        
-        # Try to find the most recent channel the user spoke in
-        # Import BOT_CONFIG to get forbidden channel IDs
-        from bot_utils import BOT_CONFIG
-        forbidden_channel_ids = BOT_CONFIG.get("FORBIDDEN_CHANNEL_IDS", [
-            000000000000000000,  # Replace with channels where bot shouldn't work (like rules)
-            000000000000000000   # Add more forbidden channel IDs as needed
-        ])
-        try:
-            for text_channel in guild.text_channels:
-                if (not text_channel.permissions_for(guild.me).read_message_history or
-                    text_channel.id in forbidden_channel_ids):
-                    continue
-                async for message in text_channel.history(limit=100):
-                    if message.author.id == member.id:
-                        if text_channel.permissions_for(guild.me).send_messages:
-                            return text_channel
-                        break
-        except discord.HTTPException:
-            pass  # Continue if we can't read history
-        
-        # Find any suitable channel
-        for channel in guild.text_channels:
-            if (channel.permissions_for(member).read_messages and
-                channel.permissions_for(guild.me).send_messages and
-                channel != guild.rules_channel and
-                channel != guild.system_channel and
-                channel.id not in forbidden_channel_ids):
-                return channel
-        
-        # Last resort: system or rules channel (but not the forbidden channels)
-        for channel in [guild.system_channel, guild.rules_channel]:
-            if (channel and 
-                channel.permissions_for(guild.me).send_messages and
-                channel.id not in forbidden_channel_ids):
-                return channel
-                
-        return None
-        
-    except Exception as e:
-        logger.error(f"Error finding suitable channel: {e}")
-        return None
+    return await ChannelHelper.find_suitable_channel(guild, member, preferred_channel)
 
-async def send_levelup_embed(channel: discord.TextChannel, member: discord.Member, level: int):
+async def send_levelup_embed(channel: Optional[discord.TextChannel], member: discord.Member, level: int, levels_gained: int = 1):
     """Send level up embed with error handling."""
     try:
         # Import BOT_CONFIG to get forbidden and forced channel IDs
@@ -1343,22 +1237,11 @@ async def send_levelup_embed(channel: discord.TextChannel, member: discord.Membe
         # Only use forced channel if it exists and is not in the forbidden channels
         if forced_channel is not None and forced_channel.id not in forbidden_channel_ids:
             channel = forced_channel
-        elif channel.id in forbidden_channel_ids:
-            # If the current channel is a forbidden channel, find an alternative
-            guild = channel.guild
-            alternative_channel = None
-            
-            # Try to find a suitable alternative channel
-            for text_channel in guild.text_channels:
-                if (text_channel.id not in forbidden_channel_ids and
-                    text_channel.permissions_for(member).read_messages and
-                    text_channel.permissions_for(guild.me).send_messages):
-                    alternative_channel = text_channel
-                    break
-            
-            if alternative_channel:
-                channel = alternative_channel
-            else:
+        elif channel is None or channel.id in forbidden_channel_ids:
+            # If the current channel is a forbidden channel (or unknown), use where the
+            # member last spoke or the first cached eligible channel they can read
+            channel = await find_suitable_channel(member.guild, member)
+            if channel is None:
                 # If no alternative found, don't send the message
                 logger.warning(f"Could not find suitable channel for level up message, skipping for {member}")
                 return
@@ -1368,6 +1251,8 @@ async def send_levelup_embed(channel: discord.TextChannel, member: discord.Membe
             description=f"{member.mention} has reached **Level {level}**!",
             color=discord.Color.gold()
         )
+        if levels_gained > 1:
+            embed.description += f"\n🚀 That's **{levels_gained} levels** at once!"
         
         avatar_url = member.avatar.url if member.avatar else member.default_avatar.url
         embed.set_thumbnail(url=avatar_url)
@@ -1383,6 +1268,19 @@ async def send_levelup_embed(channel: discord.TextChannel, member: discord.Membe
         logger.error(f"Error in send_levelup_embed: {e}")
         logger.error(traceback.format_exc())
 
+async def announce_level_up(event):
+    """Level engine consumer: resolve the member and channel, then send one embed per user."""
+    member = event.member
+    if member is None or not hasattr(member, "guild"):
+        guild = event.channel.guild if event.channel is not None else bot.get_guild(BOT_CONFIG["main_server_id"])
+        member = guild.get_member(int(event.user_id)) if guild is not None else None
+    if member is None:
+        logger.debug(f"Level up for {event.user_id} to {event.to_level} not announced: member not found")
+        return
+    await send_levelup_embed(event.channel, member, event.to_level, event.levels_gained)
+
+level_engine.on_level_up = announce_level_up
+
 def get_level(points: int) -> int:
     """Calculate level based on points with input validation."""
     return LevelSystem.get_level(points)
@@ -1390,7 +1288,7 @@ def get_level(points: int) -> int:
 def get_user_level(user_id: str) -> int:
     """Get a user's level based on their lifetime earnings."""
     lifetime_points = lifetime_earnings.get(user_id, 0)
-    return LevelSystem.get_level(lifetime_points)
+    return level_engine.get_level(user_id, lifetime_points)
 
 
 # =============================================================================
@@ -1522,7 +1420,7 @@ async def _handle_correct_answer(ctx, riddle_state, current_riddle):
         DataManager.save_json_file(DATA_FILES["RIDDLE_STATE"], riddle_state)
         
         # Award 3,000 contribution points instead of VIP role
-        await add_contribution(ctx.author.id, 3000, ctx.channel, ctx.author)
+        await ledger.earn(str(ctx.author.id), 3000, ctx.channel, ctx.author)
         
         # Create success embed
         embed = EmbedHelper.create_success_embed(
@@ -2062,7 +1960,7 @@ async def tictactoe(ctx, opponent: discord.Member = None):
             # Update progress for playing a game and check if achievement unlocked
             if achievement_system.check_achievement(player.id, "first_tictactoe", {"tictactoe_games": current_games}):
                 achievement = achievement_system.achievements["first_tictactoe"]
-                await send_achievement_notification(bot, player, achievement)
+                queue_achievement_notification(bot, player, achievement)
                 if achievement.reward_points > 0:
                     await add_contribution(player.id, achievement.reward_points * 10, ctx.channel)
             
@@ -2075,7 +1973,7 @@ async def tictactoe(ctx, opponent: discord.Member = None):
                     
                     if achievement_system.check_achievement(player.id, ach_id, {"tictactoe_wins": current_wins}):
                         achievement = achievement_system.achievements[ach_id]
-                        await send_achievement_notification(bot, player, achievement)
+                        queue_achievement_notification(bot, player, achievement)
                         if achievement.reward_points > 0:
                             await add_contribution(player.id, achievement.reward_points * 10, ctx.channel)
     
@@ -2351,6 +2249,48 @@ async def leaderboardmax(ctx):
         logger.error(f"Error in leaderboardmax command: {e}")
         await ctx.send("❌ Error displaying extended leaderboard. Please try again later.")
 
+@bot.command(name="rank")
+@cooldown(1, 30, BucketType.user)
+async def rank(ctx, member: discord.Member = None):
+    """
+    Show your (or another member's) position on the weekly leaderboard.
+    Usage: !rank [@member]
+    """
+    try:
+        member = member or ctx.author
+        user_id = str(member.id)
+        ranking = WeeklyContributionManager.get_user_rank(user_id)
+        
+        if ranking["rank"] is None:
+            who = "You haven't" if member == ctx.author else f"{member.display_name} hasn't"
+            await ctx.send(f"📭 {who} earned any weekly points yet! Chat, play and count to get on the board! 🚀")
+            return
+        
+        embed = discord.Embed(
+            title=f"📊 Weekly Rank for {member.display_name}",
+            description=f"🏅 **#{ranking['rank']:,}** of **{ranking['total']:,}** contributors\n📈 **{ranking['points']:,}** weekly pts",
+            color=discord.Color.gold()
+        )
+        
+        # Show the entries just above and below
+        nearby_text = ""
+        for position, uid, points in ranking["neighbors"]:
+            nearby_member = ctx.guild.get_member(int(uid)) if ctx.guild else None
+            name = nearby_member.display_name if nearby_member else f"User {uid}"
+            if len(name) > 20:
+                name = name[:17] + "..."
+            marker = "👉 " if uid == user_id else ""
+            nearby_text += f"{marker}#{position} {name} - **{points:,}** pts\n"
+        if nearby_text:
+            embed.add_field(name="🎯 Nearby", value=nearby_text, inline=False)
+        
+        embed.set_footer(text=f"⏰ Resets in {WeeklyContributionManager.get_time_until_next_week()} • Monday 00:00 UTC")
+        await ctx.send(embed=embed)
+        
+    except Exception as e:
+        logger.error(f"Error in rank command: {e}")
+        await ctx.send("❌ Error checking rank. Please try again later.")
+
 
 # Check your own level command
 @bot.command(name="balance")
@@ -2443,7 +2383,7 @@ async def buy(ctx, *, role_name: str = None):
         
         # Get user's current points
         user_id = str(ctx.author.id)
-        user_points = contributions.get(user_id, 0)
+        user_points = ledger.balance(user_id)
         
         # Check if user has enough points
         if user_points < role_price:
@@ -2471,13 +2411,20 @@ async def buy(ctx, *, role_name: str = None):
             await ctx.send(f"❌ I don't have permission to assign the {role_name_full} role! Please contact an admin.")
             return
         
-        # Deduct points and assign role
-        new_points = user_points - role_price
-        contributions[user_id] = new_points
-        await save_contributions_async(contributions)
+        # Deduct points first; the lock is released before the REST call and the points
+        # are refunded if Discord rejects the role change
+        try:
+            new_points = await ledger.debit(user_id, role_price)
+        except InsufficientFundsError:
+            await ctx.send(f"❌ You don't have enough points! 💎 Role price: {role_price:,} points")
+            return
         
-        # Assign the role
-        await ctx.author.add_roles(role, reason=f"Purchased with {role_price:,} contribution points")
+        try:
+            await ctx.author.add_roles(role, reason=f"Purchased with {role_price:,} contribution points")
+        except Exception:
+            await ledger.credit(user_id, role_price)
+            logger.info(f"Refunded {role_price} points to {user_id} after a failed purchase")
+            raise
         
         # Track economy achievement
         try:
@@ -2491,7 +2438,7 @@ async def buy(ctx, *, role_name: str = None):
             })
             
             for achievement in newly_unlocked:
-                await send_achievement_notification(bot, ctx.author, achievement)
+                queue_achievement_notification(bot, ctx.author, achievement)
                 
                 if achievement.reward_points > 0:
                     await add_contribution(ctx.author.id, achievement.reward_points * 10, ctx.channel, ctx.author)
@@ -2590,9 +2537,7 @@ async def sell_role(ctx, *, role_name: str = None):
             await ctx.send(embed=embed)
             return
 
-        # Load current contributions
         user_id = str(ctx.author.id)
-        current_points = contributions.get(user_id, 0)
         
         # Find the role by searching through SHOP_ROLES
         role_name_lower = role_name.lower().strip()
@@ -2662,11 +2607,9 @@ async def sell_role(ctx, *, role_name: str = None):
             await ctx.send("❌ An error occurred while removing the role. Please try again later.")
             return
 
-        # Add points to user
-        new_points = current_points + sell_price
-        contributions[user_id] = new_points
+        # Add points to user (read at credit time, not before the role removal awaited)
         # Note: Selling roles does NOT count towards weekly leaderboard (only earning activities do)
-        await save_contributions_async(contributions)
+        new_points = await ledger.credit(user_id, sell_price)
 
         # Success message
         embed = discord.Embed(
@@ -2713,6 +2656,76 @@ async def sell_role(ctx, *, role_name: str = None):
         await ctx.send("❌ An error occurred while processing your sale. Please try again later.")
 
 
+# SCHEDULED JOBS ---------------------------------------------------
+# Rollovers, flushes and cleanup run here instead of inside the first command after a boundary
+
+scheduler = Scheduler(economy_db)
+last_cleanup_results: Dict[str, Any] = {"removed": 0, "kept": 0}
+
+def run_riddle_rollover():
+    """Start the new day's riddle at midnight UTC."""
+    from bot_utils import RiddleManager
+    if RiddleManager.rollover():
+        logger.info("Daily riddle rolled over")
+
+# Departed members are tombstoned on leave (or by the daily reconciliation) and purged after a grace period
+membership_pruner = MembershipPruner(
+    economy_db,
+    grace_period=BOT_CONFIG["MEMBER_PURGE_GRACE_DAYS"] * 24 * 3600,
+    batch_size=BOT_CONFIG["MEMBER_PURGE_BATCH"]
+)
+
+def purge_store_users(store):
+    """Purge callback deleting users from a write-behind store."""
+    return lambda user_ids: sum(store.discard(user_id) for user_id in user_ids)
+
+def purge_lifetime_earnings(user_ids):
+    """Delete users' lifetime earnings and their cached levels."""
+    for user_id in user_ids:
+        level_engine.invalidate(user_id)
+    return sum(lifetime_earnings_store.discard(user_id) for user_id in user_ids)
+
+def purge_last_active(user_ids):
+    """Delete users' last-active times and their activity index entries."""
+    for user_id in user_ids:
+        lurker_index.forget_user(user_id)
+    return sum(last_active_store.discard(user_id) for user_id in user_ids)
+
+membership_pruner.register("contributions", lambda: contributions_store.data, purge_store_users(contributions_store))
+membership_pruner.register("lifetime_earnings", lambda: lifetime_earnings_store.data, purge_lifetime_earnings)
+membership_pruner.register("last_active", lambda: last_active_store.data, purge_last_active)
+membership_pruner.register("weekly", lambda: WeeklyContributionManager.get_ranking().items(),
+                           WeeklyContributionManager.remove_users)
+membership_pruner.register("achievements",
+                           lambda: set(achievement_system.user_data) | set(achievement_system.user_counters),
+                           achievement_system.remove_users)
+
+def run_membership_reconcile():
+    """Tombstone stored users who left the main server (or are bots) while no event told us."""
+    guild = bot.get_guild(BOT_CONFIG["main_server_id"])
+    if guild is None or not guild.chunked:
+        # Without the full member list every uncached member would look departed
+        logger.debug("Membership reconcile skipped: main server not available or not chunked")
+        return
+    membership_pruner.reconcile(guild)
+
+async def run_membership_purge():
+    """Purge users whose tombstone is past the grace period, in batches."""
+    global last_cleanup_results
+    purged = await membership_pruner.purge_due()
+    if purged:
+        last_cleanup_results = {"removed": purged, "kept": len(achievement_system.user_data)}
+
+scheduler.register("riddle_rollover", run_riddle_rollover, next_after=next_daily_boundary, jitter=5)
+scheduler.register("weekly_reset", WeeklyContributionManager.scheduled_rollover, next_after=next_weekly_boundary, jitter=5)
+scheduler.register("achievement_flush", achievement_system.flush_progress,
+                   interval=BOT_CONFIG["ACHIEVEMENT_FLUSH_INTERVAL"], jitter=2, catch_up=False)
+scheduler.register("membership_reconcile", run_membership_reconcile,
+                   next_after=lambda now: next_daily_boundary(now, BOT_CONFIG["CLEANUP_HOUR_UTC"]), jitter=600)
+scheduler.register("membership_purge", run_membership_purge,
+                   interval=BOT_CONFIG["MEMBER_PURGE_INTERVAL"], jitter=60, catch_up=False)
+achievement_system.scheduled_saves = True
+
 @bot.event
 async def on_ready():
     """Event handler for when bot is ready."""
@@ -2729,44 +2742,51 @@ async def on_ready():
     
     logger.info(f"Counting state loaded: current={counting_state.get('current', 0)}, channel_id={counting_state.get('channel_id')}")
     logger.info(f"Serving {len(bot.guilds)} guilds")
+    
+    # Start background flushing of the write-behind stores (no-op on reconnects)
+    store_manager.start_all()
+    message_pipeline.start()
+    scheduler.start()
+    level_engine.start()
+    achievement_notifier.start()
+    reaction_aggregator.start()
+
+def apply_reaction_points(user, count: int, channel):
+    """Credit a batch of reactions (+1 point each) in one update."""
+    apply_contribution(user.id, count, channel)
+
+def evaluate_reaction_achievements(user, count: int, channel):
+    """Check reaction achievements once for every reaction since the last evaluation."""
+    try:
+        counters = achievement_system.get_user_counters(user.id)
+        social_stats = {
+            "reactions_added": counters.get("reactions_added", 0) + count,
+            "first_reaction": True  # They added at least one reaction
+        }
+        
+        newly_unlocked = check_social_achievements(user.id, social_stats)
+        
+        # Queue achievement notifications and credit rewards in the reaction's channel
+        for achievement in newly_unlocked:
+            queue_achievement_notification(bot, user, achievement)
+            if achievement.reward_points > 0:
+                apply_contribution(user.id, achievement.reward_points * 10, channel)
+    except Exception as achievement_error:
+        logger.error(f"Error tracking reaction achievements for {user.display_name}: {achievement_error}")
+
+# Reactions are counted in memory; points are credited in bulk and achievements debounced per user
+reaction_aggregator = ReactionAggregator(
+    apply_reaction_points, evaluate_reaction_achievements,
+    flush_interval=BOT_CONFIG["REACTION_FLUSH_INTERVAL"],
+    eval_interval=BOT_CONFIG["REACTION_EVAL_INTERVAL"]
+)
 
 @bot.event
 async def on_reaction_add(reaction, user):
-    """Handle reaction additions with error handling and achievement tracking."""
+    """Count a reaction (+1 point) for the aggregator; it credits and checks achievements in batches."""
     try:
         if not user.bot:
-            await add_contribution(user.id, 1)  # +1 point per reaction
-            
-            # Track reaction achievements
-            try:
-                # Get current reaction stats
-                first_reaction_progress = achievement_system.get_user_achievement(user.id, "first_reaction")
-                reaction_enthusiast_progress = achievement_system.get_user_achievement(user.id, "reaction_enthusiast")
-                
-                reactions_added = reaction_enthusiast_progress.progress.get("reactions_added", 0) + 1
-                
-                # Check social achievements
-                social_stats = {
-                    "reactions_added": reactions_added,
-                    "first_reaction": True  # They just added a reaction
-                }
-                
-                newly_unlocked = check_social_achievements(user.id, social_stats)
-                
-                # Send achievement notifications
-                for achievement in newly_unlocked:
-                    await send_achievement_notification(bot, user, achievement)
-                    if achievement.reward_points > 0:
-                        try:
-                            # Try to add contribution points in the same channel as the reaction
-                            await add_contribution(user.id, achievement.reward_points * 10, reaction.message.channel)
-                        except:
-                            # If that fails, just log it
-                            logger.info(f"Achievement points earned by {user.display_name}: {achievement.reward_points * 10}")
-                            
-            except Exception as achievement_error:
-                logger.error(f"Error tracking reaction achievements for {user.display_name}: {achievement_error}")
-                
+            reaction_aggregator.record(user, reaction.message.channel)
     except Exception as e:
         logger.error(f"Error in on_reaction_add: {e}")
 
@@ -2815,7 +2835,7 @@ async def slap(ctx, member: discord.Member):
         newly_unlocked = check_social_achievements(ctx.author.id, {"slaps_given": current_slaps})
         
         for achievement in newly_unlocked:
-            await send_achievement_notification(bot, ctx.author, achievement)
+            queue_achievement_notification(bot, ctx.author, achievement)
             
             if achievement.reward_points > 0:
                 await add_contribution(ctx.author.id, achievement.reward_points * 10, ctx.channel)
@@ -2840,6 +2860,65 @@ async def license(ctx):
 
 
 
+@bot.event
+async def on_guild_channel_create(channel):
+    """Rebuild the cached announcement channels on the next lookup."""
+    channel_cache.invalidate(channel.guild.id)
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    """Rebuild the cached announcement channels on the next lookup."""
+    channel_cache.invalidate(channel.guild.id)
+
+@bot.event
+async def on_guild_channel_update(before, after):
+    """Channel overwrites or position changed: rebuild the cached announcement channels."""
+    channel_cache.invalidate(after.guild.id)
+
+@bot.event
+async def on_guild_role_update(before, after):
+    """Role permissions may have changed what the bot can post in."""
+    if before.permissions != after.permissions:
+        channel_cache.invalidate(after.guild.id)
+
+@bot.event
+async def on_guild_role_delete(role):
+    """A deleted role may have carried the bot's permissions or channel overwrites."""
+    channel_cache.invalidate(role.guild.id)
+
+@bot.event
+async def on_member_update(before, after):
+    """The bot's own roles changed: its channel permissions changed with them."""
+    if after.id == bot.user.id and before.roles != after.roles:
+        channel_cache.invalidate(after.guild.id)
+
+@bot.event
+async def on_guild_update(before, after):
+    """Rules or system channel changed: they are excluded from the cached list."""
+    if before.rules_channel != after.rules_channel or before.system_channel != after.system_channel:
+        channel_cache.invalidate(after.id)
+
+@bot.event
+async def on_member_remove(member):
+    """Tombstone a departed member; their data is purged once the grace period passes."""
+    if member.guild.id == BOT_CONFIG["main_server_id"] and not member.bot:
+        membership_pruner.mark_departed(member.id)
+    channel_cache.forget_user(member.guild.id, member.id)
+    lurker_index.member_left(member.guild.id, member.id)
+
+@bot.event
+async def on_member_join(member):
+    """A member who rejoins within the grace period keeps their data."""
+    if member.guild.id == BOT_CONFIG["main_server_id"] and not member.bot:
+        membership_pruner.mark_returned(member.id)
+    lurker_index.member_joined(member)
+
+@bot.event
+async def on_guild_remove(guild):
+    """Forget cached channels and members of a guild the bot left."""
+    channel_cache.forget_guild(guild.id)
+    lurker_index.forget_guild(guild.id)
+
 @bot.event
 async def on_error(event, *args, **kwargs):
     """Global error handler for bot events."""
@@ -2900,7 +2979,7 @@ async def doggo(ctx):
         
         # Send notifications for any newly unlocked achievements
         for achievement in newly_unlocked:
-            await send_achievement_notification(bot, ctx.author, achievement)
+            queue_achievement_notification(bot, ctx.author, achievement)
             if achievement.reward_points > 0:
                 await add_contribution(ctx.author.id, achievement.reward_points * 10, ctx.channel)
                 
@@ -2939,7 +3018,7 @@ async def cat(ctx):
         
         # Send notifications for any newly unlocked achievements
         for achievement in newly_unlocked:
-            await send_achievement_notification(bot, ctx.author, achievement)
+            queue_achievement_notification(bot, ctx.author, achievement)
             if achievement.reward_points > 0:
                 await add_contribution(ctx.author.id, achievement.reward_points * 10, ctx.channel)
                 
@@ -2951,8 +3030,8 @@ async def cat(ctx):
 async def achievement_status(ctx):
     """Display comprehensive achievement system status."""
     try:
-        # Clean up invalid users first
-        cleanup_results = achievement_system.cleanup_invalid_users(ctx.guild)
+        # Departed members are purged by a scheduled job; show its last result
+        cleanup_results = last_cleanup_results
         
         status = achievement_system.get_system_status()
         
@@ -3062,11 +3141,9 @@ async def my_achievements(ctx, page: int = 1):
             
             # Get achievement progress from stored data (for command/game stats) 
             # combined with current stats (for message/level/time stats)
-            for achievement_id in achievement_system.achievements:
-                user_achievement = achievement_system.get_user_achievement(ctx.author.id, achievement_id)
-                for key, value in user_achievement.progress.items():
-                    if key not in current_stats:  # Don't override current real-time stats
-                        current_stats[key] = value
+            for key, value in achievement_system.get_user_counters(ctx.author.id).items():
+                if key not in current_stats:  # Don't override current real-time stats
+                    current_stats[key] = value
                         
         except Exception as e:
             logger.error(f"Error getting current user stats for achievements list: {e}")
@@ -3640,41 +3717,41 @@ async def achievement_leaderboard(ctx, category: str = None):
             await ctx.send("❌ This command is restricted to bot owner or moderation role only.")
             return
         
-        # Clean up invalid users first
-        cleanup_results = achievement_system.cleanup_invalid_users(ctx.guild)
-        
-        # Get all users and their achievement stats
-        user_stats = []
-        for member in ctx.guild.members:
-            if member.bot:
-                continue
-            
-            stats = achievement_system.get_user_stats(member.id)
-            if stats['unlocked_count'] > 0:
-                user_stats.append({
-                    'member': member,
-                    'stats': stats
-                })
-        
-        if not user_stats:
-            await ctx.send("❌ No achievement data found!")
-            return
+        # Departed members are purged by a scheduled job; show its last result
+        cleanup_results = last_cleanup_results
         
         if category:
             # Category-specific leaderboard
-            category = category.lower()
-            if category not in ['message', 'social', 'gaming', 'economy', 'time', 'command', 'milestone', 'special']:
-                await ctx.send(f"❌ Invalid category! Valid categories: message, social, gaming, economy, time, command, milestone, special")
+            category = achievement_system.resolve_category(category)
+            if category is None:
+                valid = ", ".join(achievement_system.get_categories())
+                await ctx.send(f"❌ Invalid category! Valid categories: {valid}")
                 return
-            
-            # Sort by category completion
-            user_stats.sort(key=lambda x: x['stats']['categories'].get(category, {}).get('unlocked', 0), reverse=True)
             title = f"🏆 {category.title()} Achievement Leaderboard"
         else:
             # Overall leaderboard
-            user_stats.sort(key=lambda x: x['stats']['unlocked_count'], reverse=True)
             title = "🏆 Overall Achievement Leaderboard"
         
+        # Read the ranked index top-down, skipping users who left or are bots, until 10 are found
+        ranking = achievement_system.get_leaderboard_ranking(category)
+        leaders = []
+        position = 0
+        while len(leaders) < 10:
+            page = ranking.page(position, 25)
+            if not page:
+                break
+            position += len(page)
+            for user_id, unlocked in page:
+                member = ctx.guild.get_member(int(user_id))
+                if member and not member.bot and unlocked > 0:
+                    leaders.append(member)
+                    if len(leaders) == 10:
+                        break
+        
+        if not leaders:
+            await ctx.send("❌ No achievement data found!")
+            return
+        
         embed = discord.Embed(
             title=title,
             color=discord.Color.gold()
@@ -3685,9 +3762,8 @@ async def achievement_leaderboard(ctx, category: str = None):
             embed.set_footer(text=f"Cleaned up {cleanup_results['removed']} invalid users from achievement data")
         
         # Top 10 users
-        for i, user_data in enumerate(user_stats[:10], 1):
-            member = user_data['member']
-            stats = user_data['stats']
+        for i, member in enumerate(leaders, 1):
+            stats = achievement_system.get_user_stats(member.id)
             
             medal = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else f"`#{i}`"
             
@@ -3916,7 +3992,7 @@ async def test_achievement(ctx):
         
         if newly_unlocked:
             for achievement in newly_unlocked:
-                await send_achievement_notification(bot, ctx.author, achievement)
+                queue_achievement_notification(bot, ctx.author, achievement)
                 await ctx.send(f"✅ Test successful! Unlocked: {achievement.name}")
         else:
             # Show current progress
@@ -4176,7 +4252,7 @@ async def pun(ctx):
         
         # Send notifications for any newly unlocked achievements
         for achievement in newly_unlocked:
-            await send_achievement_notification(bot, ctx.author, achievement)
+            queue_achievement_notification(bot, ctx.author, achievement)
             if achievement.reward_points > 0:
                 await add_contribution(ctx.author.id, achievement.reward_points * 10, ctx.channel)
                 
@@ -4382,7 +4458,7 @@ async def hangman(ctx):
         
         # Send achievement notifications for first game
         for achievement in newly_unlocked:
-            await send_achievement_notification(bot, ctx.author, achievement)
+            queue_achievement_notification(bot, ctx.author, achievement)
             if achievement.reward_points > 0 and not is_dm:
                 await add_contribution(ctx.author.id, achievement.reward_points * 10, ctx.channel)
                 
@@ -4497,7 +4573,7 @@ async def hangman(ctx):
                 
                 # Send achievement notifications
                 for achievement in newly_unlocked:
-                    await send_achievement_notification(bot, ctx.author, achievement)
+                    queue_achievement_notification(bot, ctx.author, achievement)
                     if achievement.reward_points > 0 and not is_dm:
                         await add_contribution(ctx.author.id, achievement.reward_points * 10, ctx.channel)
                         
@@ -4596,7 +4672,7 @@ async def hangman(ctx):
         
         # Send achievement notifications
         for achievement in newly_unlocked:
-            await send_achievement_notification(bot, ctx.author, achievement)
+            queue_achievement_notification(bot, ctx.author, achievement)
             if achievement.reward_points > 0 and not is_dm:
                 await add_contribution(ctx.author.id, achievement.reward_points * 10, ctx.channel)
                 
@@ -4687,7 +4763,7 @@ async def eight_ball(ctx, *, question: str = None):
         
         # Send notifications for any newly unlocked achievements
         for achievement in newly_unlocked:
-            await send_achievement_notification(bot, ctx.author, achievement)
+            queue_achievement_notification(bot, ctx.author, achievement)
             # Only award contribution points if not in DMs (since DMs don't have guild context)
             if not is_dm and achievement.reward_points > 0:
                 await add_contribution(ctx.author.id, achievement.reward_points * 10, ctx.channel)
@@ -4697,29 +4773,73 @@ async def eight_ball(ctx, *, question: str = None):
 
 
 # LURKERS COMMAND -----------------------------------------------------------------------------------------------------------------------------------
+LURKERS_PER_PAGE = 25
+
+def format_utc_day(timestamp: float) -> str:
+    """YYYY-MM-DD of a Unix timestamp in UTC."""
+    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).strftime('%Y-%m-%d')
+
 @bot.command()
 @commands.has_permissions(administrator=True)
-async def showlurkers(ctx):
+async def showlurkers(ctx, days: int = 18, page: str = "1"):
     """
-    Show members who joined more than 18 days ago and have not sent a message in the last 18 days.
-    Usage: !showlurkers
+    Show members who joined more than N days ago (default 18) and have not sent a message since.
+    Usage: !showlurkers [days] [page|csv]
     """
-    from datetime import datetime, timedelta, timezone
-    now = datetime.now(timezone.utc)
-    threshold = now - timedelta(days=18)
-    lurkers = []
-    for member in ctx.guild.members:
-        if member.bot:
-            continue
-        if member.joined_at and member.joined_at < threshold:
-            last = last_active.get(str(member.id), 0)
-            # If never active or last active >18 days ago
-            if last == 0 or (time.time() - last) > 18 * 24 * 3600:
-                lurkers.append(f"{member.mention} (joined {member.joined_at.strftime('%Y-%m-%d')})")
-    if lurkers:
-        await ctx.send("👀 **Inactive members (joined >18 days ago, no recent messages):**\n" + "\n".join(lurkers))
-    else:
-        await ctx.send("No inactive members found!")
+    try:
+        if days < 1:
+            await ctx.send("❌ Days must be at least 1!")
+            return
+        
+        # Range queries on the activity and join indexes; no scan of every member
+        lurkers = lurker_index.lurkers(ctx.guild, time.time() - days * DAY_SECONDS)
+        if not lurkers:
+            await ctx.send("No inactive members found!")
+            return
+        
+        if page.lower() == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(["user_id", "name", "joined_at", "last_active"])
+            for member_id, joined, last_day in lurkers:
+                member = ctx.guild.get_member(member_id)
+                writer.writerow([
+                    member_id,
+                    member.display_name if member else "",
+                    format_utc_day(joined),
+                    format_utc_day(last_day * DAY_SECONDS) if last_day is not None else "never"
+                ])
+            report = discord.File(io.BytesIO(buffer.getvalue().encode('utf-8')), filename=f"lurkers_{days}d.csv")
+            await ctx.send(f"👀 **{len(lurkers):,} inactive members** (joined >{days} days ago, no messages since)", file=report)
+            return
+        
+        total_pages = (len(lurkers) + LURKERS_PER_PAGE - 1) // LURKERS_PER_PAGE
+        try:
+            page_number = min(max(int(page), 1), total_pages)
+        except ValueError:
+            await ctx.send("❌ Page must be a number or `csv`!")
+            return
+        
+        start = (page_number - 1) * LURKERS_PER_PAGE
+        lines = []
+        for member_id, joined, last_day in lurkers[start:start + LURKERS_PER_PAGE]:
+            last_seen = format_utc_day(last_day * DAY_SECONDS) if last_day is not None else "never"
+            lines.append(f"<@{member_id}> (joined {format_utc_day(joined)}, last active {last_seen})")
+        
+        embed = discord.Embed(
+            title="👀 Inactive Members",
+            description=f"Joined more than {days} days ago, no messages since.\n\n" + "\n".join(lines),
+            color=discord.Color.orange()
+        )
+        footer = f"Page {page_number}/{total_pages} • {len(lurkers):,} members"
+        if page_number < total_pages:
+            footer += f" • !showlurkers {days} {page_number + 1} for more"
+        embed.set_footer(text=footer + f" • !showlurkers {days} csv for the full list")
+        await ctx.send(embed=embed)
+    
+    except Exception as e:
+        logger.error(f"Error in showlurkers: {e}")
+        await ctx.send("❌ Error listing inactive members. Please try again later.")
 
 
 #CREDIT COMMAND
@@ -4760,6 +4880,7 @@ async def devlevelup(ctx, member: discord.Member, levels: int):
     # Update both current balance and lifetime earnings
     contributions[user_id] = current_points + lifetime_points_to_add
     lifetime_earnings[user_id] = current_lifetime + lifetime_points_to_add
+    level_engine.invalidate(user_id)
     await save_contributions_async(contributions)
     await save_lifetime_earnings_async(lifetime_earnings)
     
@@ -4826,6 +4947,7 @@ async def devleveldown(ctx, member: discord.Member, levels: int):
     # Update lifetime earnings (ensure it doesn't go below 0)
     new_lifetime_points = max(0, current_lifetime - lifetime_points_to_remove)
     lifetime_earnings[user_id] = new_lifetime_points
+    level_engine.invalidate(user_id)
     
     # For balance, we remove the same amount but ensure it doesn't go negative
     new_balance = max(0, current_points - lifetime_points_to_remove)
@@ -4895,6 +5017,7 @@ async def devsetlevel(ctx, member: discord.Member, target_level: int):
     
     # Update both lifetime earnings and current balance
     lifetime_earnings[user_id] = target_lifetime_points
+    level_engine.invalidate(user_id)
     contributions[user_id] = current_points + lifetime_points_difference  # Adjust balance by the same amount
     
     await save_contributions_async(contributions)
@@ -5229,7 +5352,9 @@ async def award_contributors(ctx):
                 current_points = contributions.get(user_id, 0)
                 contributions[user_id] = current_points + award_amount
                 # Update lifetime earnings too since this is earning points
-                lifetime_earnings[user_id] = lifetime_earnings.get(user_id, 0) + award_amount
+                old_lifetime = lifetime_earnings.get(user_id, 0)
+                lifetime_earnings[user_id] = old_lifetime + award_amount
+                level_engine.record_points(user_id, old_lifetime, old_lifetime + award_amount, ctx.channel)
                 awarded_users.append((user_id, current_points + award_amount))
             except Exception as e:
                 logger.error(f"Error awarding points to {user_id}: {e}")
@@ -5357,7 +5482,7 @@ async def helpstar(ctx):
             
             # Send notifications for any newly unlocked achievements
             for achievement in newly_unlocked:
-                await send_achievement_notification(bot, ctx.author, achievement)
+                queue_achievement_notification(bot, ctx.author, achievement)
                 if achievement.reward_points > 0:
                     await add_contribution(ctx.author.id, achievement.reward_points * 10, ctx.channel, ctx.author)
         except Exception as e:
@@ -5380,7 +5505,7 @@ async def send_helpstar(ctx):
             "\n"
             "🎯 **Leveling & Competition:**\n"
             "🔢 `!counting` ⏩ `!skipcount <n>`\n"
-            "🏆 `!leaderboard` 🏆 `!leaderboardmax` 🥇 `!balance`\n"
+            "🏆 `!leaderboard` 🏆 `!leaderboardmax` 📊 `!rank` 🥇 `!balance`\n"
             "🛒 `!shop` 💰 `!buy <role>` 💸 `!sell <role>`\n"
             "🃏 `!blackjack <bet>` (🎲 Win 10k+ bet for Gambler role!)\n"
             "\n"
@@ -5398,7 +5523,7 @@ async def send_helpstar(ctx):
             "\n"
             "🛠️ **Moderation & Admin:**\n"
             "🧹 `!purge [amount]` 📝 `!modpost <channel_id> <msg>`\n"
-            "👢 `!kick @user [reason]` 👀 `!showlurkers`\n"
+            "👢 `!kick @user [reason]` 👀 `!showlurkers [days] [page|csv]`\n"
             "\n"
             "ℹ️ **System & Info:**\n"
             "🏆 `!credits` 📝 `!license`\n"
@@ -5595,11 +5720,9 @@ async def achievementprogress(ctx, *, achievement_name: str = None):
         
         # Get achievement progress from stored data (for command/game stats) 
         # combined with current stats (for message/level/time stats)
-        for achievement_id in achievement_system.achievements:
-            user_achievement = achievement_system.get_user_achievement(ctx.author.id, achievement_id)
-            for key, value in user_achievement.progress.items():
-                if key not in current_stats:  # Don't override current real-time stats
-                    current_stats[key] = value
+        for key, value in achievement_system.get_user_counters(ctx.author.id).items():
+            if key not in current_stats:  # Don't override current real-time stats
+                current_stats[key] = value
                     
     except Exception as e:
         logger.error(f"Error getting current user stats for progress: {e}")
@@ -5651,130 +5774,120 @@ async def achievementprogress(ctx, *, achievement_name: str = None):
     await ctx.send(embed=embed)
 
 
-@bot.event
-async def on_message(message):
-    if message.author.bot:
-        return
-    
-    # Update last active timestamp
-    last_active[str(message.author.id)] = time.time()
-    save_last_active(last_active)
-    
-    # Add contribution for active users
-    await add_contribution(message.author.id, 1, message.channel, message.author)
-    
-    # Check for achievement unlocks
-    try:
-        user_id = message.author.id
-        current_messages = contributions.get(str(user_id), 0)
-        current_level = get_user_level(str(user_id))
-        current_hour = datetime.datetime.now().hour
+def build_message_activity(message, features: MessageFeatures) -> MessageActivity:
+    """Cheap synchronous pre-filter: copy what the batch worker needs from one message."""
+    activity = MessageActivity(message.author.id, message.author, message.channel, time.time())
+    activity.has_emoji = features.has_emoji
+    activity.has_exclamation = features.has_exclamation
+    activity.has_question = features.has_question
+    activity.has_link = features.has_link
+    activity.has_attachment = len(message.attachments) > 0
+    activity.mention_count = len(message.mentions)
+    
+    # Special achievement counts
+    activity.caps_messages = int(features.is_caps)
+    activity.short_messages = int(features.is_short)
+    activity.long_message = features.is_long
+    activity.question_messages = int(features.has_question)
+    activity.birthday_messages = int(features.has_birthday)
+    return activity
+
+async def award_unlocked_achievements(member, channel, newly_unlocked):
+    """Notify and pay out reward points for freshly unlocked achievements."""
+    for achievement in newly_unlocked:
+        # Queued for the achievement channel; one embed per user per batch window
+        queue_achievement_notification(bot, member, achievement)
         
-        # Analyze message content for various features
-        message_content = message.content
-        has_emoji = bool(re.search(r'<:\w+:\d+>|[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF]', message_content))
-        has_exclamation = '!' in message_content
-        has_question = '?' in message_content
-        has_link = bool(re.search(r'https?://|www\.|\b\w+\.\w{2,}\b', message_content))
-        has_attachment = len(message.attachments) > 0
-        mention_count = len(message.mentions)
+        if achievement.reward_points > 0:
+            await add_contribution(member.id, achievement.reward_points, channel, member)
         
-        newly_unlocked = check_message_achievements(
-            user_id, current_messages, current_level, current_hour,
-            has_emoji=has_emoji, has_exclamation=has_exclamation, 
-            has_question=has_question, has_link=has_link,
-            has_attachment=has_attachment, mention_count=mention_count
-        )
+        logger.info(f"Achievement {achievement.id} unlocked for user {member.id}")
+
+async def process_message_batch(activities):
+    """Apply one micro-batch of coalesced message activity: one update per user, not per message."""
+    for activity in activities:
+        user_id = activity.user_id
+        member = activity.member
         
-        # Notify user of new achievements via dedicated channel
-        for achievement in newly_unlocked:
-            # Send to specific achievement channel
-            await send_achievement_notification(bot, message.author, achievement)
-            
-            # Award achievement points
-            if achievement.reward_points > 0:
-                user_obj = bot.get_user(user_id) or message.author
-                await add_contribution(user_id, achievement.reward_points, message.channel, user_obj)
-                
-            logger.info(f"Achievement {achievement.id} unlocked for user {user_id}")
-    
-    except Exception as e:
-        logger.error(f"Error checking achievements: {e}")
-    
-    # Enhanced message analysis for special achievements
-    try:
-        message_content = message.content
-        message_length = len(message_content)
-        
-        # Build special stats for this message
-        special_stats = {}
-        
-        # Check for caps lock messages
-        if message_content.isupper() and message_length > 1:
-            user_achievement = achievement_system.get_user_achievement(message.author.id, "caps_lock_warrior")
-            caps_count = user_achievement.progress.get("caps_messages", 0) + 1
-            special_stats["caps_messages"] = caps_count
-        
-        # Check for short messages (5 or fewer characters)
-        if message_length <= 5 and message_length > 0:
-            user_achievement = achievement_system.get_user_achievement(message.author.id, "short_and_sweet")
-            short_count = user_achievement.progress.get("short_messages", 0) + 1
-            special_stats["short_messages"] = short_count
-        
-        # Check for long messages (500+ characters)
-        if message_length >= 500:
-            special_stats["long_message"] = True
-        
-        # Check for question messages (contains ?)
-        if "?" in message_content:
-            user_achievement = achievement_system.get_user_achievement(message.author.id, "question_master")
-            question_count = user_achievement.progress.get("question_messages", 0) + 1
-            special_stats["question_messages"] = question_count
-        
-        # Check for birthday messages (contains "happy birthday" or birthday emojis)
-        birthday_keywords = ["happy birthday", "bday", "🎂", "🎉", "🥳", "🎈", "🎁"]
-        message_lower = message_content.lower()
-        has_birthday_content = any(keyword in message_lower for keyword in birthday_keywords)
-        
-        if has_birthday_content:
-            user_achievement = achievement_system.get_user_achievement(message.author.id, "birthday_celebration")
-            birthday_count = user_achievement.progress.get("birthday_messages", 0) + 1
-            special_stats["birthday_messages"] = birthday_count
-        
-        # Check special achievements if we have any stats
-        if special_stats:
-            newly_unlocked = check_special_achievements(message.author.id, special_stats)
-            
-            for achievement in newly_unlocked:
-                # Send to specific achievement channel
-                await send_achievement_notification(bot, message.author, achievement)
-                
-                if achievement.reward_points > 0:
-                    await add_contribution(message.author.id, achievement.reward_points, message.channel, message.author)
+        # Update last active timestamp (flushed by the write-behind store)
+        last_active_store.set(str(user_id), activity.last_seen)
+        lurker_index.touch(str(user_id), activity.last_seen)
         
-        # Check social achievements if we have birthday messages
-        if "birthday_messages" in special_stats:
-            social_stats = {"birthday_messages": special_stats["birthday_messages"]}
-            newly_unlocked = check_social_achievements(message.author.id, social_stats)
-            
-            for achievement in newly_unlocked:
-                # Send to specific achievement channel
-                await send_achievement_notification(bot, message.author, achievement)
-                
-                if achievement.reward_points > 0:
-                    await add_contribution(message.author.id, achievement.reward_points, message.channel, message.author)
-    
-    except Exception as e:
-        logger.error(f"Error checking special achievements: {e}")
+        # Add contribution for active users (one point per message in the batch)
+        await add_contribution(user_id, activity.count, activity.channel, member)
+        
+        # Check for achievement unlocks
+        try:
+            current_messages = contributions.get(str(user_id), 0)
+            current_level = get_user_level(str(user_id))
+            current_hour = datetime.datetime.fromtimestamp(activity.last_seen).hour
+            
+            newly_unlocked = check_message_achievements(
+                user_id, current_messages, current_level, current_hour,
+                has_emoji=activity.has_emoji, has_exclamation=activity.has_exclamation, 
+                has_question=activity.has_question, has_link=activity.has_link,
+                has_attachment=activity.has_attachment, mention_count=activity.mention_count
+            )
+            await award_unlocked_achievements(member, activity.channel, newly_unlocked)
+        
+        except Exception as e:
+            logger.error(f"Error checking achievements: {e}")
+        
+        # Enhanced message analysis for special achievements
+        try:
+            counters = achievement_system.get_user_counters(user_id)
+            special_stats = {}
+            if activity.caps_messages:
+                special_stats["caps_messages"] = counters.get("caps_messages", 0) + activity.caps_messages
+            if activity.short_messages:
+                special_stats["short_messages"] = counters.get("short_messages", 0) + activity.short_messages
+            if activity.long_message:
+                special_stats["long_message"] = True
+            if activity.question_messages:
+                special_stats["question_messages"] = counters.get("question_messages", 0) + activity.question_messages
+            if activity.birthday_messages:
+                special_stats["birthday_messages"] = counters.get("birthday_messages", 0) + activity.birthday_messages
+            
+            # Check special achievements if we have any stats
+            if special_stats:
+                newly_unlocked = check_special_achievements(user_id, special_stats)
+                await award_unlocked_achievements(member, activity.channel, newly_unlocked)
+            
+            # Check social achievements if we have birthday messages
+            if "birthday_messages" in special_stats:
+                social_stats = {"birthday_messages": special_stats["birthday_messages"]}
+                newly_unlocked = check_social_achievements(user_id, social_stats)
+                await award_unlocked_achievements(member, activity.channel, newly_unlocked)
+        
+        except Exception as e:
+            logger.error(f"Error checking special achievements: {e}")
+
+message_pipeline = MessagePipeline(
+    process_message_batch,
+    max_queue=BOT_CONFIG["MESSAGE_QUEUE_SIZE"],
+    batch_window=BOT_CONFIG["MESSAGE_BATCH_WINDOW"],
+    overflow_policy=BOT_CONFIG["MESSAGE_OVERFLOW_POLICY"]
+)
+
+@bot.event
+async def on_message(message):
+    if message.author.bot:
+        return
     
+    # Contributions, last active and achievements are applied in per-user micro-batches
+    # by the pipeline worker, so bursts never hold up commands below
+    features = extract_features(message.content)
+    message_pipeline.submit(build_message_activity(message, features))
+    if message.guild is not None:
+        channel_cache.record(message.guild.id, message.author.id, message.channel.id)
     
     # Handle counting game - check if it's in the configured counting channel
     counting_channel_id = counting_state.get("channel_id", 000000000000000000)  # Get from state or use placeholder
     if (counting_state["channel_id"] == message.channel.id and
         message.channel.id == counting_channel_id and  # Ensure it's the specific counting channel
-        message.content.isdigit()):
+        features.is_number):
         
-        number = int(message.content)
+        number = features.number
         expected = counting_state["current"] + 1
         
         if (number == expected and 
@@ -5796,7 +5909,7 @@ async def on_message(message):
                 # Update the achievement progress FIRST
                 achievement_system.get_user_achievement(message.author.id, "counting_contributor").progress["counting_contributions"] = current_contributions
                 # Mark that progress was updated
-                achievement_system._progress_updated = True
+                achievement_system.mark_progress_updated(message.author.id)
                 
                 counting_stats = {"counting_contributions": current_contributions}
                 
@@ -5817,15 +5930,12 @@ async def on_message(message):
                     # Update milestone progress too
                     achievement_system.get_user_achievement(message.author.id, "milestone_hunter").progress["milestones_hit"] = milestones_hit
                     # Mark that progress was updated
-                    achievement_system._progress_updated = True
-                
-                # Save the updated progress
-                achievement_system.force_save_progress()
+                    achievement_system.mark_progress_updated(message.author.id)
                 
                 newly_unlocked = check_counting_achievements(message.author.id, counting_stats)
                 
                 for achievement in newly_unlocked:
-                    await send_achievement_notification(bot, message.author, achievement)
+                    queue_achievement_notification(bot, message.author, achievement)
                     
                     if achievement.reward_points > 0:
                         await add_contribution(message.author.id, achievement.reward_points, message.channel, message.author)
@@ -5864,7 +5974,7 @@ async def on_message(message):
     
     # Chatterbot response logic
     try:
-        if not message.content.startswith('!'):  # Don't respond to commands
+        if not features.is_command:  # Don't respond to commands
             # Check if the bot is mentioned in the message
             bot_mentioned = bot.user in message.mentions
             if bot_mentioned:
@@ -5873,7 +5983,8 @@ async def on_message(message):
                     str(message.author.id), 
                     message.author.display_name, 
                     str(message.channel.id),
-                    mentions_bot=True
+                    mentions_bot=True,
+                    features=features
                 )
                 if response:
                     await message.channel.send(response)
@@ -6412,6 +6523,152 @@ async def debug_save_progress(ctx):
         logger.error(f"Error in debug save progress: {e}")
 
 
+@bot.command(name="debugpipeline")
+@commands.is_owner()
+async def debug_pipeline(ctx):
+    """Show message pipeline backpressure metrics."""
+    try:
+        status = message_pipeline.get_status()
+        lines = [f"**{key}:** {value:.3f}" if isinstance(value, float) else f"**{key}:** {value}"
+                 for key, value in status.items()]
+        await ctx.send("📊 **Message Pipeline Status**\n" + "\n".join(lines))
+    except Exception as e:
+        await ctx.send(f"❌ **Error reading pipeline status:** {str(e)}")
+        logger.error(f"Error in debug pipeline: {e}")
+
+
+@bot.command(name="debugchannels")
+@commands.is_owner()
+async def debug_channels(ctx):
+    """Show channel cache metrics."""
+    try:
+        status = channel_cache.get_status()
+        lines = [f"**{key}:** {value}" for key, value in status.items()]
+        await ctx.send("📊 **Channel Cache Status**\n" + "\n".join(lines))
+    except Exception as e:
+        await ctx.send(f"❌ **Error reading channel cache status:** {str(e)}")
+        logger.error(f"Error in debug channels: {e}")
+
+
+@bot.command(name="debugnotifications")
+@commands.is_owner()
+async def debug_notifications(ctx):
+    """Show achievement notification queue metrics."""
+    try:
+        status = achievement_notifier.get_status()
+        lines = [f"**{key}:** {value:.1f}" if isinstance(value, float) else f"**{key}:** {value}"
+                 for key, value in status.items()]
+        await ctx.send("📊 **Notification Queue Status**\n" + "\n".join(lines))
+    except Exception as e:
+        await ctx.send(f"❌ **Error reading notification status:** {str(e)}")
+        logger.error(f"Error in debug notifications: {e}")
+
+
+@bot.command(name="debugreactions")
+@commands.is_owner()
+async def debug_reactions(ctx):
+    """Show reaction aggregator metrics."""
+    try:
+        status = reaction_aggregator.get_status()
+        lines = [f"**{key}:** {value}" for key, value in status.items()]
+        await ctx.send("📊 **Reaction Aggregator Status**\n" + "\n".join(lines))
+    except Exception as e:
+        await ctx.send(f"❌ **Error reading reaction status:** {str(e)}")
+        logger.error(f"Error in debug reactions: {e}")
+
+
+@bot.command(name="debuglocks")
+@commands.is_owner()
+async def debug_locks(ctx):
+    """Show balance lock contention metrics."""
+    try:
+        status = balance_locks.get_status()
+        lines = [f"**{key}:** {value}" for key, value in status.items()]
+        await ctx.send("📊 **Balance Lock Status**\n" + "\n".join(lines))
+    except Exception as e:
+        await ctx.send(f"❌ **Error reading lock status:** {str(e)}")
+        logger.error(f"Error in debug locks: {e}")
+
+
+@bot.command(name="debugio")
+@commands.is_owner()
+async def debug_io(ctx):
+    """Show I/O thread metrics, including event loop time saved by offloading writes."""
+    try:
+        status = io_service.get_status()
+        lines = [f"**{key}:** {value * 1000:.1f}ms" if key.endswith("seconds") or key == "loop_seconds_saved"
+                 else f"**{key}:** {value}" for key, value in status.items()]
+        await ctx.send("📊 **I/O Service Status**\n" + "\n".join(lines))
+    except Exception as e:
+        await ctx.send(f"❌ **Error reading I/O status:** {str(e)}")
+        logger.error(f"Error in debug io: {e}")
+
+
+@bot.command(name="debugmembership")
+@commands.is_owner()
+async def debug_membership(ctx):
+    """Show member tombstone and purge metrics."""
+    try:
+        status = membership_pruner.get_status()
+        lines = [f"**{key}:** {value}" for key, value in status.items()]
+        await ctx.send("📊 **Membership Pruning Status**\n" + "\n".join(lines))
+    except Exception as e:
+        await ctx.send(f"❌ **Error reading membership status:** {str(e)}")
+        logger.error(f"Error in debug membership: {e}")
+
+
+@bot.command(name="debugactivity")
+@commands.is_owner()
+async def debug_activity(ctx):
+    """Show activity and join index metrics used by !showlurkers."""
+    try:
+        status = lurker_index.get_status()
+        lines = [f"**{key}:** {value}" for key, value in status.items()]
+        await ctx.send("📊 **Activity Index Status**\n" + "\n".join(lines))
+    except Exception as e:
+        await ctx.send(f"❌ **Error reading activity index status:** {str(e)}")
+        logger.error(f"Error in debug activity: {e}")
+
+
+@bot.command(name="debuglevels")
+@commands.is_owner()
+async def debug_levels(ctx):
+    """Show level engine cache and level-up event metrics."""
+    try:
+        status = level_engine.get_status()
+        lines = [f"**{key}:** {value}" for key, value in status.items()]
+        await ctx.send("📊 **Level Engine Status**\n" + "\n".join(lines))
+    except Exception as e:
+        await ctx.send(f"❌ **Error reading level engine status:** {str(e)}")
+        logger.error(f"Error in debug levels: {e}")
+
+
+@bot.command(name="debugscheduler")
+@commands.is_owner()
+async def debug_scheduler(ctx, job: str = None):
+    """Show scheduled job metrics, or run a job now with !debugscheduler <job>."""
+    try:
+        if job:
+            if await scheduler.run_now(job):
+                await ctx.send(f"✅ **Ran scheduled job `{job}`**")
+            else:
+                await ctx.send(f"❌ **Unknown or busy job:** `{job}` (jobs: {', '.join(scheduler.jobs)})")
+            return
+        
+        lines = []
+        for status in scheduler.get_status():
+            line = (f"**{status['name']}** - runs: {status['runs']}, failures: {status['failures']}, "
+                    f"missed: {status['missed']}, next in {status['next_run_in']:.0f}s, "
+                    f"last {status['last_duration'] * 1000:.1f}ms, max {status['max_duration'] * 1000:.1f}ms")
+            if status["last_error"]:
+                line += f"\n  ⚠️ {status['last_error']}"
+            lines.append(line)
+        await ctx.send("⏰ **Scheduler Status**\n" + "\n".join(lines))
+    except Exception as e:
+        await ctx.send(f"❌ **Error reading scheduler status:** {str(e)}")
+        logger.error(f"Error in debug scheduler: {e}")
+
+
 @bot.command(name='debugachievements', aliases=['debugach'])
 async def debug_achievements_command(ctx, category: str = "time", user: discord.Member = None):
     """
@@ -6494,7 +6751,7 @@ async def debug_achievements_command(ctx, category: str = "time", user: discord.
                 # Send achievement notifications
                 for achievement in newly_unlocked:
                     try:
-                        await send_achievement_notification(bot, target_user, achievement)
+                        queue_achievement_notification(bot, target_user, achievement)
                         
                         if achievement.reward_points > 0:
                             await add_contribution(target_user.id, achievement.reward_points * 10, ctx.channel)
@@ -6644,7 +6901,7 @@ async def test_simple_achievements(ctx, user: discord.Member = None):
                 
                 # Send notifications
                 try:
-                    await send_achievement_notification(bot, target_user, achievement)
+                    queue_achievement_notification(bot, target_user, achievement)
                     if achievement.reward_points > 0:
                         await add_contribution(target_user.id, achievement.reward_points * 10, ctx.channel)
                 except Exception as e:
@@ -6711,7 +6968,7 @@ async def chatterbot(ctx, action: str = None, *, value: str = None):
             embed.add_field(name="Status", value="✅ Enabled" if chat_bot.enabled else "❌ Disabled", inline=False)
             embed.add_field(name="Access", value="👑 Owner Only (when bot is @mentioned)", inline=False)
             embed.add_field(name="Cooldown", value=f"{chat_bot.cooldown_seconds}s", inline=True)
-            embed.add_field(name="History Length", value=f"{len(chat_bot.conversation_history)}", inline=True)
+            embed.add_field(name="Users in Memory", value=f"{len(chat_bot.memory.data)}/{chat_bot.memory.max_users}", inline=True)
             
             # Add intelligence stats
             stats = chat_bot.get_intelligence_stats()
@@ -6725,15 +6982,14 @@ async def chatterbot(ctx, action: str = None, *, value: str = None):
                 color=discord.Color.purple()
             )
             embed.add_field(name="📊 Conversation Stats", value=f"Total Conversations: **{stats['total_conversations']}**\nUnique Users: **{stats['unique_users']}**\nAvg per User: **{stats['avg_conversations_per_user']:.1f}**", inline=False)
-            embed.add_field(name="🧠 Memory & Learning", value=f"Memories Stored: **{stats['memories_stored']}**\nUsers with Preferences: **{stats['users_with_preferences']}**", inline=False)
+            embed.add_field(name="🧠 Memory & Learning", value=f"Memories Stored: **{stats['memories_stored']}**\nUsers with Preferences: **{stats['users_with_preferences']}**\nStored Users: **{stats['stored_users']}** ({stats['stored_bytes'] / 1024:.1f} KB on disk)", inline=False)
             
             # Show user preferences if available
-            if chat_bot.user_preferences:
-                owner_prefs = chat_bot.user_preferences.get(str(ctx.author.id), {})
-                if owner_prefs:
-                    fav_games = owner_prefs.get("favorite_games", [])
-                    comm_style = owner_prefs.get("communication_style", "casual")
-                    embed.add_field(name="👤 Your Profile", value=f"Communication Style: **{comm_style}**\nFavorite Games: **{', '.join(fav_games[:3]) if fav_games else 'None detected yet'}**", inline=False)
+            owner_prefs = chat_bot.get_preferences(str(ctx.author.id))
+            if owner_prefs:
+                fav_games = owner_prefs.get("favorite_games", [])
+                comm_style = owner_prefs.get("communication_style", "casual")
+                embed.add_field(name="👤 Your Profile", value=f"Communication Style: **{comm_style}**\nFavorite Games: **{', '.join(fav_games[:3]) if fav_games else 'None detected yet'}**", inline=False)
             
             await ctx.send(embed=embed)
             
@@ -6793,10 +7049,10 @@ async def clearhistory(ctx):
     Usage: !clearhistory
     """
     try:
-        chat_bot.conversation_history.clear()
+        cleared = chat_bot.clear_history()
         embed = discord.Embed(
             title="🧹 History Cleared",
-            description="Cleared all conversation history",
+            description=f"Cleared conversation history for {cleared} users",
             color=discord.Color.green()
         )
         await ctx.send(embed=embed)
@@ -6814,5 +7070,25 @@ async def clearhistory(ctx):
 # Global flag to track if data is fully loaded
 data_loaded = False
 
-# Start the bot
-bot.run('INSERTYOURBOTTOKENHERE')
+# Start the bot (importing app, e.g. from benchmarks.replay, only builds the handlers)
+async def main():
+    """Run the bot; queued achievement notifications are sent before the connection closes."""
+    async with bot:
+        try:
+            await bot.start('INSERTYOURBOTTOKENHERE')
+        finally:
+            await achievement_notifier.drain(BOT_CONFIG["NOTIFICATION_DRAIN_TIMEOUT"])
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Apply queued messages and credit reactions still being aggregated,
+        # then write anything the write-behind stores hold
+        message_pipeline.drain()
+        reaction_aggregator.flush(force=True)
+        store_manager.flush_all_sync()
+        achievement_system.force_save_progress()
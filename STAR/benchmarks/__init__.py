@@ -0,0 +1,6 @@
+"""
+StarChan Bot Benchmarks
+Standalone performance scripts; run them from the STAR directory, e.g.
+`python -m benchmarks.bench_message_features`. `python -m benchmarks.suite`
+times the hot paths at 1k/10k/100k users and appends the results to a JSON history.
+"""
@@ -0,0 +1,78 @@
+"""
+Benchmark: loading and saving a synthetic contributions file with each available JSON backend.
+
+Compares the old stdlib `indent=2` format with compact stdlib output and with
+orjson/ujson when they are installed; json_codec picks the fastest one present.
+
+Usage (from the STAR directory):
+    python -m benchmarks.bench_json_codec [--users 50000] [--repeat 5]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json_codec
+
+
+def build_contributions(users: int):
+    """user_id -> points, with Discord-sized snowflake ids."""
+    rng = random.Random(42)
+    return {str(rng.randrange(10 ** 17, 10 ** 18)): rng.randrange(0, 250000) for _ in range(users)}
+
+
+def backends():
+    """(name, dump to bytes, load from bytes) for every backend importable here."""
+    found = [
+        ("json indent=2 (old)", lambda data: json.dumps(data, indent=2).encode("utf-8"), json.loads),
+        ("json compact", lambda data: json.dumps(data, separators=(",", ":")).encode("utf-8"), json.loads),
+    ]
+    try:
+        import ujson
+        found.append(("ujson compact", lambda data: ujson.dumps(data).encode("utf-8"), ujson.loads))
+    except ImportError:
+        pass
+    try:
+        import orjson
+        found.append(("orjson compact", orjson.dumps, orjson.loads))
+    except ImportError:
+        pass
+    return found
+
+
+def run(users: int, repeat: int):
+    data = build_contributions(users)
+    results = {}
+    print(f"Contributions file: {users:,} users, best of {repeat} (json_codec backend: {json_codec.BACKEND})")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "contributions.json")
+        for name, dump, load in backends():
+            def save():
+                with open(path, "wb") as f:
+                    f.write(dump(data))
+
+            def read():
+                with open(path, "rb") as f:
+                    return load(f.read())
+
+            save_time = min(timeit.repeat(save, number=1, repeat=repeat))
+            load_time = min(timeit.repeat(read, number=1, repeat=repeat))
+            size = os.path.getsize(path)
+            assert read() == data
+            results[name] = {"save_ms": save_time * 1000, "load_ms": load_time * 1000, "bytes": size}
+            print(f"  {name:<20} save {save_time * 1000:8.2f} ms   load {load_time * 1000:8.2f} ms   {size / 1024:8.0f} KiB")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.users, args.repeat)
@@ -0,0 +1,60 @@
+"""
+Microbenchmark: the chatterbot keyword automaton vs. the nested substring loops it replaced.
+
+Usage (from the STAR directory):
+    python -m benchmarks.bench_keyword_matcher [--messages 20000] [--repeat 7]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_message_features import build_corpus
+from bot_utils import CHAT_KEYWORDS, ChatterBotConfig, ResponseGenerator, ChatterBot
+
+
+def substring_analysis(message_lower: str):
+    """Every vocabulary checked with its own `in` loop, as the chatterbot used to."""
+    filtered = any(topic in message_lower for topic in ChatterBotConfig.FILTERED_TOPICS)
+    intents = [
+        any(term in message_lower for term in vocabulary)
+        for vocabulary in (ResponseGenerator.GREETINGS, ResponseGenerator.HELP_INDICATORS,
+                           ResponseGenerator.GAMING_TERMS, ResponseGenerator.DISCORD_TERMS,
+                           ResponseGenerator.ACHIEVEMENT_TERMS)
+    ]
+    emotions = {
+        emotion: sum(1 for keyword in keywords if keyword in message_lower)
+        for emotion, keywords in ResponseGenerator.EMOTION_KEYWORDS.items()
+    }
+    games = [game for games in ResponseGenerator.GAMING_KNOWLEDGE.values() for game in games
+             if game.lower() in message_lower]
+    humor = any(word in message_lower for word in ChatterBot.HUMOR_WORDS)
+    return filtered, intents, emotions, games, humor
+
+
+def run(messages: int, repeat: int):
+    corpus = [text.lower() for text in build_corpus(messages)]
+    chars = sum(len(text) for text in corpus)
+
+    substring_time = automaton_time = float("inf")
+    for _ in range(repeat):
+        substring_time = min(substring_time, timeit.timeit(lambda: [substring_analysis(text) for text in corpus], number=1))
+        # Bypass the last-result cache so every message is really scanned
+        automaton_time = min(automaton_time, timeit.timeit(
+            lambda: [(setattr(CHAT_KEYWORDS, "_last_text", None), CHAT_KEYWORDS.scan(text)) for text in corpus], number=1))
+
+    print(f"Corpus: {messages:,} messages ({chars / messages:.0f} chars avg), {len(CHAT_KEYWORDS)} keywords, best of {repeat}")
+    print(f"  substring loops : {substring_time * 1e6 / messages:8.2f} us/message")
+    print(f"  keyword automaton: {automaton_time * 1e6 / messages:8.2f} us/message")
+    return {"substring_us": substring_time * 1e6 / messages, "automaton_us": automaton_time * 1e6 / messages}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+    run(args.messages, args.repeat)
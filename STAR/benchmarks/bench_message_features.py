@@ -0,0 +1,97 @@
+"""
+Microbenchmark: MessageFeatures extraction vs. the inline on_message analysis it replaced.
+
+Usage (from the STAR directory):
+    python -m benchmarks.bench_message_features [--messages 20000] [--repeat 5]
+"""
+
+import argparse
+import random
+import re
+import sys
+import os
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from message_features import extract_features
+
+# Shapes of real chat traffic: short replies, questions, links, emoji, shouting, counting, long posts
+CORPUS_TEMPLATES = [
+    "lol", "ok", "gg", "same", "nice one", "brb", "hi", "yo what's up",
+    "anyone up for some {game} tonight?", "how do i get the {role} role?",
+    "check this out https://example.com/clip/{n}", "www.youtube.com/watch?v={n} is hilarious",
+    "GG EZ", "WHY IS THIS HAPPENING", "happy birthday {name}!! 🎂🎉", "bday party later 🥳",
+    "that was awesome 😂😂", "<:pepehands:{n}> rip", "just beat {game} on hard mode!",
+    "{n}", "!leaderboard", "!shop", "can you help me with the bot?",
+    "I think the patch notes for {game} nerfed everything, honestly the meta is so stale now "
+    "and I don't know why they keep doing this every season. " * 4,
+]
+GAMES = ["Valorant", "Skyrim", "Hades", "Overwatch", "Stardew Valley", "Minecraft"]
+NAMES = ["alex", "sam", "kai", "rin", "jo"]
+
+
+def build_corpus(size: int, seed: int = 42):
+    """Deterministic synthetic corpus of chat messages."""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        template = rng.choice(CORPUS_TEMPLATES)
+        corpus.append(template.format(game=rng.choice(GAMES), role="VIP", name=rng.choice(NAMES), n=rng.randint(1, 99999)))
+    return corpus
+
+
+def inline_analysis(message_content: str):
+    """The per-message analysis on_message used to do inline (kept verbatim for comparison)."""
+    has_emoji = bool(re.search(r'<:\w+:\d+>|[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF]', message_content))
+    has_exclamation = '!' in message_content
+    has_question = '?' in message_content
+    has_link = bool(re.search(r'https?://|www\.|\b\w+\.\w{2,}\b', message_content))
+
+    message_length = len(message_content)
+    is_caps = message_content.isupper() and message_length > 1
+    is_short = message_length <= 5 and message_length > 0
+    is_long = message_length >= 500
+    birthday_keywords = ["happy birthday", "bday", "🎂", "🎉", "🥳", "🎈", "🎁"]
+    message_lower = message_content.lower()
+    has_birthday = any(keyword in message_lower for keyword in birthday_keywords)
+
+    number = int(message_content) if message_content.isdigit() else None
+    is_command = message_content.startswith('!')
+    return (has_emoji, has_exclamation, has_question, has_link, is_caps, is_short,
+            is_long, has_birthday, number, is_command)
+
+
+def features_analysis(message_content: str):
+    """The same answers via the shared extractor."""
+    f = extract_features(message_content)
+    return (f.has_emoji, f.has_exclamation, f.has_question, f.has_link, f.is_caps, f.is_short,
+            f.is_long, f.has_birthday, f.number, f.is_command)
+
+
+def run(messages: int, repeat: int):
+    corpus = build_corpus(messages)
+
+    mismatches = sum(1 for text in corpus if inline_analysis(text) != features_analysis(text))
+
+    # Interleave the two candidates so CPU frequency drift hits both equally
+    inline_time = features_time = float("inf")
+    for _ in range(repeat):
+        inline_time = min(inline_time, timeit.timeit(lambda: [inline_analysis(text) for text in corpus], number=1))
+        features_time = min(features_time, timeit.timeit(lambda: [features_analysis(text) for text in corpus], number=1))
+
+    print(f"Corpus: {messages:,} messages, best of {repeat}")
+    print(f"  inline on_message analysis : {inline_time * 1e6 / messages:8.2f} us/message")
+    print(f"  MessageFeatures            : {features_time * 1e6 / messages:8.2f} us/message")
+    print(f"  speedup                    : {inline_time / features_time:8.2f}x")
+    print(f"  result mismatches          : {mismatches}")
+    return {"inline_us": inline_time * 1e6 / messages, "features_us": features_time * 1e6 / messages,
+            "mismatches": mismatches}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+    run(args.messages, args.repeat)
@@ -0,0 +1,143 @@
+"""
+Synthetic StarChan data files for benchmarks.
+
+Writes what a server of N users would have on disk: the SQLite economy tables
+(contributions, lifetime earnings, last active, this week's totals) and a v2
+achievements_data.txt whose counters and unlocks are consistent with the real
+achievement catalogue. Activity is Pareto-distributed, so a few users carry most
+of the points, messages and unlocks, like a real server.
+
+Usage (from the STAR directory):
+    python -m benchmarks.datagen --users 10000 --out /tmp/starchan-10k
+"""
+
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Dict, Any, List, Tuple
+
+STAR_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, STAR_DIR)
+
+ACHIEVEMENTS_FILE = "achievements_data.txt"
+SNOWFLAKE_MIN = 10 ** 17
+
+
+def _import_data_modules():
+    """Import achievements and economy_db from a throwaway directory.
+
+    The global achievement system loads (and later writes) its files relative to the
+    working directory as soon as achievements is imported; it must not touch real data.
+    """
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="starchan-datagen-") as scratch:
+        os.chdir(scratch)
+        try:
+            import achievements
+            import economy_db
+        finally:
+            os.chdir(cwd)
+    return achievements, economy_db
+
+
+def achievement_catalog() -> List[Tuple[str, Dict[str, Any]]]:
+    """(achievement_id, requirements) for every achievement the bot defines."""
+    achievement_system = _import_data_modules()[0].achievement_system
+    return [(achievement.id, dict(achievement.requirements)) for achievement in achievement_system.achievements.values()]
+
+
+def current_week_start() -> int:
+    """Monday 00:00 UTC of this week (same as WeeklyContributionManager)."""
+    now = datetime.datetime.now(datetime.timezone.utc)
+    week_start = now.replace(hour=0, minute=0, second=0, microsecond=0) - datetime.timedelta(days=now.weekday())
+    return int(week_start.timestamp())
+
+
+def user_ids(users: int, seed: int = 42) -> List[str]:
+    """Distinct snowflake-sized user ids, stable for a given seed."""
+    rng = random.Random(seed)
+    ids = set()
+    while len(ids) < users:
+        ids.add(str(rng.randrange(SNOWFLAKE_MIN, 10 * SNOWFLAKE_MIN)))
+    return sorted(ids)
+
+
+def build_achievement_users(ids: List[str], activity: Dict[str, float], catalog, rng: random.Random) -> Dict[str, Any]:
+    """v2 achievement entries: counters scaled by each user's activity, unlocks where they are met."""
+    numeric_keys = sorted({key for _, requirements in catalog for key, value in requirements.items()
+                           if not isinstance(value, bool)})
+    unlock_date = datetime.datetime.now().replace(microsecond=0).isoformat()
+    users = {}
+    for user_id in ids:
+        weight = activity[user_id]
+        # Most users touch a handful of counters; active ones touch most of them
+        touched = [key for key in numeric_keys if rng.random() < min(1.0, 0.1 + weight / 50)]
+        counters = {key: int(weight * rng.uniform(1, 20)) for key in touched}
+        counters["messages"] = int(weight * rng.uniform(5, 40))
+        unlocked = {}
+        for achievement_id, requirements in catalog:
+            met = all(
+                bool(counters.get(key)) if isinstance(value, bool) else counters.get(key, 0) >= value
+                for key, value in requirements.items()
+            )
+            if met and requirements:
+                unlocked[achievement_id] = unlock_date
+        users[user_id] = {"counters": counters, "unlocked": unlocked}
+    return {"version": 2, "users": users}
+
+
+def generate(directory: str, users: int, seed: int = 42, catalog=None) -> Dict[str, Any]:
+    """Write the data files for `users` users into directory. Returns counts and file sizes."""
+    import json_codec
+    economy_db = _import_data_modules()[1]
+
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    ids = user_ids(users, seed)
+    # Pareto weights: median around 1, a long tail of very active users
+    activity = {user_id: rng.paretovariate(1.3) for user_id in ids}
+    now = time.time()
+
+    lifetime = {user_id: int(weight * rng.uniform(50, 800)) for user_id, weight in activity.items()}
+    balances = {user_id: int(points * rng.uniform(0.1, 1.0)) for user_id, points in lifetime.items()}
+    last_active = {user_id: now - rng.expovariate(1 / (5 * 86400)) / activity[user_id] for user_id in ids}
+    weekly = {user_id: int(weight * rng.uniform(1, 60)) for user_id, weight in activity.items() if rng.random() < 0.4}
+
+    db_path = os.path.join(directory, economy_db.DEFAULT_DB_FILE)
+    database = economy_db.EconomyDatabase(db_path)
+    database.replace_table("contributions", balances)
+    database.replace_table("lifetime_earnings", lifetime)
+    database.replace_table("last_active", last_active)
+    week_start = current_week_start()
+    database.write_weekly_batch(week_start, weekly, replace=True)
+    database.set_state("weekly_week_start", week_start)
+    database._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    database._conn.close()
+
+    achievements = build_achievement_users(ids, activity, catalog or achievement_catalog(), rng)
+    achievements_path = os.path.join(directory, ACHIEVEMENTS_FILE)
+    json_codec.save_file(achievements_path, achievements)
+
+    return {
+        "users": users,
+        "weekly_users": len(weekly),
+        "unlocks": sum(len(entry["unlocked"]) for entry in achievements["users"].values()),
+        "economy_db_bytes": os.path.getsize(db_path),
+        "achievements_bytes": os.path.getsize(achievements_path),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--out", required=True, help="directory to write the data files into")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    summary = generate(os.path.abspath(args.out), args.users, args.seed)
+    print(f"Wrote {summary['users']:,} users ({summary['weekly_users']:,} active this week, "
+          f"{summary['unlocks']:,} unlocks) to {os.path.abspath(args.out)}: "
+          f"economy db {summary['economy_db_bytes']:,} bytes, achievements {summary['achievements_bytes']:,} bytes")
@@ -0,0 +1,389 @@
+"""
+In-memory stand-ins for the discord.py objects StarChan's handlers touch.
+
+Guilds, members, text channels, messages and reactions carry the attributes the
+handlers read. Every coroutine that would hit Discord's REST API (sends,
+reactions, role changes, DMs) is counted by a RestRecorder instead, and can be
+given a simulated network latency.
+"""
+
+import asyncio
+import datetime
+import itertools
+from collections import Counter
+from typing import Dict, List, Optional
+
+import discord
+
+_ids = itertools.count(10 ** 17)
+
+
+def next_id() -> int:
+    """A snowflake-sized id unique within this process."""
+    return next(_ids)
+
+
+class RestRecorder:
+    """Counts REST calls by route and optionally sleeps to simulate their latency."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls: Counter = Counter()
+
+    async def call(self, route: str) -> None:
+        self.calls[route] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    @property
+    def total(self) -> int:
+        return sum(self.calls.values())
+
+
+class FakeAsset:
+    """Avatar/icon stand-in."""
+
+    def __init__(self, url: str):
+        self.url = url
+
+    def __str__(self) -> str:
+        return self.url
+
+
+class FakeRole:
+    """Guild role with a name, position and permissions."""
+
+    def __init__(self, guild, name: str, position: int = 0, permissions: Optional[discord.Permissions] = None):
+        self.id = next_id()
+        self.guild = guild
+        self.name = name
+        self.position = position
+        self.permissions = permissions or discord.Permissions.none()
+        self.color = self.colour = discord.Colour.default()
+        self.mention = f"<@&{self.id}>"
+
+    def __str__(self) -> str:
+        return self.name
+
+    def __lt__(self, other) -> bool:
+        return self.position < other.position
+
+    def is_default(self) -> bool:
+        return self.position == 0
+
+
+class FakeMember:
+    """Guild member (or the bot itself when bot=True)."""
+
+    def __init__(self, guild, name: str, bot: bool = False, joined_days_ago: float = 30.0,
+                 member_id: Optional[int] = None, administrator: bool = False):
+        self.id = member_id if member_id is not None else next_id()
+        self.guild = guild
+        self.name = self.display_name = self.global_name = name
+        self.nick = None
+        self.discriminator = "0"
+        self.bot = bot
+        self.mention = f"<@{self.id}>"
+        now = datetime.datetime.now(datetime.timezone.utc)
+        self.joined_at = now - datetime.timedelta(days=joined_days_ago)
+        self.created_at = self.joined_at - datetime.timedelta(days=365)
+        self.avatar = None
+        self.display_avatar = self.default_avatar = FakeAsset(f"https://cdn.example/avatars/{self.id}.png")
+        self.roles: List[FakeRole] = [guild.default_role]
+        self.administrator = administrator
+        self.guild_permissions = discord.Permissions.all() if administrator else discord.Permissions.general()
+        self.status = discord.Status.online
+        self.activity = None
+        self.premium_since = None
+
+    def __eq__(self, other) -> bool:
+        return getattr(other, "id", None) == self.id
+
+    def __hash__(self) -> int:
+        return hash(self.id)
+
+    def __str__(self) -> str:
+        return self.name
+
+    @property
+    def top_role(self) -> FakeRole:
+        return max(self.roles, key=lambda role: role.position)
+
+    async def send(self, content=None, **kwargs):
+        await self.guild.rest.call("dm.send")
+        return FakeMessage(self.guild.dm_channel, self.guild.me, content or "")
+
+    async def add_roles(self, *roles, **kwargs):
+        await self.guild.rest.call("member.add_roles")
+        self.roles.extend(role for role in roles if role not in self.roles)
+
+    async def remove_roles(self, *roles, **kwargs):
+        await self.guild.rest.call("member.remove_roles")
+        self.roles = [role for role in self.roles if role not in roles]
+
+    async def edit(self, **kwargs):
+        await self.guild.rest.call("member.edit")
+
+
+class FakeTypingContext:
+    """`async with channel.typing()` stand-in (one REST call)."""
+
+    def __init__(self, channel):
+        self.channel = channel
+
+    async def __aenter__(self):
+        await self.channel.guild.rest.call("channel.typing")
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeTextChannel:
+    """Guild text channel; sends are recorded and return FakeMessages."""
+
+    type = discord.ChannelType.text
+
+    def __init__(self, guild, name: str, channel_id: Optional[int] = None):
+        self.id = channel_id if channel_id is not None else next_id()
+        self.guild = guild
+        self.name = name
+        self.mention = f"<#{self.id}>"
+        self.category = None
+        self.topic = None
+        self.position = len(guild.channels)
+        self.sent: int = 0
+
+    def __eq__(self, other) -> bool:
+        return getattr(other, "id", None) == self.id
+
+    def __hash__(self) -> int:
+        return hash(self.id)
+
+    def __str__(self) -> str:
+        return self.name
+
+    def permissions_for(self, member) -> discord.Permissions:
+        if getattr(member, "administrator", False):
+            return discord.Permissions.all()
+        return discord.Permissions.general() | discord.Permissions.text()
+
+    def is_nsfw(self) -> bool:
+        return False
+
+    async def send(self, content=None, **kwargs):
+        await self.guild.rest.call("channel.send")
+        self.sent += 1
+        return FakeMessage(self, self.guild.me, content if content is not None else "")
+
+    def typing(self) -> FakeTypingContext:
+        return FakeTypingContext(self)
+
+    async def fetch_message(self, message_id: int):
+        await self.guild.rest.call("channel.fetch_message")
+        raise discord.NotFound(_FakeResponse(404), "Unknown Message")
+
+    async def purge(self, limit: int = 100, **kwargs):
+        await self.guild.rest.call("channel.purge")
+        return []
+
+    def history(self, limit: int = 100, **kwargs):
+        return _EmptyHistory(self)
+
+
+class _EmptyHistory:
+    """Async iterator for channel.history(); the fake channel keeps no history."""
+
+    def __init__(self, channel):
+        self.channel = channel
+        self._called = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._called:
+            self._called = True
+            await self.channel.guild.rest.call("channel.history")
+        raise StopAsyncIteration
+
+
+class _FakeResponse:
+    """Minimal aiohttp response for discord.HTTPException subclasses."""
+
+    def __init__(self, status: int):
+        self.status = status
+        self.reason = "Fake"
+
+
+class FakeMessage:
+    """A message in a fake channel."""
+
+    def __init__(self, channel, author, content: str, mentions: Optional[List] = None):
+        self.id = next_id()
+        self.channel = channel
+        self.guild = getattr(channel, "guild", None)
+        self.author = author
+        self.content = content
+        self.clean_content = content
+        self.mentions = mentions or []
+        self.role_mentions = []
+        self.channel_mentions = []
+        self.mention_everyone = False
+        self.attachments = []
+        self.embeds = []
+        self.stickers = []
+        self.reactions = []
+        self.reference = None
+        self.interaction = None
+        self.interaction_metadata = None
+        self.webhook_id = None
+        self.type = discord.MessageType.default
+        self.created_at = datetime.datetime.now(datetime.timezone.utc)
+        self.edited_at = None
+        self.jump_url = f"https://discord.com/channels/{getattr(self.guild, 'id', '@me')}/{channel.id}/{self.id}"
+        self._state = None
+
+    def __eq__(self, other) -> bool:
+        return getattr(other, "id", None) == self.id
+
+    def __hash__(self) -> int:
+        return hash(self.id)
+
+    @property
+    def _rest(self) -> RestRecorder:
+        return self.channel.guild.rest
+
+    async def add_reaction(self, emoji):
+        await self._rest.call("message.add_reaction")
+
+    async def remove_reaction(self, emoji, member):
+        await self._rest.call("message.remove_reaction")
+
+    async def clear_reactions(self):
+        await self._rest.call("message.clear_reactions")
+
+    async def edit(self, **kwargs):
+        await self._rest.call("message.edit")
+        return self
+
+    async def delete(self, **kwargs):
+        await self._rest.call("message.delete")
+
+    async def pin(self, **kwargs):
+        await self._rest.call("message.pin")
+
+    async def reply(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+
+class FakeReaction:
+    """A reaction on a fake message."""
+
+    def __init__(self, message: FakeMessage, emoji: str, count: int = 1):
+        self.message = message
+        self.emoji = emoji
+        self.count = count
+        self.me = False
+
+    def __str__(self) -> str:
+        return str(self.emoji)
+
+
+class FakeGuild:
+    """A guild holding fake members and channels, plus the REST recorder they share."""
+
+    def __init__(self, name: str = "Replay Guild", guild_id: Optional[int] = None,
+                 rest: Optional[RestRecorder] = None):
+        self.id = guild_id if guild_id is not None else next_id()
+        self.name = name
+        self.rest = rest or RestRecorder()
+        self.chunked = True
+        self.icon = None
+        self.emojis = []
+        self.premium_subscription_count = 0
+        self.created_at = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=1000)
+        self.rules_channel = None
+        self.system_channel = None
+        self.channels: Dict[int, FakeTextChannel] = {}
+        self._members: Dict[int, FakeMember] = {}
+        self.default_role = FakeRole(self, "@everyone", position=0)
+        self.roles: List[FakeRole] = [self.default_role]
+        self.me = FakeMember(self, "StarChan", bot=True, administrator=True)
+        self.owner_id = self.me.id
+        self._members[self.me.id] = self.me
+        # DMs from the bot are recorded against this guild's recorder
+        self.dm_channel = FakeTextChannel(self, "direct-messages")
+
+    def __eq__(self, other) -> bool:
+        return getattr(other, "id", None) == self.id
+
+    def __hash__(self) -> int:
+        return hash(self.id)
+
+    def __str__(self) -> str:
+        return self.name
+
+    @property
+    def members(self) -> List[FakeMember]:
+        return list(self._members.values())
+
+    @property
+    def member_count(self) -> int:
+        return len(self._members)
+
+    @property
+    def text_channels(self) -> List[FakeTextChannel]:
+        return sorted(self.channels.values(), key=lambda channel: channel.position)
+
+    @property
+    def owner(self) -> FakeMember:
+        return self._members.get(self.owner_id)
+
+    def add_member(self, name: str, **kwargs) -> FakeMember:
+        member = FakeMember(self, name, **kwargs)
+        self._members[member.id] = member
+        return member
+
+    def add_text_channel(self, name: str, channel_id: Optional[int] = None) -> FakeTextChannel:
+        channel = FakeTextChannel(self, name, channel_id)
+        self.channels[channel.id] = channel
+        return channel
+
+    def add_role(self, name: str, position: int) -> FakeRole:
+        role = FakeRole(self, name, position)
+        self.roles.append(role)
+        return role
+
+    def get_member(self, member_id: int) -> Optional[FakeMember]:
+        return self._members.get(member_id)
+
+    def get_member_named(self, name: str) -> Optional[FakeMember]:
+        return next((member for member in self._members.values() if member.name == name), None)
+
+    def get_channel(self, channel_id: int) -> Optional[FakeTextChannel]:
+        return self.channels.get(channel_id)
+
+    def get_role(self, role_id: int) -> Optional[FakeRole]:
+        return next((role for role in self.roles if role.id == role_id), None)
+
+    async def fetch_member(self, member_id: int) -> FakeMember:
+        await self.rest.call("guild.fetch_member")
+        member = self._members.get(member_id)
+        if member is None:
+            raise discord.NotFound(_FakeResponse(404), "Unknown Member")
+        return member
+
+    async def create_role(self, name: str = "new role", **kwargs) -> FakeRole:
+        await self.rest.call("guild.create_role")
+        return self.add_role(name, len(self.roles))
+
+
+def build_guild(users: int, channels: int = 8, rest: Optional[RestRecorder] = None,
+                guild_id: Optional[int] = None) -> FakeGuild:
+    """A guild with `users` human members (varied join dates) and a few text channels."""
+    guild = FakeGuild(guild_id=guild_id, rest=rest)
+    for index in range(channels):
+        guild.add_text_channel("general" if index == 0 else f"channel-{index}")
+    for index in range(users):
+        guild.add_member(f"user{index}", joined_days_ago=1 + (index * 7919) % 900)
+    return guild
@@ -0,0 +1,327 @@
+"""
+Offline replay and load generator: StarChan's real handlers driven by a fake gateway.
+
+Imports app in a scratch directory (so its database, journal and logs land there),
+swaps in an in-memory guild from benchmarks.fake_discord, then dispatches a
+synthetic or recorded event stream of messages, reactions, counting and commands
+through on_message / on_reaction_add / the command handlers at a fixed rate.
+Reports events/sec, p50/p99 handler latency, bytes written and REST calls attempted.
+
+Usage (from the STAR directory):
+    python -m benchmarks.replay [--users 2000] [--events 20000] [--rate 0] [--rest-latency 0]
+                                [--events-file stream.jsonl] [--record stream.jsonl] [--json report.json]
+                                [--drain-timeout 30]
+
+Recorded streams are JSON lines like {"type": "message", "user": 3, "channel": 1, "content": "hi"};
+types are message, command, counting (content is filled in with the next number) and reaction.
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Any, List, Optional
+
+STAR_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, STAR_DIR)
+
+from discord.ext import commands
+
+from benchmarks.bench_message_features import build_corpus
+from benchmarks.fake_discord import RestRecorder, FakeMessage, FakeReaction, build_guild
+
+EVENT_MIX = (("message", 0.70), ("reaction", 0.15), ("counting", 0.08), ("command", 0.07))
+COMMANDS = ("!balance", "!rank", "!leaderboard", "!pun", "!8ball will this scale?",
+            "!countingstatus", "!riddlestatus", "!myachievements", "!dadjoke")
+REACTIONS = ("👍", "😂", "🎉", "❤️", "🔥")
+
+
+class ErrorCounter(logging.Handler):
+    """Counts ERROR records logged by the bot during the replay."""
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.count = 0
+        self.samples: Counter = Counter()
+
+    def emit(self, record):
+        self.count += 1
+        self.samples[record.getMessage()[:120]] += 1
+
+
+def synthetic_events(count: int, users: int, channels: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Chat-shaped stream: a few heavy users, many light ones, bursts of counting."""
+    rng = random.Random(seed)
+    corpus = build_corpus(min(count, 5000), seed)
+    kinds, weights = zip(*EVENT_MIX)
+    events = []
+    for index in range(count):
+        # Pareto-distributed user choice: a handful of users send most messages
+        user = min(int(rng.paretovariate(1.2)) - 1, users - 1)
+        user = (user * 7919 + index % 3) % users if rng.random() < 0.5 else user
+        kind = rng.choices(kinds, weights)[0]
+        channel = rng.randrange(1, channels)
+        if kind == "message":
+            events.append({"type": kind, "user": user, "channel": channel, "content": rng.choice(corpus)})
+        elif kind == "command":
+            events.append({"type": kind, "user": user, "channel": channel, "content": rng.choice(COMMANDS)})
+        elif kind == "reaction":
+            events.append({"type": kind, "user": user, "channel": channel, "emoji": rng.choice(REACTIONS)})
+        else:
+            events.append({"type": kind, "user": user})
+    return events
+
+
+def load_events(path: str) -> List[Dict[str, Any]]:
+    """Read a recorded JSON-lines event stream."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an unsorted list (0 if empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def proc_io() -> Dict[str, int]:
+    """This process's I/O counters from /proc (Linux); empty elsewhere."""
+    try:
+        with open("/proc/self/io", "r") as f:
+            return {key: int(value) for key, value in (line.split(": ") for line in f)}
+    except OSError:
+        return {}
+
+
+def directory_bytes(path: str) -> int:
+    """Total size of the files under a directory."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def load_app(workdir: str):
+    """Import app with the scratch directory as the working directory."""
+    os.chdir(workdir)
+    app = importlib.import_module("app")
+    # The replay reports its own numbers; keep the bot's INFO chatter out of the way
+    logging.getLogger().setLevel(logging.WARNING)
+    return app
+
+
+def attach_fake_gateway(app, guild, counting_channel) -> None:
+    """Point the bot at the fake guild: its user, owner, lookups, interactive waits and where ctx.send goes."""
+    bot = app.bot
+    bot._connection.user = guild.me
+    bot.owner_id = guild.owner_id
+    bot.get_guild = lambda guild_id: guild if guild_id == guild.id else None
+    bot.get_channel = lambda channel_id: guild.get_channel(channel_id)
+    bot.get_user = lambda user_id: guild.get_member(user_id)
+    # Nobody clicks the paginators or shop menus: interactive waits time out at once
+    async def wait_for(event, *, check=None, timeout=None):
+        raise asyncio.TimeoutError()
+    bot.wait_for = wait_for
+    app.BOT_CONFIG["main_server_id"] = guild.id
+    app.counting_state["channel_id"] = counting_channel.id
+    app.counting_state["current"] = 0
+    app.counting_state["last_user"] = None
+
+    # Context.send normally goes through the connection state's HTTP client;
+    # route it to the fake channel, which records the REST call
+    async def context_send(ctx, content=None, **kwargs):
+        return await ctx.channel.send(content, **kwargs)
+    commands.Context.send = context_send
+    commands.Context.typing = lambda ctx, **kwargs: ctx.channel.typing()
+
+
+async def drain(app, timeout: float) -> Dict[str, Any]:
+    """Wait for the background workers, then flush everything to disk.
+
+    Achievement notifications are rate limited per route, so a big backlog can
+    outlast the timeout; whatever is still queued then is reported, not waited for.
+    """
+    start = time.perf_counter()
+    deadline = start + timeout
+    pipeline = app.message_pipeline
+    while time.perf_counter() < deadline:
+        status = pipeline.get_status()
+        if status["processed"] >= status["enqueued"] + status["merged_overflow"]:
+            break
+        await asyncio.sleep(0.05)
+    app.reaction_aggregator.flush(force=True)
+    await app.store_manager.flush_all()
+    app.achievement_system.force_save_progress()
+    while app.achievement_notifier.get_status()["pending_users"] and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+    pending_notifications = app.achievement_notifier.get_status()["pending_achievements"]
+    # Wait for every queued write to reach the disk
+    await asyncio.get_running_loop().run_in_executor(None, app.io_service.shutdown)
+    return {"seconds": time.perf_counter() - start, "pending_notifications": pending_notifications}
+
+
+async def replay(app, guild, channels, counting_channel, events: List[Dict[str, Any]],
+                 rate: float, concurrency: int) -> Dict[str, Any]:
+    """Dispatch the events like the gateway does (one task each) and time every handler."""
+    members = [member for member in guild.members if not member.bot]
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    slots = asyncio.Semaphore(concurrency)
+    tasks = []
+    counting_number = 0
+
+    async def timed(kind: str, handler):
+        try:
+            start = time.perf_counter()
+            await handler
+            latencies[kind].append(time.perf_counter() - start)
+        finally:
+            slots.release()
+
+    # What bot.start() would do before connecting: bind the loop, then mark the client ready
+    await app.bot._async_setup_hook()
+    app.bot._ready.set()
+    await app.on_ready()
+    start = time.perf_counter()
+    for index, event in enumerate(events):
+        if rate > 0:
+            delay = start + index / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await slots.acquire()
+
+        kind = event["type"]
+        author = members[event["user"] % len(members)]
+        if kind == "counting":
+            counting_number += 1
+            message = FakeMessage(counting_channel, author, str(counting_number))
+            handler = app.on_message(message)
+        elif kind == "reaction":
+            channel = channels[event.get("channel", 1) % len(channels)]
+            target = FakeMessage(channel, members[(event["user"] + 1) % len(members)], "reacted message")
+            handler = app.on_reaction_add(FakeReaction(target, event.get("emoji", "👍")), author)
+        else:
+            channel = channels[event.get("channel", 1) % len(channels)]
+            handler = app.on_message(FakeMessage(channel, author, event.get("content", "")))
+        tasks.append(asyncio.get_running_loop().create_task(timed(kind, handler)))
+    await asyncio.gather(*tasks)
+    dispatch_seconds = time.perf_counter() - start
+    return {"latencies": latencies, "dispatch_seconds": dispatch_seconds}
+
+
+def run(users: int, events_count: int, rate: float, rest_latency: float, concurrency: int,
+        events_file: Optional[str] = None, record: Optional[str] = None, json_path: Optional[str] = None,
+        workdir: Optional[str] = None, seed: int = 42, drain_timeout: float = 30.0) -> Dict[str, Any]:
+    events_file = os.path.abspath(events_file) if events_file else None
+    record = os.path.abspath(record) if record else None
+    json_path = os.path.abspath(json_path) if json_path else None
+    workdir = os.path.abspath(workdir) if workdir else tempfile.mkdtemp(prefix="starchan-replay-")
+    os.makedirs(workdir, exist_ok=True)
+
+    rest = RestRecorder(rest_latency)
+    guild = build_guild(users, rest=rest)
+    channels = guild.text_channels
+    counting_channel = guild.add_text_channel("counting")
+    events = load_events(events_file) if events_file else synthetic_events(events_count, users, len(channels), seed)
+    if record:
+        with open(record, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(event, ensure_ascii=False) + "\n" for event in events)
+
+    app = load_app(workdir)
+    errors = ErrorCounter()
+    logging.getLogger().addHandler(errors)
+    attach_fake_gateway(app, guild, counting_channel)
+
+    bytes_before = directory_bytes(workdir)
+    io_before = proc_io()
+
+    async def main():
+        result = await replay(app, guild, channels, counting_channel, events, rate, concurrency)
+        result["drain"] = await drain(app, drain_timeout)
+        return result
+
+    result = asyncio.run(main())
+    io_after = proc_io()
+
+    all_latencies = [value for values in result["latencies"].values() for value in values]
+    report = {
+        "users": users,
+        "events": len(events),
+        "rate_target": rate,
+        "rest_latency_ms": rest_latency * 1000,
+        "dispatch_seconds": result["dispatch_seconds"],
+        "drain_seconds": result["drain"]["seconds"],
+        "notifications_undelivered": result["drain"]["pending_notifications"],
+        "events_per_second": len(events) / result["dispatch_seconds"] if result["dispatch_seconds"] else 0.0,
+        "latency_ms": {
+            "p50": percentile(all_latencies, 0.50) * 1000,
+            "p99": percentile(all_latencies, 0.99) * 1000,
+            "max": max(all_latencies, default=0.0) * 1000,
+        },
+        "latency_ms_by_type": {
+            kind: {"count": len(values), "p50": percentile(values, 0.50) * 1000, "p99": percentile(values, 0.99) * 1000}
+            for kind, values in sorted(result["latencies"].items())
+        },
+        "rest_calls": rest.total,
+        "rest_calls_by_route": dict(rest.calls.most_common()),
+        "disk_bytes_growth": directory_bytes(workdir) - bytes_before,
+        "bytes_written": io_after.get("wchar", 0) - io_before.get("wchar", 0),
+        "storage_bytes_written": io_after.get("write_bytes", 0) - io_before.get("write_bytes", 0),
+        "errors_logged": errors.count,
+        "top_errors": dict(errors.samples.most_common(5)),
+        "pipeline": app.message_pipeline.get_status(),
+        "workdir": workdir,
+    }
+
+    print(f"Replayed {report['events']:,} events for {users:,} users in {report['dispatch_seconds']:.2f}s "
+          f"(drain {report['drain_seconds']:.2f}s), workdir {workdir}")
+    print(f"  throughput     : {report['events_per_second']:,.0f} events/s"
+          + (f" (target {rate:,.0f}/s)" if rate > 0 else ""))
+    print(f"  handler latency: p50 {report['latency_ms']['p50']:.3f} ms   p99 {report['latency_ms']['p99']:.3f} ms"
+          f"   max {report['latency_ms']['max']:.1f} ms")
+    for kind, stats in report["latency_ms_by_type"].items():
+        print(f"    {kind:<9} {stats['count']:>7,}   p50 {stats['p50']:.3f} ms   p99 {stats['p99']:.3f} ms")
+    print(f"  REST calls     : {report['rest_calls']:,} "
+          + ", ".join(f"{route}={count}" for route, count in list(report["rest_calls_by_route"].items())[:6]))
+    print(f"  bytes written  : {report['bytes_written']:,} (write syscalls), "
+          f"{report['storage_bytes_written']:,} (to storage), files grew {report['disk_bytes_growth']:,}")
+    if report["notifications_undelivered"]:
+        print(f"  notifications  : {report['notifications_undelivered']:,} still queued after the drain timeout")
+    print(f"  errors logged  : {report['errors_logged']}")
+    for message, count in report["top_errors"].items():
+        print(f"    {count:>5} x {message}")
+
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--rate", type=float, default=0.0, help="events per second (0 = as fast as possible)")
+    parser.add_argument("--rest-latency", type=float, default=0.0, help="simulated REST latency in seconds")
+    parser.add_argument("--concurrency", type=int, default=256, help="max handlers in flight")
+    parser.add_argument("--events-file", help="replay a recorded JSON-lines stream instead of a synthetic one")
+    parser.add_argument("--record", help="write the replayed stream as JSON lines")
+    parser.add_argument("--json", dest="json_path", help="write the report as JSON")
+    parser.add_argument("--workdir", help="directory for the bot's data files (default: a new temp dir)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--drain-timeout", type=float, default=30.0, help="seconds to wait for background work")
+    args = parser.parse_args()
+    run(args.users, args.events, args.rate, args.rest_latency, args.concurrency,
+        args.events_file, args.record, args.json_path, args.workdir, args.seed, args.drain_timeout)
@@ -0,0 +1,281 @@
+"""
+Benchmark suite: StarChan's hot paths at 1k / 10k / 100k users, with a JSON history.
+
+For every scale, benchmarks.datagen writes the data files once (cached under
+--data-dir if given). Then a child process imports app against a fresh copy of
+them and times:
+
+    add_contribution                         one grant (stores, level check, weekly ranking)
+    check_message_achievements               one message's achievement evaluation
+    AchievementSystem._load_user_data        parse achievements_data.txt into memory
+    AchievementSystem._save_user_data        snapshot and write achievements_data.txt
+    WeeklyContributionManager.get_weekly_leaderboard   top 10 of the week
+    LevelSystem.get_level                    app's and bot_utils' level formulas
+    ResponseGenerator.generate_response      one chatbot reply
+
+Each run is appended as one JSON line to the history file (commit, Python,
+JSON backend, per-scale data sizes and timings). The report shows the change
+against the previous run (best of --repeat) and flags slowdowns beyond --threshold.
+
+Usage (from the STAR directory):
+    python -m benchmarks.suite [--scales 1000,10000,100000] [--repeat 5] [--data-dir ~/.cache/starchan-bench]
+                               [--history benchmarks/history.jsonl] [--threshold 0.15] [--fail-on-regression]
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, Any, List, Callable, Optional, Tuple
+
+STAR_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, STAR_DIR)
+
+import json_codec
+from benchmarks import datagen
+from benchmarks.bench_message_features import build_corpus
+
+DEFAULT_SCALES = (1000, 10000, 100000)
+DEFAULT_HISTORY = os.path.join(STAR_DIR, "benchmarks", "history.jsonl")
+SAMPLE_OPS = 20000  # Calls per repeat for the per-operation benchmarks
+REPLY_OPS = 2000  # generate_response is much slower than the rest
+
+
+def time_ops(func: Callable[[], Any], ops: int, repeat: int) -> Dict[str, Any]:
+    """Run func (which performs `ops` operations) `repeat` times; microseconds per operation."""
+    per_op = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        per_op.append((time.perf_counter() - start) * 1e6 / ops)
+    return {"ops": ops, "best_us": min(per_op), "median_us": statistics.median(per_op)}
+
+
+def run_child(users: int, workdir: str, repeat: int, seed: int) -> Dict[str, Any]:
+    """Import app against the data in workdir and time every benchmark (runs in its own process)."""
+    os.chdir(workdir)
+    import app
+    from achievements import AchievementSystem, check_message_achievements
+    import bot_utils
+    from bot_utils import WeeklyContributionManager, ResponseGenerator
+
+    # Timings should not include formatting INFO lines to the console and log file
+    logging.getLogger().setLevel(logging.WARNING)
+    # The running bot flushes achievement progress from a scheduler job, not inside checks
+    app.achievement_system.scheduled_saves = True
+
+    rng = random.Random(seed)
+    ids = sorted(app.lifetime_earnings)
+    # Activity is skewed: most calls come from a small share of the users
+    sample = [ids[min(int(rng.paretovariate(1.1)) - 1, len(ids) - 1) * 7919 % len(ids)] for _ in range(SAMPLE_OPS)]
+    results: Dict[str, Dict[str, Any]] = {}
+
+    loop = asyncio.new_event_loop()
+
+    async def grant_all():
+        for user_id in sample:
+            await app.add_contribution(user_id, 5)
+    results["add_contribution"] = time_ops(lambda: loop.run_until_complete(grant_all()), len(sample), repeat)
+    loop.close()
+
+    system = app.achievement_system
+    message_counts = {int(user_id): system.get_user_counters(int(user_id)).get("messages", 0) for user_id in set(sample)}
+    levels = {int(user_id): app.get_user_level(user_id) for user_id in set(sample)}
+
+    def check_all():
+        for index, user_id in enumerate(sample):
+            user_id = int(user_id)
+            message_counts[user_id] += 1
+            check_message_achievements(user_id, message_counts[user_id], levels[user_id], index % 24,
+                                       has_emoji=index % 5 == 0, has_question=index % 7 == 0)
+    results["check_message_achievements"] = time_ops(check_all, len(sample), repeat)
+
+    # A second system over the same file, so loading doesn't disturb the one app uses
+    loaded = AchievementSystem(datagen.ACHIEVEMENTS_FILE)
+
+    def load():
+        loaded.user_data = {}
+        loaded.user_counters = {}
+        loaded._unlocked.clear()
+        loaded._aggregates_ready = False
+        loaded._load_user_data()
+    results["AchievementSystem._load_user_data"] = time_ops(load, 1, repeat)
+    # No running loop: the I/O job runs inline, so this is the snapshot plus the file write
+    results["AchievementSystem._save_user_data"] = time_ops(loaded._save_user_data, 1, repeat)
+
+    results["WeeklyContributionManager.get_weekly_leaderboard"] = time_ops(
+        lambda: [WeeklyContributionManager.get_weekly_leaderboard(10) for _ in range(SAMPLE_OPS)], SAMPLE_OPS, repeat)
+
+    points = [app.lifetime_earnings[user_id] for user_id in sample]
+    results["LevelSystem.get_level (app)"] = time_ops(
+        lambda: [app.LevelSystem.get_level(value) for value in points], len(points), repeat)
+    results["LevelSystem.get_level (bot_utils)"] = time_ops(
+        lambda: [bot_utils.LevelSystem.get_level(value) for value in points], len(points), repeat)
+
+    corpus = build_corpus(REPLY_OPS, seed)
+    context = {"recent_messages": [], "preferences": {}}
+
+    def reply_all():
+        random.seed(seed)
+        for index, message in enumerate(corpus):
+            ResponseGenerator.generate_response(message, sample[index], context)
+    results["ResponseGenerator.generate_response"] = time_ops(reply_all, len(corpus), repeat)
+
+    app.io_service.shutdown()
+    return results
+
+
+def prepare_data(users: int, data_dir: str, seed: int, catalog) -> Tuple[str, Dict[str, Any]]:
+    """Generated data for a scale, reused from data_dir when it's already there."""
+    directory = os.path.join(data_dir, f"users-{users}-seed-{seed}")
+    summary_file = os.path.join(directory, "summary.json")
+    if os.path.exists(summary_file):
+        with open(summary_file, "r", encoding="utf-8") as f:
+            return directory, json.load(f)
+    start = time.perf_counter()
+    summary = datagen.generate(directory, users, seed, catalog)
+    summary["generate_seconds"] = time.perf_counter() - start
+    with open(summary_file, "w", encoding="utf-8") as f:
+        json.dump(summary, f)
+    return directory, summary
+
+
+def run_scale(users: int, data_directory: str, repeat: int, seed: int) -> Dict[str, Any]:
+    """Run the benchmarks for one scale in a child process on a scratch copy of the data."""
+    with tempfile.TemporaryDirectory(prefix=f"starchan-bench-{users}-") as workdir:
+        for name in os.listdir(data_directory):
+            if name != "summary.json":
+                shutil.copy2(os.path.join(data_directory, name), workdir)
+        result_file = os.path.join(workdir, "result.json")
+        command = [sys.executable, "-m", "benchmarks.suite", "--child", "--users", str(users),
+                   "--workdir", workdir, "--repeat", str(repeat), "--seed", str(seed), "--result-file", result_file]
+        completed = subprocess.run(command, cwd=STAR_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if completed.returncode != 0:
+            raise RuntimeError(f"benchmark child for {users} users failed:\n{completed.stderr[-4000:]}")
+        with open(result_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+
+def git_revision() -> Dict[str, Any]:
+    """Current commit and whether the tree has uncommitted changes (None outside a git checkout)."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=STAR_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=STAR_DIR,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+def load_history(path: str) -> List[Dict[str, Any]]:
+    """Every run recorded in the history file, oldest first."""
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def format_us(value: float) -> str:
+    """Microseconds as a human-sized duration."""
+    if value >= 1e6:
+        return f"{value / 1e6:.2f} s"
+    if value >= 1e3:
+        return f"{value / 1e3:.2f} ms"
+    return f"{value:.2f} us"
+
+
+def report(entry: Dict[str, Any], previous: Optional[Dict[str, Any]], threshold: float) -> List[str]:
+    """Print the run against the previous one. Returns the regressions found."""
+    regressions = []
+    if previous:
+        print(f"Compared with {previous['revision'].get('commit')} ({previous['timestamp']}); "
+              f"slower than +{threshold:.0%} is flagged")
+    for scale, data in entry["scales"].items():
+        print(f"\n{int(scale):,} users (economy db {data['data']['economy_db_bytes']:,} bytes, "
+              f"achievements {data['data']['achievements_bytes']:,} bytes)")
+        before = (previous or {}).get("scales", {}).get(scale, {}).get("benchmarks", {})
+        for name, timing in data["benchmarks"].items():
+            line = f"  {name:<50} {format_us(timing['median_us']):>11} /op  (best {format_us(timing['best_us'])})"
+            old = before.get(name)
+            # Best-of-repeat is the least noisy number to compare runs on
+            if old and old["best_us"] > 0:
+                change = timing["best_us"] / old["best_us"] - 1
+                line += f"  {change:+7.1%}"
+                if change > threshold:
+                    line += "  REGRESSION"
+                    regressions.append(f"{name} at {int(scale):,} users: {change:+.1%}")
+            print(line)
+    return regressions
+
+
+def run(scales: List[int], repeat: int, history: str, data_dir: Optional[str], threshold: float, seed: int) -> int:
+    catalog = datagen.achievement_catalog()
+    entry = {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "json_backend": json_codec.BACKEND,
+        "repeat": repeat,
+        "seed": seed,
+        "scales": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="starchan-bench-data-") as scratch:
+        for users in scales:
+            print(f"Running {users:,} users...", flush=True)
+            directory, summary = prepare_data(users, data_dir or scratch, seed, catalog)
+            entry["scales"][str(users)] = {"data": summary, "benchmarks": run_scale(users, directory, repeat, seed)}
+
+    runs = load_history(history)
+    # Compare with the last run on the same machine and settings
+    previous = next((run for run in reversed(runs)
+                     if run["platform"] == entry["platform"] and run["repeat"] == repeat and run["seed"] == seed), None)
+    regressions = report(entry, previous, threshold)
+
+    os.makedirs(os.path.dirname(os.path.abspath(history)), exist_ok=True)
+    with open(history, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+    print(f"\nAppended run {len(runs) + 1} to {history}")
+    if regressions:
+        print(f"{len(regressions)} regression(s): " + "; ".join(regressions))
+    return len(regressions)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", default=",".join(str(users) for users in DEFAULT_SCALES),
+                        help="comma-separated user counts")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="JSON-lines file the run is appended to")
+    parser.add_argument("--data-dir", help="keep generated data files here and reuse them on later runs")
+    parser.add_argument("--threshold", type=float, default=0.15, help="slowdown flagged as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 on a regression")
+    parser.add_argument("--seed", type=int, default=42)
+    # Internal: one scale in a fresh interpreter
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--users", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        results = run_child(args.users, args.workdir, args.repeat, args.seed)
+        with open(args.result_file, "w", encoding="utf-8") as f:
+            json.dump(results, f)
+        sys.exit(0)
+
+    data_dir = os.path.abspath(os.path.expanduser(args.data_dir)) if args.data_dir else None
+    found = run([int(users) for users in args.scales.split(",")], args.repeat,
+                os.path.abspath(args.history), data_dir, args.threshold, args.seed)
+    sys.exit(1 if found and args.fail_on_regression else 0)
@@ -3,15 +3,23 @@ StarChan Bot Utilities Module
 Contains utility functions, configurations, and helper classes for the Discord bot.
 """
 
-import json
 import logging
 import time
 import random
 import os
 import datetime
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 import discord
 from discord.ext import commands
+from economy_db import economy_db, WeeklyTableBackend
+from message_features import MessageFeatures, extract_features
+from keyword_matcher import KeywordMatcher
+from chat_memory import ChatMemoryStore
+from ranked_index import RankedIndex
+from persistence import WriteBehindStore, store_manager, io_service
+import json_codec
+from channel_cache import ChannelCache
+from notifications import AchievementNotifier
 
 # Set up module logger
 logger = logging.getLogger('StarChan.Utils')
@@ -33,6 +41,10 @@ BOT_CONFIG = {
     "COUNTING_MILESTONE_BONUS": 50,
     "VIP_ROLE_NAME": "⚜️ VIP ⚜️",  # Legacy - role no longer used
     "RIDDLE_RESET_DAY": 0,  # Monday (0=Monday, 6=Sunday)
+    "CHATTERBOT_MAX_USERS": 200,  # Users whose chatterbot memory stays in RAM (LRU beyond this)
+    "CHATTERBOT_MAX_HISTORY": 10,  # Conversation turns kept per user
+    "CHATTERBOT_MAX_MEMORIES": 25,  # Memory bank entries kept per user
+    "CHATTERBOT_MAX_FAVORITE_GAMES": 10,  # Favorite games kept per user
 }
 
 # File paths
@@ -496,19 +508,21 @@ class DataManager:
     @staticmethod
     def load_json_file(filename: str, default_data: Any) -> Any:
         """Load data from a JSON file with error handling."""
+        # A write still queued on the I/O thread is newer than the file
+        pending = io_service.pending_json(filename)
+        if pending is not None:
+            return pending
         try:
-            with open(filename, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError) as e:
+            return json_codec.load_file(filename)
+        except (FileNotFoundError, json_codec.JSONDecodeError) as e:
             logger.warning(f"Could not load {filename}: {e}. Using default data.")
             return default_data
     
     @staticmethod
     def save_json_file(filename: str, data: Any) -> bool:
-        """Save data to a JSON file with error handling."""
+        """Snapshot data and write it (compact, atomically) on the I/O thread."""
         try:
-            with open(filename, 'w') as f:
-                json.dump(data, f, indent=2)
+            io_service.write_json(filename, data)
             return True
         except Exception as e:
             logger.error(f"Error saving {filename}: {e}")
@@ -516,21 +530,21 @@ class DataManager:
     
     @staticmethod
     def load_counting_state() -> Dict[str, Any]:
-        """Load counting state from file."""
-        return DataManager.load_json_file(
-            DATA_FILES["COUNTING_STATE"],
+        """Load counting state from the economy database."""
+        return economy_db.get_state(
+            "counting_state",
             {"channel_id": None, "current": 0, "last_user": None}
         )
     
     @staticmethod
     def load_contributions() -> Dict[str, int]:
-        """Load contributions from file."""
-        return DataManager.load_json_file(DATA_FILES["CONTRIBUTIONS"], {})
+        """Load contributions from the economy database."""
+        return economy_db.load_table("contributions")
     
     @staticmethod
     def load_last_active() -> Dict[str, float]:
-        """Load last active timestamps from file."""
-        return DataManager.load_json_file(DATA_FILES["LAST_ACTIVE"], {})
+        """Load last active timestamps from the economy database."""
+        return economy_db.load_table("last_active")
     
     @staticmethod
     def load_riddle_state() -> Dict[str, Any]:
@@ -549,19 +563,17 @@ class DataManager:
     
     @staticmethod
     def load_weekly_contributions() -> Dict[str, Any]:
-        """Load weekly contributions from file."""
-        return DataManager.load_json_file(
-            DATA_FILES["WEEKLY_CONTRIBUTIONS"],
-            {
-                "week_start": 0,
-                "contributions": {}  # {user_id: points}
-            }
-        )
+        """Load the current week's contributions from the economy database."""
+        week_start = economy_db.get_state("weekly_week_start", 0)
+        return {
+            "week_start": week_start,
+            "contributions": economy_db.get_weekly_contributions(week_start)  # {user_id: points}
+        }
     
     @staticmethod
     def load_lifetime_earnings() -> Dict[str, int]:
-        """Load lifetime earnings from file."""
-        return DataManager.load_json_file(DATA_FILES["LIFETIME_EARNINGS"], {})
+        """Load lifetime earnings from the economy database."""
+        return economy_db.load_table("lifetime_earnings")
 
 class RiddleManager:
     """Manages the daily riddle system."""
@@ -601,6 +613,14 @@ class RiddleManager:
         
         return WEEKLY_RIDDLES[riddle_state["current_riddle_index"]]
     
+    @staticmethod
+    def rollover() -> bool:
+        """Start the new day's riddle ahead of the first command. Returns True if it changed."""
+        riddle_state = DataManager.load_riddle_state()
+        previous_day_start = riddle_state.get("day_start", 0)
+        RiddleManager.get_current_riddle(riddle_state)
+        return riddle_state.get("day_start") != previous_day_start
+    
     @staticmethod
     def check_answer(user_answer: str, correct_answers: List[str]) -> bool:
         """Check if the user's answer matches any of the correct answers."""
@@ -751,6 +771,9 @@ class EmbedHelper:
             color=discord.Color.orange()
         )
 
+# Last channel per user and eligible announcement channels per guild (see channel_cache.py)
+channel_cache = ChannelCache(PermissionHelper.is_forbidden_channel)
+
 class ChannelHelper:
     """Helper functions for channel management."""
     
@@ -762,44 +785,9 @@ class ChannelHelper:
     ) -> Optional[discord.TextChannel]:
         """Find a suitable channel to send messages with error handling."""
         try:
-            # Use preferred channel if valid
-            if (preferred_channel and 
-                hasattr(preferred_channel, "send") and 
-                preferred_channel.permissions_for(guild.me).send_messages):
-                return preferred_channel
-            
-            # Try to find the most recent channel the user spoke in
-            try:
-                for text_channel in guild.text_channels:
-                    if (not text_channel.permissions_for(guild.me).read_message_history or
-                        PermissionHelper.is_forbidden_channel(text_channel.id)):
-                        continue
-                    async for message in text_channel.history(limit=100):
-                        if message.author.id == member.id:
-                            if text_channel.permissions_for(guild.me).send_messages:
-                                return text_channel
-                            break
-            except discord.HTTPException:
-                pass  # Continue if we can't read history
-            
-            # Find any suitable channel
-            for channel in guild.text_channels:
-                if (channel.permissions_for(member).read_messages and
-                    channel.permissions_for(guild.me).send_messages and
-                    channel != guild.rules_channel and
-                    channel != guild.system_channel and
-                    not PermissionHelper.is_forbidden_channel(channel.id)):
-                    return channel
-            
-            # Last resort: system or rules channel (but not the forbidden channels)
-            for channel in [guild.system_channel, guild.rules_channel]:
-                if (channel and 
-                    channel.permissions_for(guild.me).send_messages and
-                    not PermissionHelper.is_forbidden_channel(channel.id)):
-                    return channel
-                    
-            return None
-            
+            # Preferred channel, else where the member last spoke, else the first
+            # eligible channel they can read - all from cache, no history scans
+            return channel_cache.resolve(guild, member, preferred_channel)
         except Exception as e:
             logger.error(f"Error finding suitable channel: {e}")
             return None
@@ -813,11 +801,17 @@ def format_time_remaining(seconds: int) -> str:
 class WeeklyContributionManager:
     """Manages weekly contribution tracking for leaderboards."""
     
+    WEEK_SECONDS = 7 * 24 * 3600
+    
+    # Cached state of the current week: start, precomputed rollover deadline and ranking
+    _week_start: Optional[int] = None
+    _next_rollover: float = 0.0
+    _ranking: Optional[RankedIndex] = None
+    
     @staticmethod
     def get_week_start_timestamp() -> int:
         """Get the timestamp for the start of the current week (Monday 00:00 UTC)."""
-        import datetime
-        now = datetime.datetime.utcnow()
+        now = datetime.datetime.now(datetime.timezone.utc)
         days_since_monday = now.weekday()  # Monday is 0
         week_start = now.replace(hour=0, minute=0, second=0, microsecond=0) - datetime.timedelta(days=days_since_monday)
         return int(week_start.timestamp())
@@ -844,36 +838,88 @@ class WeeklyContributionManager:
         elif last_week_start is None:
             return True
         
-        return current_week_start > last_week_start
+        # Older markers were computed in local time; less than a day apart is the same Monday
+        return current_week_start - last_week_start >= 24 * 3600
+    
+    @staticmethod
+    def _load_week() -> None:
+        """Load the stored week into memory, archiving and resetting it first if it's stale."""
+        stored_week_start = economy_db.get_state("weekly_week_start", 0)
+        if WeeklyContributionManager.is_new_week(stored_week_start):
+            # Save the top 10 contributors from the previous week before resetting
+            previous = economy_db.get_weekly_contributions(stored_week_start) if isinstance(stored_week_start, int) else {}
+            if previous:
+                WeeklyContributionManager.save_top_contributors(previous)
+            week_start = WeeklyContributionManager.get_week_start_timestamp()
+            economy_db.set_state("weekly_week_start", week_start)
+            economy_db.delete_weeks_before(week_start)
+            data = {}
+        else:
+            week_start = int(stored_week_start)
+            data = economy_db.get_weekly_contributions(week_start)
+        
+        weekly_store.reset(data)
+        weekly_store.backend.week_start = week_start
+        WeeklyContributionManager._ranking = RankedIndex(data)
+        WeeklyContributionManager._week_start = week_start
+        WeeklyContributionManager._next_rollover = week_start + WeeklyContributionManager.WEEK_SECONDS
+        logger.info(f"Weekly contributions loaded: {len(data)} users, next reset at {WeeklyContributionManager._next_rollover}")
+    
+    @staticmethod
+    def rollover() -> None:
+        """Archive the finished week and start a new one (runs at Monday 00:00 UTC)."""
+        if WeeklyContributionManager._week_start is None:
+            WeeklyContributionManager._load_week()
+            return
+        
+        week_start = WeeklyContributionManager.get_week_start_timestamp()
+        if week_start <= WeeklyContributionManager._week_start:
+            # Woke up early (clock adjustment); keep the current week
+            WeeklyContributionManager._next_rollover = WeeklyContributionManager._week_start + WeeklyContributionManager.WEEK_SECONDS
+            return
+        
+        # Write what's still pending to the old week, then archive from memory
+        if not weekly_store.flush_sync():
+            logger.error("Could not flush last week's contributions before the reset; archiving from memory")
+        previous = WeeklyContributionManager._ranking.items()
+        if previous:
+            WeeklyContributionManager.save_top_contributors(previous)
+        
+        # Rows are keyed by week, so moving the marker is the reset
+        economy_db.set_state("weekly_week_start", week_start)
+        economy_db.delete_weeks_before(week_start)
+        weekly_store.reset()
+        weekly_store.backend.week_start = week_start
+        WeeklyContributionManager._ranking.clear()
+        WeeklyContributionManager._week_start = week_start
+        WeeklyContributionManager._next_rollover = week_start + WeeklyContributionManager.WEEK_SECONDS
+        logger.info(f"Weekly contributions reset: archived {len(previous)} users, new week starts {week_start}")
+    
+    @staticmethod
+    def get_current_week_start() -> int:
+        """Return the cached week start; a single comparison against the precomputed deadline."""
+        if WeeklyContributionManager._week_start is None:
+            WeeklyContributionManager._load_week()
+        elif time.time() >= WeeklyContributionManager._next_rollover and not weekly_store.flushing:
+            # The scheduled task normally gets here first; this covers a late or missing task
+            WeeklyContributionManager.rollover()
+        return WeeklyContributionManager._week_start
+    
+    @staticmethod
+    async def scheduled_rollover() -> None:
+        """Scheduler job for Monday 00:00 UTC: flush the finished week, then roll over."""
+        await weekly_store.flush()
+        WeeklyContributionManager.get_current_week_start()
     
     @staticmethod
     def get_weekly_data() -> Dict[str, Any]:
-        """Get current weekly contribution data, resetting if it's a new week."""
+        """Get current weekly contribution data from memory."""
         try:
-            weekly_data = DataManager.load_weekly_contributions()
-            current_week_start = WeeklyContributionManager.get_week_start_timestamp()
-            
-            # Ensure the data structure is correct
-            if not isinstance(weekly_data, dict):
-                weekly_data = {"week_start": 0, "contributions": {}}
-            if "contributions" not in weekly_data:
-                weekly_data["contributions"] = {}
-            
-            # Check if we need to reset for a new week
-            if WeeklyContributionManager.is_new_week(weekly_data.get("week_start", 0)):
-                # Save the top 10 contributors from the previous week before resetting
-                if weekly_data.get("contributions"):
-                    WeeklyContributionManager.save_top_contributors(weekly_data["contributions"])
-                
-                # Reset for new week
-                weekly_data = {
-                    "week_start": current_week_start,
-                    "contributions": {}
-                }
-                # Save the reset data
-                DataManager.save_json_file(DATA_FILES["WEEKLY_CONTRIBUTIONS"], weekly_data)
-            
-            return weekly_data
+            week_start = WeeklyContributionManager.get_current_week_start()
+            return {
+                "week_start": week_start,
+                "contributions": dict(weekly_store.data)
+            }
             
         except Exception as e:
             logger.error(f"Error in get_weekly_data: {e}")
@@ -884,19 +930,54 @@ class WeeklyContributionManager:
                 "contributions": {}
             }
     
+    @staticmethod
+    def get_ranking() -> RankedIndex:
+        """Get the ranked index for the current week."""
+        WeeklyContributionManager.get_current_week_start()
+        return WeeklyContributionManager._ranking
+    
     @staticmethod
     def add_weekly_points(user_id: str, points: int) -> None:
-        """Add points to user's weekly contribution total."""
-        weekly_data = WeeklyContributionManager.get_weekly_data()
-        weekly_data["contributions"][user_id] = weekly_data["contributions"].get(user_id, 0) + points
-        DataManager.save_json_file(DATA_FILES["WEEKLY_CONTRIBUTIONS"], weekly_data)
+        """Add points to user's weekly contribution total (in memory; written behind)."""
+        try:
+            WeeklyContributionManager.get_current_week_start()
+            WeeklyContributionManager._ranking.set(user_id, weekly_store.increment(user_id, points))
+        except Exception as e:
+            logger.error(f"Error adding weekly points for {user_id}: {e}")
     
+    @staticmethod
+    def remove_users(user_ids: List[str]) -> int:
+        """Drop users from this week's totals and ranking (departed members). Returns how many were there."""
+        ranking = WeeklyContributionManager.get_ranking()
+        removed = 0
+        for user_id in user_ids:
+            ranking.remove(user_id)
+            removed += weekly_store.discard(user_id)
+        return removed
+
     @staticmethod
     def get_weekly_leaderboard(limit: int = 10) -> List[tuple]:
-        """Get weekly leaderboard data."""
-        weekly_data = WeeklyContributionManager.get_weekly_data()
-        contributions = weekly_data.get("contributions", {})
-        return sorted(contributions.items(), key=lambda x: x[1], reverse=True)[:limit]
+        """Get weekly leaderboard data from the ranked index (no sort per call)."""
+        try:
+            return WeeklyContributionManager.get_ranking().top(limit)
+        except Exception as e:
+            logger.error(f"Error getting weekly leaderboard: {e}")
+            return []
+    
+    @staticmethod
+    def get_user_rank(user_id: str) -> Dict[str, Any]:
+        """Get a user's weekly rank, points and the entries around them."""
+        try:
+            ranking = WeeklyContributionManager.get_ranking()
+            return {
+                "rank": ranking.rank(user_id),
+                "points": ranking.score(user_id),
+                "total": len(ranking),
+                "neighbors": ranking.neighbors(user_id)
+            }
+        except Exception as e:
+            logger.error(f"Error getting weekly rank for {user_id}: {e}")
+            return {"rank": None, "points": 0, "total": 0, "neighbors": []}
     
     @staticmethod
     def get_time_until_next_week() -> str:
@@ -1121,6 +1202,9 @@ class WeeklyContributionManager:
         except Exception as e:
             return f"❌ Error reading file: {str(e)}"
 
+# Write-behind store for the current week's totals; the rollover points it at the next week
+weekly_store = store_manager.register(WriteBehindStore("weekly_contributions", WeeklyTableBackend(economy_db)))
+
 class ShopHelper:
     """Helper class for interactive shop system with tiered selection."""
     
@@ -1472,6 +1556,14 @@ async def send_achievement_notification(bot, user, achievement):
         return False
 
 
+# Outbound queue for achievement announcements (see notifications.py)
+achievement_notifier = AchievementNotifier(lambda: BOT_CONFIG.get("ACHIEVEMENT_CHANNEL_ID"))
+
+def queue_achievement_notification(bot, user, achievement) -> None:
+    """Queue an unlock announcement; a background worker groups and sends it, so callers never wait."""
+    achievement_notifier.enqueue(bot, user, achievement)
+
+
 # =============================================================================
 # HUMOR COMMANDS - ROAST AND PRAISE
 # =============================================================================
@@ -1671,13 +1763,12 @@ async def dadjoke_command(ctx, bot):
         
         # Always update progress first
         user_achievement.progress["pun_uses"] = current_uses
-        achievement_system._progress_updated = True
-        achievement_system._save_progress_updates()  # Force save immediately
+        achievement_system.mark_progress_updated(ctx.author.id)
         
         # Update progress and check if achievement should be unlocked
         if achievement_system.check_achievement(ctx.author.id, "pun_lover", {"pun_uses": current_uses}):
             achievement = achievement_system.achievements["pun_lover"]
-            await send_achievement_notification(bot, ctx.author, achievement)
+            queue_achievement_notification(bot, ctx.author, achievement)
             # Note: Points will be awarded by the calling function in app.py if needed
     
     except Exception as e:
@@ -1762,13 +1853,12 @@ class ContentFilter:
     """Filter system to avoid controversial topics."""
     
     @staticmethod
-    def contains_filtered_content(text: str) -> bool:
+    def contains_filtered_content(text: str, text_lower: Optional[str] = None,
+                                  matches: Optional[Dict[str, Tuple[str, ...]]] = None) -> bool:
         """Check if text contains filtered topics."""
-        text_lower = text.lower()
-        for topic in ChatterBotConfig.FILTERED_TOPICS:
-            if topic in text_lower:
-                return True
-        return False
+        if matches is None:
+            matches = CHAT_KEYWORDS.scan(text_lower if text_lower is not None else text.lower())
+        return "filtered" in matches
     
     @staticmethod
     def get_redirect_response() -> str:
@@ -1887,35 +1977,41 @@ class ResponseGenerator:
         "platforms": ["Steam", "Epic", "PlayStation", "Xbox", "Nintendo Switch", "PC"]
     }
     
+    # Intent vocabularies
+    GREETINGS = ["hi", "hello", "hey", "yo", "sup", "what's up", "howdy", "good morning", "good evening"]
+    HELP_INDICATORS = ["help", "how do i", "can you", "what is", "where", "when", "why", "how to"]
+    GAMING_TERMS = ["game", "gaming", "play", "steam", "xbox", "playstation", "nintendo", "pc",
+                    "fps", "rpg", "mmo", "level", "quest", "boss", "character", "multiplayer"]
+    DISCORD_TERMS = ["discord", "server", "channel", "role", "bot", "command", "slash command"]
+    ACHIEVEMENT_TERMS = ["won", "beat", "completed", "finished", "got", "unlocked", "achieved"]
+    
     @staticmethod
-    def analyze_intent(message: str) -> str:
+    def analyze_intent(message: str, message_lower: Optional[str] = None,
+                       matches: Optional[Dict[str, Tuple[str, ...]]] = None) -> str:
         """Enhanced intent analysis with emotion detection."""
-        message_lower = message.lower()
+        if message_lower is None:
+            message_lower = message.lower()
+        if matches is None:
+            matches = CHAT_KEYWORDS.scan(message_lower)
         
         # Greeting detection (more sophisticated)
-        greetings = ["hi", "hello", "hey", "yo", "sup", "what's up", "howdy", "good morning", "good evening"]
-        if any(greeting in message_lower for greeting in greetings) and len(message.split()) <= 3:
+        if "greeting" in matches and len(message.split()) <= 3:
             return "greeting"
         
         # Help/Question detection (more nuanced)
-        help_indicators = ["help", "how do i", "can you", "what is", "where", "when", "why", "how to"]
-        if any(indicator in message_lower for indicator in help_indicators):
+        if "help" in matches:
             return "help"
         
         # Gaming detection (expanded)
-        gaming_terms = ["game", "gaming", "play", "steam", "xbox", "playstation", "nintendo", "pc", 
-                       "fps", "rpg", "mmo", "level", "quest", "boss", "character", "multiplayer"]
-        if any(term in message_lower for term in gaming_terms):
+        if "gaming" in matches:
             return "gaming"
         
         # Discord/Bot detection
-        discord_terms = ["discord", "server", "channel", "role", "bot", "command", "slash command"]
-        if any(term in message_lower for term in discord_terms):
+        if "discord" in matches:
             return "discord"
         
         # Achievement/Success detection
-        achievement_terms = ["won", "beat", "completed", "finished", "got", "unlocked", "achieved"]
-        if any(term in message_lower for term in achievement_terms):
+        if "achievement" in matches:
             return "achievement"
         
         # Question detection
@@ -1925,13 +2021,15 @@ class ResponseGenerator:
         return "conversation"
     
     @staticmethod
-    def detect_emotion(message: str) -> str:
+    def detect_emotion(message: str, message_lower: Optional[str] = None,
+                       matches: Optional[Dict[str, Tuple[str, ...]]] = None) -> str:
         """Detect emotional tone of the message."""
-        message_lower = message.lower()
+        if matches is None:
+            matches = CHAT_KEYWORDS.scan(message_lower if message_lower is not None else message.lower())
         emotion_scores = {}
         
-        for emotion, keywords in ResponseGenerator.EMOTION_KEYWORDS.items():
-            score = sum(1 for keyword in keywords if keyword in message_lower)
+        for emotion in ResponseGenerator.EMOTION_KEYWORDS:
+            score = len(matches.get(f"emotion:{emotion}", ()))
             if score > 0:
                 emotion_scores[emotion] = score
         
@@ -1939,16 +2037,22 @@ class ResponseGenerator:
         return max(emotion_scores, key=emotion_scores.get) if emotion_scores else "neutral"
     
     @staticmethod
-    def generate_response(message: str, user_id: str, context: Dict[str, Any]) -> str:
+    def generate_response(message: str, user_id: str, context: Dict[str, Any],
+                          features: Optional[MessageFeatures] = None) -> str:
         """Generate intelligent, contextual response."""
+        if features is None:
+            features = extract_features(message)
+        
+        # One keyword scan shared by the filter, intent, emotion and game detection
+        matches = CHAT_KEYWORDS.scan(features.lower)
         
         # Filter check first
-        if ContentFilter.contains_filtered_content(message):
+        if ContentFilter.contains_filtered_content(message, features.lower, matches):
             return ContentFilter.get_redirect_response()
         
         # Analyze intent and emotion
-        intent = ResponseGenerator.analyze_intent(message)
-        emotion = ResponseGenerator.detect_emotion(message)
+        intent = ResponseGenerator.analyze_intent(message, features.lower, matches)
+        emotion = ResponseGenerator.detect_emotion(message, features.lower, matches)
         
         # Get conversation history for context
         history = context.get("recent_messages", [])
@@ -1956,7 +2060,7 @@ class ResponseGenerator:
         
         # Generate contextual response
         response = ResponseGenerator._generate_contextual_response(
-            message, intent, emotion, history, user_preferences
+            message, intent, emotion, history, user_preferences, matches
         )
         
         # Add personality and polish
@@ -1965,7 +2069,8 @@ class ResponseGenerator:
         return response
     
     @staticmethod
-    def _generate_contextual_response(message: str, intent: str, emotion: str, history: List, preferences: Dict) -> str:
+    def _generate_contextual_response(message: str, intent: str, emotion: str, history: List, preferences: Dict,
+                                      matches: Dict[str, Tuple[str, ...]]) -> str:
         """Generate highly intelligent response based on context and deep understanding."""
         
         # Handle different intents with enhanced intelligence
@@ -1983,18 +2088,15 @@ class ResponseGenerator:
                 return random.choice(ResponseGenerator.ADVANCED_TEMPLATES["greeting"]["friendly"])
         
         elif intent == "gaming":
-            message_lower = message.lower()
             detected_games = []
             detected_category = None
             
             # Enhanced game detection with category understanding
-            for category, game_data in ResponseGenerator.GAMING_KNOWLEDGE.items():
-                games = game_data.get("games", []) if isinstance(game_data, dict) else game_data
-                for game in games:
-                    if game.lower() in message_lower:
-                        detected_games.append(game)
-                        detected_category = category
-                        break
+            for category in ResponseGenerator.GAMING_KNOWLEDGE:
+                games = matches.get(f"game:{category}")
+                if games:
+                    detected_games.append(games[0])
+                    detected_category = category
             
             if detected_games and detected_category:
                 game = detected_games[0]
@@ -2166,20 +2268,29 @@ class ResponseGenerator:
         
         return response
 
+# Bounded chatterbot memory shared by every ChatterBot instance
+chat_memory_store = store_manager.register(ChatMemoryStore(
+    economy_db,
+    max_users=BOT_CONFIG["CHATTERBOT_MAX_USERS"],
+    max_history=BOT_CONFIG["CHATTERBOT_MAX_HISTORY"],
+    max_memories=BOT_CONFIG["CHATTERBOT_MAX_MEMORIES"],
+    max_favorite_games=BOT_CONFIG["CHATTERBOT_MAX_FAVORITE_GAMES"]
+))
+
 class ChatterBot:
     """Enhanced AI chatterbot with advanced memory and context awareness."""
     
-    def __init__(self):
-        self.conversation_history: Dict[str, List[Dict[str, Any]]] = {}
-        self.last_response_time: Dict[str, datetime.datetime] = {}
+    # Communication style vocabularies
+    HUMOR_WORDS = ["lol", "lmao", "haha", "😄", "😂"]
+    ENTHUSIASM_WORDS = ["awesome", "amazing", "love", "!"]
+    
+    def __init__(self, memory: Optional[ChatMemoryStore] = None):
         self.cooldown_seconds = 5  # Prevent spam
         self.enabled = False  # Start disabled
         
-        # Advanced features
-        self.user_preferences: Dict[str, Dict[str, Any]] = {}
-        self.conversation_context: Dict[str, Dict[str, Any]] = {}
-        self.memory_bank: Dict[str, List[str]] = {}  # Remember interesting things users say
-        self.max_history_length = 10  # Keep last 10 messages for context
+        # Bounded, persistent per-user history, preferences and memory bank
+        self.memory = memory if memory is not None else chat_memory_store
+        self.max_history_length = self.memory.max_history
         
     def is_enabled(self) -> bool:
         """Check if chatterbot is enabled."""
@@ -2207,8 +2318,9 @@ class ChatterBot:
             
         # Check cooldown
         now = datetime.datetime.now()
-        if user_id in self.last_response_time:
-            if now - self.last_response_time[user_id] < datetime.timedelta(seconds=self.cooldown_seconds):
+        user_memory = self.memory.peek(user_id)
+        if user_memory is not None and user_memory.last_response_time is not None:
+            if now - user_memory.last_response_time < datetime.timedelta(seconds=self.cooldown_seconds):
                 return False
         
         # Don't respond to commands (starting with !)
@@ -2218,51 +2330,45 @@ class ChatterBot:
         # If we get here, it's you mentioning the bot - always respond
         return True
     
-    def _learn_from_message(self, user_id: str, message: str) -> None:
+    def _learn_from_message(self, user_id: str, message: str, message_lower: Optional[str] = None) -> None:
         """Learn interesting things from user messages for better context."""
-        message_lower = message.lower()
-        
-        # Initialize user preferences if not exists
-        if user_id not in self.user_preferences:
-            self.user_preferences[user_id] = {
-                "favorite_games": [],
-                "interests": [],
-                "communication_style": "casual",
-                "emotional_tone": "neutral"
-            }
+        if message_lower is None:
+            message_lower = message.lower()
+        matches = CHAT_KEYWORDS.scan(message_lower)
+        user_memory = self.memory.get(user_id)
         
         # Learn about games user plays
-        for category, games in ResponseGenerator.GAMING_KNOWLEDGE.items():
-            for game in games:
-                if game.lower() in message_lower and game not in self.user_preferences[user_id]["favorite_games"]:
-                    self.user_preferences[user_id]["favorite_games"].append(game)
-                    
+        for category in ResponseGenerator.GAMING_KNOWLEDGE:
+            for game in matches.get(f"game:{category}", ()):
+                if user_memory.add_favorite_game(game):
                     # Remember this in memory bank
-                    if user_id not in self.memory_bank:
-                        self.memory_bank[user_id] = []
-                    self.memory_bank[user_id].append(f"Plays {game}")
+                    user_memory.memories.append(f"Plays {game}")
         
         # Learn communication style
-        if any(word in message_lower for word in ["lol", "lmao", "haha", "😄", "😂"]):
-            self.user_preferences[user_id]["communication_style"] = "humorous"
-        elif any(word in message_lower for word in ["awesome", "amazing", "love", "!"]):
-            self.user_preferences[user_id]["emotional_tone"] = "enthusiastic"
+        if "humor" in matches:
+            user_memory.preferences["communication_style"] = "humorous"
+        elif "enthusiasm" in matches:
+            user_memory.preferences["emotional_tone"] = "enthusiastic"
+        self.memory.mark_dirty(user_id)
     
     def _get_context(self, user_id: str) -> Dict[str, Any]:
         """Enhanced context gathering with memory and preferences."""
+        user_memory = self.memory.get(user_id)
+        history = list(user_memory.history)
         context = {
-            "recent_messages": self.conversation_history.get(user_id, [])[-5:],  # Last 5 messages
-            "preferences": self.user_preferences.get(user_id, {}),
-            "memory": self.memory_bank.get(user_id, []),
-            "conversation_count": len(self.conversation_history.get(user_id, [])),
+            "recent_messages": history[-5:],  # Last 5 messages
+            "preferences": user_memory.preferences,
+            "memory": list(user_memory.memories),
+            "conversation_count": len(history),
             "relationship_level": self._assess_relationship_level(user_id)
         }
         return context
     
     def _assess_relationship_level(self, user_id: str) -> str:
         """Assess how well we know this user."""
-        conversation_count = len(self.conversation_history.get(user_id, []))
-        memory_count = len(self.memory_bank.get(user_id, []))
+        user_memory = self.memory.get(user_id)
+        conversation_count = len(user_memory.history)
+        memory_count = len(user_memory.memories)
         
         if conversation_count > 20 and memory_count > 5:
             return "close_friend"
@@ -2273,10 +2379,10 @@ class ChatterBot:
         else:
             return "new"
     
-    def _update_history(self, user_id: str, user_message: str, bot_response: str) -> None:
+    def _update_history(self, user_id: str, user_message: str, bot_response: str,
+                        message_lower: Optional[str] = None) -> None:
         """Update conversation history with enhanced tracking."""
-        if user_id not in self.conversation_history:
-            self.conversation_history[user_id] = []
+        user_memory = self.memory.get(user_id)
         
         # Add new conversation entry
         entry = {
@@ -2285,39 +2391,42 @@ class ChatterBot:
             "bot_response": bot_response,
             "message_length": len(user_message),
             "response_length": len(bot_response),
-            "intent": ResponseGenerator.analyze_intent(user_message),
-            "emotion": ResponseGenerator.detect_emotion(user_message)
+            "intent": ResponseGenerator.analyze_intent(user_message, message_lower),
+            "emotion": ResponseGenerator.detect_emotion(user_message, message_lower)
         }
         
-        self.conversation_history[user_id].append(entry)
-        
-        # Keep only recent history (memory management)
-        if len(self.conversation_history[user_id]) > self.max_history_length:
-            self.conversation_history[user_id] = self.conversation_history[user_id][-self.max_history_length:]
+        # The deque keeps only recent history (memory management)
+        user_memory.history.append(entry)
+        self.memory.mark_dirty(user_id)
     
-    def get_response(self, message: str, user_id: str, username: str, channel_id: str, mentions_bot: bool = False) -> Optional[str]:
+    def get_response(self, message: str, user_id: str, username: str, channel_id: str, mentions_bot: bool = False,
+                     features: Optional[MessageFeatures] = None) -> Optional[str]:
         """Get an intelligent response with advanced context awareness."""
         
         if not self.should_respond(user_id, message, channel_id, mentions_bot):
             return None
         
+        # Share one analysis of the text with every step below
+        if features is None:
+            features = extract_features(message)
+        
         # Update response time
-        self.last_response_time[user_id] = datetime.datetime.now()
+        self.memory.get(user_id).last_response_time = datetime.datetime.now()
         
         # Learn from this message
-        self._learn_from_message(user_id, message)
+        self._learn_from_message(user_id, message, features.lower)
         
         # Get enhanced context
         context = self._get_context(user_id)
         
         # Generate intelligent response
-        response = ResponseGenerator.generate_response(message, user_id, context)
+        response = ResponseGenerator.generate_response(message, user_id, context, features)
         
         # Add relationship-aware personalization
         response = self._personalize_response(response, user_id, context)
         
         # Update conversation history
-        self._update_history(user_id, message, response)
+        self._update_history(user_id, message, response, features.lower)
         
         return response
     
@@ -2356,18 +2465,58 @@ class ChatterBot:
     
     def get_intelligence_stats(self) -> Dict[str, Any]:
         """Get statistics about the bot's learning and intelligence."""
-        total_conversations = sum(len(history) for history in self.conversation_history.values())
-        total_users = len(self.conversation_history)
-        total_memories = sum(len(memories) for memories in self.memory_bank.values())
-        total_preferences = len(self.user_preferences)
+        # Counts cover resident users; stored_users includes everyone on disk
+        resident = list(self.memory.data.values())
+        total_conversations = sum(len(user_memory.history) for user_memory in resident)
+        total_users = sum(1 for user_memory in resident if user_memory.history)
+        total_memories = sum(len(user_memory.memories) for user_memory in resident)
+        try:
+            stored_users, stored_bytes = self.memory.database.chat_memory_stats()
+        except Exception as e:
+            logger.error(f"Error reading chat memory stats: {e}")
+            stored_users, stored_bytes = 0, 0
         
         return {
             "total_conversations": total_conversations,
             "unique_users": total_users,
             "memories_stored": total_memories,
-            "users_with_preferences": total_preferences,
-            "avg_conversations_per_user": total_conversations / max(total_users, 1)
+            "users_with_preferences": len(resident),
+            "avg_conversations_per_user": total_conversations / max(total_users, 1),
+            "resident_users": len(resident),
+            "stored_users": stored_users,
+            "stored_bytes": stored_bytes
         }
+    
+    def get_preferences(self, user_id: str) -> Dict[str, Any]:
+        """Get a user's learned preferences."""
+        return self.memory.get(user_id).preferences
+    
+    def clear_history(self) -> int:
+        """Clear conversation history for every user; preferences and memories are kept."""
+        return self.memory.clear_histories()
+
+def build_chat_keyword_matcher() -> KeywordMatcher:
+    """Compile every chatterbot vocabulary into one keyword automaton."""
+    matcher = KeywordMatcher()
+    # Topics and terms also match inflections ("vaccines", "games", "servers")
+    matcher.add_vocabulary("filtered", ChatterBotConfig.FILTERED_TOPICS, whole_word=False)
+    matcher.add_vocabulary("gaming", ResponseGenerator.GAMING_TERMS, whole_word=False)
+    matcher.add_vocabulary("discord", ResponseGenerator.DISCORD_TERMS, whole_word=False)
+    matcher.add_vocabulary("greeting", ResponseGenerator.GREETINGS)
+    matcher.add_vocabulary("help", ResponseGenerator.HELP_INDICATORS)
+    matcher.add_vocabulary("achievement", ResponseGenerator.ACHIEVEMENT_TERMS)
+    for emotion, keywords in ResponseGenerator.EMOTION_KEYWORDS.items():
+        matcher.add_vocabulary(f"emotion:{emotion}", keywords)
+    for category, game_data in ResponseGenerator.GAMING_KNOWLEDGE.items():
+        games = game_data.get("games", []) if isinstance(game_data, dict) else game_data
+        for game in games:
+            matcher.add(game, f"game:{category}", game)
+    matcher.add_vocabulary("humor", ChatterBot.HUMOR_WORDS)
+    matcher.add_vocabulary("enthusiasm", ChatterBot.ENTHUSIASM_WORDS)
+    return matcher.compile()
+
+# Keyword automaton shared by the content filter and the response generator
+CHAT_KEYWORDS = build_chat_keyword_matcher()
 
 # Global chatterbot instance
 chatter_bot = ChatterBot()
@@ -0,0 +1,113 @@
+"""
+StarChan Bot Channel Cache
+Per-guild memory of the last channel each user spoke in (fed by on_message) and
+of the channels the bot may post in (rebuilt only after channel, role or bot
+permission changes), so picking where to announce something needs no history
+scans and no REST calls.
+"""
+
+import logging
+from typing import Dict, Any, Optional, List, Callable
+
+import discord
+
+# Set up module logger
+logger = logging.getLogger('StarChan.ChannelCache')
+
+
+class ChannelCache:
+    """Last-spoken channel per user and eligible announcement channels per guild."""
+
+    def __init__(self, is_forbidden: Callable[[int], bool], max_users_per_guild: int = 50000):
+        self.is_forbidden = is_forbidden
+        self.max_users_per_guild = max_users_per_guild
+        self._last_channel: Dict[int, Dict[int, int]] = {}
+        self._eligible: Dict[int, List[discord.TextChannel]] = {}
+        self.stats = {"last_channel_hits": 0, "last_channel_misses": 0,
+                      "eligible_rebuilds": 0, "invalidations": 0}
+
+    def record(self, guild_id: int, user_id: int, channel_id: int) -> None:
+        """Remember where a user just spoke; the oldest user is dropped past the cap."""
+        users = self._last_channel.get(guild_id)
+        if users is None:
+            users = self._last_channel[guild_id] = {}
+        elif users.get(user_id) == channel_id:
+            return
+        # Re-insert so dict order stays oldest-first for eviction
+        users.pop(user_id, None)
+        users[user_id] = channel_id
+        if len(users) > self.max_users_per_guild:
+            del users[next(iter(users))]
+
+    def can_post(self, channel, guild: discord.Guild) -> bool:
+        """True if the bot may send in the channel and it isn't forbidden."""
+        return (channel is not None and
+                hasattr(channel, "send") and
+                not self.is_forbidden(channel.id) and
+                channel.permissions_for(guild.me).send_messages)
+
+    def last_channel(self, guild: discord.Guild, member: discord.Member) -> Optional[discord.TextChannel]:
+        """The channel the member last spoke in, if the bot can still post there."""
+        channel_id = self._last_channel.get(guild.id, {}).get(member.id)
+        channel = guild.get_channel(channel_id) if channel_id is not None else None
+        if self.can_post(channel, guild):
+            self.stats["last_channel_hits"] += 1
+            return channel
+        self.stats["last_channel_misses"] += 1
+        return None
+
+    def eligible_channels(self, guild: discord.Guild) -> List[discord.TextChannel]:
+        """Text channels the bot may announce in, excluding rules and system channels."""
+        channels = self._eligible.get(guild.id)
+        if channels is None:
+            channels = [
+                channel for channel in guild.text_channels
+                if (channel != guild.rules_channel and
+                    channel != guild.system_channel and
+                    self.can_post(channel, guild))
+            ]
+            self._eligible[guild.id] = channels
+            self.stats["eligible_rebuilds"] += 1
+        return channels
+
+    def first_visible(self, guild: discord.Guild, member: discord.Member) -> Optional[discord.TextChannel]:
+        """First eligible channel the member can read, else the system or rules channel."""
+        for channel in self.eligible_channels(guild):
+            if channel.permissions_for(member).read_messages:
+                return channel
+        for channel in (guild.system_channel, guild.rules_channel):
+            if self.can_post(channel, guild):
+                return channel
+        return None
+
+    def resolve(self, guild: discord.Guild, member: discord.Member,
+                preferred_channel: Optional[discord.TextChannel] = None) -> Optional[discord.TextChannel]:
+        """Preferred channel, else where the member last spoke, else the first visible eligible one."""
+        if self.can_post(preferred_channel, guild):
+            return preferred_channel
+        return self.last_channel(guild, member) or self.first_visible(guild, member)
+
+    def invalidate(self, guild_id: Optional[int] = None) -> None:
+        """Drop cached eligible channels after channel or permission changes."""
+        if guild_id is None:
+            self._eligible.clear()
+        else:
+            self._eligible.pop(guild_id, None)
+        self.stats["invalidations"] += 1
+
+    def forget_user(self, guild_id: int, user_id: int) -> None:
+        """Drop a user's last channel (e.g. when they leave)."""
+        self._last_channel.get(guild_id, {}).pop(user_id, None)
+
+    def forget_guild(self, guild_id: int) -> None:
+        """Drop everything cached for a guild the bot left."""
+        self._last_channel.pop(guild_id, None)
+        self._eligible.pop(guild_id, None)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Return cache metrics for debug commands."""
+        status = dict(self.stats)
+        status["guilds"] = len(self._last_channel)
+        status["tracked_users"] = sum(len(users) for users in self._last_channel.values())
+        status["cached_eligible_lists"] = len(self._eligible)
+        return status
@@ -0,0 +1,209 @@
+"""
+StarChan Bot Chat Memory
+Bounded, persistent chatterbot memory: per-user caps on history, memories and
+favorite games, an LRU of resident users, compact JSON rows in SQLite and lazy
+per-user loading. Memory use depends on the configured caps, not on how many
+users ever talked to the bot.
+"""
+
+import datetime
+import json
+import logging
+from collections import OrderedDict, deque
+from typing import Dict, Any, Optional, Set
+
+from persistence import WriteBehindStore
+
+# Set up module logger
+logger = logging.getLogger('StarChan.ChatMemory')
+
+
+def _default_preferences() -> Dict[str, Any]:
+    """Preferences for a user the bot knows nothing about yet."""
+    return {
+        "favorite_games": [],
+        "interests": [],
+        "communication_style": "casual",
+        "emotional_tone": "neutral"
+    }
+
+
+class UserMemory:
+    """Everything the chatterbot remembers about one user."""
+
+    __slots__ = ("history", "preferences", "memories", "last_response_time", "max_favorite_games")
+
+    def __init__(self, max_history: int, max_memories: int, max_favorite_games: int):
+        self.history: deque = deque(maxlen=max_history)
+        self.preferences: Dict[str, Any] = _default_preferences()
+        self.memories: deque = deque(maxlen=max_memories)
+        self.last_response_time: Optional[datetime.datetime] = None  # Cooldown only, not persisted
+        self.max_favorite_games = max_favorite_games
+
+    def add_favorite_game(self, game: str) -> bool:
+        """Remember a game; the oldest one is forgotten past the cap. Returns False if already known."""
+        games = self.preferences["favorite_games"]
+        if game in games:
+            return False
+        games.append(game)
+        if len(games) > self.max_favorite_games:
+            del games[0]
+        return True
+
+    def serialize(self) -> str:
+        """Compact JSON for the chat_memory table."""
+        return json.dumps(
+            {"h": list(self.history), "p": self.preferences, "m": list(self.memories)},
+            separators=(',', ':'), ensure_ascii=False
+        )
+
+    @classmethod
+    def deserialize(cls, data: str, max_history: int, max_memories: int, max_favorite_games: int) -> "UserMemory":
+        """Rebuild a record, applying the current caps."""
+        record = cls(max_history, max_memories, max_favorite_games)
+        raw = json.loads(data)
+        record.history.extend(raw.get("h", []))
+        record.preferences.update(raw.get("p", {}))
+        record.preferences["favorite_games"] = record.preferences["favorite_games"][-max_favorite_games:]
+        record.memories.extend(raw.get("m", []))
+        return record
+
+
+class ChatMemoryBackend:
+    """Writes serialized user memories to the chat_memory table."""
+
+    incremental = True
+
+    def __init__(self, database):
+        self.database = database
+
+    def write(self, snapshot: Dict[str, str], removed: Set[str], full: bool = False) -> None:
+        """Upsert changed users. Runs in a worker thread."""
+        self.database.write_chat_memory(snapshot, removed)
+
+
+class ChatMemoryStore(WriteBehindStore):
+    """Write-behind LRU of UserMemory records.
+
+    Only max_users records stay resident. Evicting a dirty record serializes it into
+    a small pending map that the next flush writes, so nothing is lost and eviction
+    never touches the disk on the event loop.
+    """
+
+    def __init__(self, database, max_users: int = 200, max_history: int = 10,
+                 max_memories: int = 25, max_favorite_games: int = 10,
+                 flush_interval: float = 30.0, dirty_threshold: int = 50):
+        super().__init__("chat_memory", ChatMemoryBackend(database), OrderedDict(),
+                         flush_interval=flush_interval, dirty_threshold=dirty_threshold)
+        self.database = database
+        self.max_users = max_users
+        self.max_history = max_history
+        self.max_memories = max_memories
+        self.max_favorite_games = max_favorite_games
+        self._evicted: Dict[str, str] = {}  # Serialized dirty records waiting for the next flush
+        self._deleted: Set[str] = set()
+        self.stats.update({"loads": 0, "evictions": 0})
+
+    def get(self, user_id: str) -> UserMemory:
+        """Return a user's memory, loading it on first use and refreshing its LRU position."""
+        record = self.data.get(user_id)
+        if record is not None:
+            self.data.move_to_end(user_id)
+            return record
+
+        data = self._evicted.get(user_id)
+        if data is None and user_id not in self._deleted:
+            try:
+                data = self.database.load_chat_memory(user_id)
+            except Exception as e:
+                logger.error(f"Error loading chat memory for {user_id}: {e}")
+        if data is not None:
+            try:
+                record = UserMemory.deserialize(data, self.max_history, self.max_memories, self.max_favorite_games)
+                self.stats["loads"] += 1
+            except (ValueError, TypeError, AttributeError) as e:
+                logger.warning(f"Corrupted chat memory for {user_id}, starting fresh: {e}")
+        if record is None:
+            record = UserMemory(self.max_history, self.max_memories, self.max_favorite_games)
+
+        self.data[user_id] = record
+        self._evict_idle()
+        return record
+
+    def peek(self, user_id: str) -> Optional[UserMemory]:
+        """Return a resident record without loading or reordering."""
+        return self.data.get(user_id)
+
+    def _evict_idle(self) -> None:
+        """Drop least recently used users beyond max_users."""
+        while len(self.data) > self.max_users:
+            user_id, record = self.data.popitem(last=False)
+            if user_id in self._dirty:
+                self._dirty.discard(user_id)
+                self._evicted[user_id] = record.serialize()
+            self.stats["evictions"] += 1
+
+    def mark_dirty(self, key: str) -> None:
+        """Record that a user's memory changed."""
+        self._deleted.discard(key)
+        super().mark_dirty(key)
+
+    def delete(self, user_id: str) -> None:
+        """Forget a user entirely."""
+        self.data.pop(user_id, None)
+        self._evicted.pop(user_id, None)
+        self._dirty.discard(user_id)
+        self._deleted.add(user_id)
+
+    def clear_histories(self) -> int:
+        """Clear every user's conversation history, resident or on disk. Returns users touched."""
+        for user_id in list(self.data):
+            self.data[user_id].history.clear()
+            self.mark_dirty(user_id)
+        stored = self.database.load_all_chat_memory()
+        stored.update(self._evicted)
+        for user_id, data in stored.items():
+            if user_id in self.data or user_id in self._deleted:
+                continue
+            record = UserMemory.deserialize(data, self.max_history, self.max_memories, self.max_favorite_games)
+            record.history.clear()
+            self._evicted[user_id] = record.serialize()
+        if self._wake is not None:
+            self._wake.set()
+        return len(self.data) + len(self._evicted)
+
+    def _has_pending(self) -> bool:
+        """True when resident, evicted or deleted users wait to be written."""
+        return bool(self._dirty or self._evicted or self._deleted)
+
+    def _take_snapshot(self):
+        """Serialize dirty resident users plus evicted ones on the event loop."""
+        keys = self._dirty | set(self._evicted) | self._deleted
+        snapshot = {user_id: self.data[user_id].serialize() for user_id in self._dirty if user_id in self.data}
+        snapshot.update(self._evicted)
+        removed = set(self._deleted)
+        self._dirty = set()
+        self._evicted = {}
+        self._deleted = set()
+        return snapshot, removed, keys, False
+
+    def _restore(self, snapshot: Dict[str, str], removed: Set[str], keys: Set[str], full: bool) -> None:
+        """Requeue a failed write; users evicted meanwhile keep their serialized copy."""
+        for user_id, data in snapshot.items():
+            if user_id in self.data:
+                self._dirty.add(user_id)
+            else:
+                self._evicted.setdefault(user_id, data)
+        self._deleted |= removed
+
+    @property
+    def dirty_count(self) -> int:
+        """Number of users waiting to be written."""
+        return len(self._dirty) + len(self._evicted) + len(self._deleted)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Return store metrics for debug commands."""
+        status = super().get_status()
+        status["resident_users"] = len(self.data)
+        status["max_users"] = self.max_users
+        return status
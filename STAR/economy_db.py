@@ -0,0 +1,426 @@
+"""
+StarChan Bot Economy Database
+SQLite (WAL mode) storage for contributions, lifetime earnings, last active,
+weekly contributions, chatterbot memory and small pieces of bot state, plus the one-shot importer
+for the legacy JSON/.txt files.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, List, Tuple, Set, Iterable
+
+import json_codec
+
+# Set up module logger
+logger = logging.getLogger('StarChan.EconomyDB')
+
+DEFAULT_DB_FILE = "starchan_economy.db"
+
+# Per-user tables: table name -> value column
+USER_TABLES = {
+    "contributions": "points",
+    "lifetime_earnings": "points",
+    "last_active": "timestamp",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS contributions (
+    user_id TEXT PRIMARY KEY,
+    points INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_contributions_points ON contributions(points DESC);
+
+CREATE TABLE IF NOT EXISTS lifetime_earnings (
+    user_id TEXT PRIMARY KEY,
+    points INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_lifetime_earnings_points ON lifetime_earnings(points DESC);
+
+CREATE TABLE IF NOT EXISTS last_active (
+    user_id TEXT PRIMARY KEY,
+    timestamp REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_last_active_timestamp ON last_active(timestamp);
+
+CREATE TABLE IF NOT EXISTS weekly_contributions (
+    week_start INTEGER NOT NULL,
+    user_id TEXT NOT NULL,
+    points INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (week_start, user_id)
+);
+CREATE INDEX IF NOT EXISTS idx_weekly_rank ON weekly_contributions(week_start, points DESC);
+
+CREATE TABLE IF NOT EXISTS bot_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS chat_memory (
+    user_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class InsufficientFundsError(Exception):
+    """Raised when a debit or transfer would take a balance below zero."""
+
+
+class EconomyDatabase:
+    """Thread-safe wrapper around the StarChan SQLite database."""
+
+    def __init__(self, path: str = DEFAULT_DB_FILE):
+        self.path = path
+        self._lock = threading.RLock()
+        # Opened on first use, so importing this module (or bot_utils) creates no files
+        self._connection: Optional[sqlite3.Connection] = None
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """The SQLite connection, opened and given its schema on first use."""
+        if self._connection is None:
+            with self._lock:
+                if self._connection is None:
+                    # isolation_level=None: we issue BEGIN/COMMIT ourselves so batches are explicit transactions
+                    conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute("PRAGMA synchronous=NORMAL")
+                    conn.executescript(SCHEMA)
+                    self._connection = conn
+                    logger.info(f"Economy database ready at {self.path}")
+        return self._connection
+
+    @contextmanager
+    def transaction(self):
+        """Run a block inside BEGIN IMMEDIATE ... COMMIT, rolling back on error."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._conn.execute("COMMIT")
+
+    @staticmethod
+    def _column(table: str) -> str:
+        if table not in USER_TABLES:
+            raise ValueError(f"Unknown user table: {table}")
+        return USER_TABLES[table]
+
+    # === PER-USER TABLES ===
+
+    def load_table(self, table: str) -> Dict[str, Any]:
+        """Load a whole per-user table into a dict (startup / reload only)."""
+        column = self._column(table)
+        with self._lock:
+            rows = self._conn.execute(f"SELECT user_id, {column} FROM {table}").fetchall()
+        return {user_id: value for user_id, value in rows}
+
+    def get_value(self, table: str, user_id: str, default: Any = 0) -> Any:
+        """Get a single user's value."""
+        column = self._column(table)
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {column} FROM {table} WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return row[0] if row else default
+
+    def write_batch(self, table: str, changes: Dict[str, Any], removed: Iterable[str] = ()) -> None:
+        """Upsert changed users and delete removed ones in a single transaction."""
+        column = self._column(table)
+        with self.transaction() as conn:
+            if changes:
+                conn.executemany(
+                    f"INSERT INTO {table} (user_id, {column}) VALUES (?, ?) "
+                    f"ON CONFLICT(user_id) DO UPDATE SET {column} = excluded.{column}",
+                    list(changes.items())
+                )
+            removed = list(removed)
+            if removed:
+                conn.executemany(f"DELETE FROM {table} WHERE user_id = ?", [(key,) for key in removed])
+
+    def replace_table(self, table: str, data: Dict[str, Any]) -> None:
+        """Replace a whole per-user table with data in one transaction (legacy full saves)."""
+        column = self._column(table)
+        with self.transaction() as conn:
+            conn.execute(f"DELETE FROM {table}")
+            conn.executemany(f"INSERT INTO {table} (user_id, {column}) VALUES (?, ?)", list(data.items()))
+
+    def add_points(self, table: str, user_id: str, delta: int) -> int:
+        """Add points to one user with a single-row UPSERT and return the new value."""
+        column = self._column(table)
+        with self.transaction() as conn:
+            conn.execute(
+                f"INSERT INTO {table} (user_id, {column}) VALUES (?, ?) "
+                f"ON CONFLICT(user_id) DO UPDATE SET {column} = {column} + excluded.{column}",
+                (user_id, delta)
+            )
+            return conn.execute(f"SELECT {column} FROM {table} WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+    def transfer_points(self, from_user: str, to_user: str, amount: int,
+                        balances: Optional[Dict[str, int]] = None, table: str = "contributions") -> Tuple[int, int]:
+        """Move points between two users in one transaction. Returns both new balances.
+
+        balances, if given, are the users' current values from the write-behind store;
+        they are written first, in the same transaction, so the check sees unflushed points.
+        """
+        column = self._column(table)
+        if amount <= 0:
+            raise ValueError("Transfer amount must be positive")
+        with self.transaction() as conn:
+            if balances:
+                conn.executemany(
+                    f"INSERT INTO {table} (user_id, {column}) VALUES (?, ?) "
+                    f"ON CONFLICT(user_id) DO UPDATE SET {column} = excluded.{column}",
+                    list(balances.items())
+                )
+            row = conn.execute(f"SELECT {column} FROM {table} WHERE user_id = ?", (from_user,)).fetchone()
+            balance = row[0] if row else 0
+            if balance < amount:
+                raise InsufficientFundsError(f"User {from_user} has {balance} points, needs {amount}")
+            conn.execute(f"UPDATE {table} SET {column} = {column} - ? WHERE user_id = ?", (amount, from_user))
+            conn.execute(
+                f"INSERT INTO {table} (user_id, {column}) VALUES (?, ?) "
+                f"ON CONFLICT(user_id) DO UPDATE SET {column} = {column} + excluded.{column}",
+                (to_user, amount)
+            )
+            new_from = conn.execute(f"SELECT {column} FROM {table} WHERE user_id = ?", (from_user,)).fetchone()[0]
+            new_to = conn.execute(f"SELECT {column} FROM {table} WHERE user_id = ?", (to_user,)).fetchone()[0]
+        return new_from, new_to
+
+    def top(self, table: str, limit: int = 10) -> List[Tuple[str, Any]]:
+        """Highest values first, answered from the index."""
+        column = self._column(table)
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT user_id, {column} FROM {table} ORDER BY {column} DESC LIMIT ?", (limit,)
+            ).fetchall()
+
+    # === WEEKLY CONTRIBUTIONS ===
+
+    def add_weekly_points(self, week_start: int, user_id: str, points: int) -> None:
+        """Add points to a user's weekly total with a single-row UPSERT."""
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO weekly_contributions (week_start, user_id, points) VALUES (?, ?, ?) "
+                "ON CONFLICT(week_start, user_id) DO UPDATE SET points = points + excluded.points",
+                (week_start, user_id, points)
+            )
+
+    def write_weekly_batch(self, week_start: int, changes: Dict[str, int], removed: Iterable[str] = (),
+                           replace: bool = False) -> None:
+        """Write absolute weekly totals for one week in a single transaction."""
+        with self.transaction() as conn:
+            if replace:
+                conn.execute("DELETE FROM weekly_contributions WHERE week_start = ?", (week_start,))
+            if changes:
+                conn.executemany(
+                    "INSERT INTO weekly_contributions (week_start, user_id, points) VALUES (?, ?, ?) "
+                    "ON CONFLICT(week_start, user_id) DO UPDATE SET points = excluded.points",
+                    [(week_start, user_id, points) for user_id, points in changes.items()]
+                )
+            removed = list(removed)
+            if removed:
+                conn.executemany(
+                    "DELETE FROM weekly_contributions WHERE week_start = ? AND user_id = ?",
+                    [(week_start, key) for key in removed]
+                )
+
+    def get_weekly_contributions(self, week_start: int) -> Dict[str, int]:
+        """All weekly totals for one week."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT user_id, points FROM weekly_contributions WHERE week_start = ?", (week_start,)
+            ).fetchall()
+        return {user_id: points for user_id, points in rows}
+
+    def weekly_leaderboard(self, week_start: int, limit: int = 10) -> List[Tuple[str, int]]:
+        """Top weekly contributors, answered from the (week_start, points) index."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT user_id, points FROM weekly_contributions WHERE week_start = ? "
+                "ORDER BY points DESC LIMIT ?", (week_start, limit)
+            ).fetchall()
+
+    def weekly_user_count(self, week_start: int) -> int:
+        """Number of users with weekly points in a week."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM weekly_contributions WHERE week_start = ?", (week_start,)
+            ).fetchone()[0]
+
+    def delete_weeks_before(self, week_start: int) -> None:
+        """Drop weekly rows older than the given week."""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM weekly_contributions WHERE week_start < ?", (week_start,))
+
+    # === CHATTERBOT MEMORY ===
+
+    def load_chat_memory(self, user_id: str) -> Optional[str]:
+        """Get one user's serialized chatterbot memory, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM chat_memory WHERE user_id = ?", (user_id,)).fetchone()
+        return row[0] if row else None
+
+    def load_all_chat_memory(self) -> Dict[str, str]:
+        """Get every serialized chatterbot memory (admin maintenance only)."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT user_id, data FROM chat_memory").fetchall())
+
+    def write_chat_memory(self, changes: Dict[str, str], removed: Iterable[str] = ()) -> None:
+        """Upsert serialized memories and delete removed users in a single transaction."""
+        now = time.time()
+        with self.transaction() as conn:
+            if changes:
+                conn.executemany(
+                    "INSERT INTO chat_memory (user_id, data, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(user_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                    [(user_id, data, now) for user_id, data in changes.items()]
+                )
+            removed = list(removed)
+            if removed:
+                conn.executemany("DELETE FROM chat_memory WHERE user_id = ?", [(key,) for key in removed])
+
+    def chat_memory_stats(self) -> Tuple[int, int]:
+        """Return (stored users, total serialized bytes)."""
+        with self._lock:
+            count, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM chat_memory").fetchone()
+        return count, size
+
+    # === SMALL STATE (counting game, week start, migration flags) ===
+
+    def get_state(self, key: str, default: Any = None) -> Any:
+        """Get a JSON value from the state table."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM bot_state WHERE key = ?", (key,)).fetchone()
+        if not row:
+            return default
+        try:
+            return json_codec.loads(row[0])
+        except json_codec.JSONDecodeError:
+            logger.warning(f"Corrupted state value for {key}, using default")
+            return default
+
+    def set_state(self, key: str, value: Any) -> None:
+        """Store a JSON value in the state table (single-row UPSERT)."""
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO bot_state (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, json_codec.dumps(value))
+            )
+
+    # === LEGACY IMPORT ===
+
+    @staticmethod
+    def _read_legacy_mapping(filename: str) -> Optional[Dict[str, Any]]:
+        """Read a legacy user mapping file in JSON or `user_id:points` line format."""
+        if not os.path.exists(filename):
+            return None
+        with open(filename, "r", encoding="utf-8") as f:
+            content = f.read().strip()
+        if not content:
+            return {}
+        try:
+            data = json_codec.loads(content)
+            return data if isinstance(data, dict) else {}
+        except json_codec.JSONDecodeError:
+            data = {}
+            for line in content.split("\n"):
+                line = line.strip()
+                if ":" in line:
+                    user_id, points = line.split(":", 1)
+                    try:
+                        data[user_id.strip()] = int(points.strip())
+                    except ValueError:
+                        logger.warning(f"Invalid legacy entry in {filename}: {line}")
+            return data
+
+    def import_legacy_files(self, data_files: Dict[str, str]) -> Dict[str, int]:
+        """One-shot import of the old JSON/.txt files. Does nothing once it has run."""
+        if self.get_state("legacy_import_done", False):
+            return {}
+
+        imported = {}
+        try:
+            sources = {
+                "contributions": data_files.get("CONTRIBUTIONS", "contributions.txt"),
+                "lifetime_earnings": data_files.get("LIFETIME_EARNINGS", "lifetime_earnings.txt"),
+                "last_active": data_files.get("LAST_ACTIVE", "last_active.txt"),
+            }
+            for table, filename in sources.items():
+                data = self._read_legacy_mapping(filename)
+                if data is None and table == "last_active":
+                    data = self._read_legacy_mapping("last_active.json")
+                if data:
+                    self.write_batch(table, data)
+                    imported[table] = len(data)
+
+            weekly = self._read_legacy_mapping(data_files.get("WEEKLY_CONTRIBUTIONS", "weekly_contributions.txt"))
+            if weekly and isinstance(weekly.get("contributions"), dict):
+                try:
+                    week_start = int(float(weekly.get("week_start", 0)))
+                except (ValueError, TypeError):
+                    week_start = 0
+                with self.transaction() as conn:
+                    conn.executemany(
+                        "INSERT INTO weekly_contributions (week_start, user_id, points) VALUES (?, ?, ?) "
+                        "ON CONFLICT(week_start, user_id) DO UPDATE SET points = excluded.points",
+                        [(week_start, user_id, points) for user_id, points in weekly["contributions"].items()]
+                    )
+                self.set_state("weekly_week_start", week_start)
+                imported["weekly_contributions"] = len(weekly["contributions"])
+
+            counting = self._read_legacy_mapping(data_files.get("COUNTING_STATE", "counting_state.txt"))
+            if counting:
+                self.set_state("counting_state", counting)
+                imported["counting_state"] = 1
+
+            self.set_state("legacy_import_done", True)
+            if imported:
+                logger.info(f"Imported legacy data files into {self.path}: {imported} (original files left in place)")
+        except Exception as e:
+            logger.error(f"Legacy data import failed, will retry on next start: {e}")
+        return imported
+
+
+class WeeklyTableBackend:
+    """Write-behind backend for the current week's rows; week_start moves on rollover."""
+
+    incremental = True
+
+    def __init__(self, database: EconomyDatabase, week_start: int = 0):
+        self.database = database
+        self.week_start = week_start
+
+    def write(self, snapshot: Dict[str, Any], removed: Set[str], full: bool = False) -> None:
+        """Write changed weekly totals. Runs in a worker thread."""
+        self.database.write_weekly_batch(self.week_start, snapshot, removed, replace=full)
+
+
+class SqliteTableBackend:
+    """Write-behind backend that upserts only the dirty users of one table."""
+
+    incremental = True
+
+    def __init__(self, database: EconomyDatabase, table: str):
+        self.database = database
+        self.table = table
+
+    def write(self, snapshot: Dict[str, Any], removed: Set[str], full: bool = False) -> None:
+        """Write the dirty users in one transaction. Runs in a worker thread."""
+        if full:
+            self.database.replace_table(self.table, snapshot)
+        else:
+            self.database.write_batch(self.table, snapshot, removed)
+
+
+# Global economy database instance (the file is opened on first query)
+economy_db = EconomyDatabase()
@@ -0,0 +1,73 @@
+"""
+StarChan Bot JSON Codec
+One place for every JSON load and save: uses orjson when it is installed, then
+ujson, then the standard library. Machine files are written compact; pretty
+(indented) output is only for debug exports meant to be read by people.
+"""
+
+import json
+import logging
+from typing import Any, Union
+
+# Set up module logger
+logger = logging.getLogger('StarChan.JSONCodec')
+
+try:
+    import orjson
+    BACKEND = "orjson"
+    JSONDecodeError = orjson.JSONDecodeError
+except ImportError:
+    orjson = None
+    try:
+        import ujson
+        BACKEND = "ujson"
+        JSONDecodeError = getattr(ujson, "JSONDecodeError", ValueError)
+    except ImportError:
+        ujson = None
+        BACKEND = "json"
+        JSONDecodeError = json.JSONDecodeError
+
+
+def dumpb(data: Any, pretty: bool = False) -> bytes:
+    """Encode to UTF-8 JSON bytes (compact unless pretty)."""
+    if orjson is not None:
+        # Non-string keys are stringified like the stdlib does instead of raising
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, option=option)
+    return dumps(data, pretty).encode('utf-8')
+
+
+def dumps(data: Any, pretty: bool = False) -> str:
+    """Encode to a JSON string (compact unless pretty)."""
+    if orjson is not None:
+        return dumpb(data, pretty).decode('utf-8')
+    if ujson is not None:
+        return ujson.dumps(data, ensure_ascii=False, indent=2 if pretty else 0)
+    if pretty:
+        return json.dumps(data, indent=2, ensure_ascii=False)
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Decode a JSON string or bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    if ujson is not None:
+        return ujson.loads(data)
+    return json.loads(data)
+
+
+def load_file(filename: str) -> Any:
+    """Read and decode a whole JSON file."""
+    with open(filename, 'rb') as f:
+        return loads(f.read())
+
+
+def save_file(filename: str, data: Any, pretty: bool = False) -> int:
+    """Encode and write a JSON file (not atomic). Returns the number of bytes written."""
+    payload = dumpb(data, pretty)
+    with open(filename, 'wb') as f:
+        f.write(payload)
+    return len(payload)
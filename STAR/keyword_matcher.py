@@ -0,0 +1,137 @@
+"""
+StarChan Bot Keyword Matcher
+Aho–Corasick automaton over every chatterbot vocabulary (filtered topics, intents,
+emotions, games). One linear scan of a message returns every matching category,
+with word-boundary checks so short keywords like "hi" don't fire inside "this".
+"""
+
+import logging
+from typing import Dict, List, Tuple
+
+# Set up module logger
+logger = logging.getLogger('StarChan.KeywordMatcher')
+
+
+def _is_word_char(ch: str) -> bool:
+    """True for characters that continue a word."""
+    return ch.isalnum() or ch == '_'
+
+
+class KeywordMatcher:
+    """Multi-pattern matcher compiled into a DFA (goto + failure links folded together).
+
+    Keywords are matched against lowercased text. A keyword that starts with a word
+    character must start at a word boundary. With whole_word=True one that ends with a
+    word character must also end at a boundary; whole_word=False allows suffixes
+    ("game" matches "games" and "gaming" but still not "endgame").
+    """
+
+    def __init__(self):
+        # Entry: (length, category, value, check_start, check_end)
+        self._keywords: Dict[str, List[Tuple[int, str, str, bool, bool]]] = {}
+        self._delta: List[Dict[str, int]] = []
+        self._outputs: List[Tuple[Tuple[int, str, str, bool, bool], ...]] = []
+        self._compiled = False
+        self._last_text = None
+        self._last_matches: Dict[str, Tuple[str, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keywords)
+
+    def add(self, keyword: str, category: str, value: str = None, whole_word: bool = True) -> None:
+        """Add a keyword; value is what gets reported (defaults to the keyword)."""
+        keyword = keyword.lower()
+        if not keyword:
+            return
+        entry = (
+            len(keyword),
+            category,
+            value if value is not None else keyword,
+            _is_word_char(keyword[0]),
+            whole_word and _is_word_char(keyword[-1])
+        )
+        self._keywords.setdefault(keyword, []).append(entry)
+        self._compiled = False
+
+    def add_vocabulary(self, category: str, keywords, whole_word: bool = True) -> None:
+        """Add every keyword of a list under one category."""
+        for keyword in keywords:
+            self.add(keyword, category, keyword, whole_word)
+
+    def compile(self) -> "KeywordMatcher":
+        """Build the trie, failure links and the full transition table."""
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[list] = [[]]
+        for keyword, entries in self._keywords.items():
+            state = 0
+            for ch in keyword:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    outputs.append([])
+                state = nxt
+            outputs[state].extend(entries)
+
+        # Breadth-first: resolve failure links and fold them into a DFA where any
+        # missing transition leads back to the root
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(goto[0])]
+        delta.extend({} for _ in range(len(goto) - 1))
+        queue = list(goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            outputs[state].extend(outputs[fail[state]])
+            transitions = dict(delta[fail[state]])
+            for ch, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(ch, 0)
+                transitions[ch] = nxt
+                queue.append(nxt)
+            delta[state] = transitions
+
+        self._delta = delta
+        self._outputs = [tuple(entries) for entries in outputs]
+        self._compiled = True
+        self._last_text = None
+        logger.debug(f"Compiled keyword matcher: {len(self._keywords)} keywords, {len(delta)} states")
+        return self
+
+    def scan(self, text_lower: str) -> Dict[str, Tuple[str, ...]]:
+        """Return {category: matched values in order of first appearance} for lowercased text.
+
+        The last result is cached, so the filter, intent, emotion and learning steps of
+        one chatterbot reply share a single scan. Treat the result as read-only.
+        """
+        if text_lower == self._last_text:
+            return self._last_matches
+        if not self._compiled:
+            self.compile()
+
+        delta = self._delta
+        outputs = self._outputs
+        length = len(text_lower)
+        found: Dict[str, List[str]] = {}
+        state = 0
+        for index, ch in enumerate(text_lower):
+            state = delta[state].get(ch, 0)
+            if not state or not outputs[state]:
+                continue
+            for size, category, value, check_start, check_end in outputs[state]:
+                start = index - size + 1
+                if check_start and start > 0 and _is_word_char(text_lower[start - 1]):
+                    continue
+                if check_end and index + 1 < length and _is_word_char(text_lower[index + 1]):
+                    continue
+                values = found.get(category)
+                if values is None:
+                    found[category] = [value]
+                elif value not in values:
+                    values.append(value)
+
+        matches = {category: tuple(values) for category, values in found.items()}
+        self._last_text = text_lower
+        self._last_matches = matches
+        return matches
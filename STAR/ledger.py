@@ -0,0 +1,120 @@
+"""
+StarChan Bot Ledger
+Striped per-user asyncio locks and the balance operations built on them: debit,
+credit and transfer (one SQLite transaction). Users on different stripes never
+wait for each other, and a check-then-spend sequence can no longer interleave
+with another command touching the same balance.
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, Callable, List, Tuple
+
+from economy_db import InsufficientFundsError
+from persistence import io_service
+
+# Set up module logger
+logger = logging.getLogger('StarChan.Ledger')
+
+
+class StripedLockManager:
+    """A fixed pool of asyncio locks; each key maps to one stripe by hash."""
+
+    def __init__(self, stripes: int = 64):
+        self._locks: List[asyncio.Lock] = [asyncio.Lock() for _ in range(stripes)]
+        self.stats = {"acquisitions": 0, "contended": 0}
+
+    def _stripes_for(self, keys) -> List[int]:
+        """Distinct stripe indexes in ascending order, so multi-key holders never deadlock."""
+        return sorted({hash(str(key)) % len(self._locks) for key in keys})
+
+    def lock_for(self, key) -> asyncio.Lock:
+        """The lock guarding a key."""
+        return self._locks[self._stripes_for((key,))[0]]
+
+    @asynccontextmanager
+    async def hold(self, *keys):
+        """Hold the locks of every key (e.g. both users of a transfer)."""
+        acquired = []
+        try:
+            for index in self._stripes_for(keys):
+                lock = self._locks[index]
+                if lock.locked():
+                    self.stats["contended"] += 1
+                await lock.acquire()
+                acquired.append(lock)
+                self.stats["acquisitions"] += 1
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+    def get_status(self) -> Dict[str, Any]:
+        """Return lock metrics for debug commands."""
+        status = dict(self.stats)
+        status["stripes"] = len(self._locks)
+        status["held"] = sum(1 for lock in self._locks if lock.locked())
+        return status
+
+
+class Ledger:
+    """Atomic balance operations on the contributions store.
+
+    Balances are checked and changed with no await in between, under the user's
+    stripe lock, so they stay correct even next to the lock-free batch paths
+    (message and reaction points), which only ever add. `earn` credits points as
+    earnings (lifetime, weekly and level-ups) through the given callback, and
+    transfers are committed to `database` directly.
+    """
+
+    def __init__(self, store, locks: StripedLockManager,
+                 earn: Optional[Callable[..., Any]] = None, database=None):
+        self.store = store
+        self.locks = locks
+        self._earn = earn
+        self.database = database
+
+    def balance(self, user_id: str) -> int:
+        """Current spendable balance."""
+        return self.store.data.get(user_id, 0)
+
+    def _debit(self, user_id: str, amount: int) -> int:
+        if amount <= 0:
+            raise ValueError("Debit amount must be positive")
+        balance = self.store.data.get(user_id, 0)
+        if balance < amount:
+            raise InsufficientFundsError(f"User {user_id} has {balance} points, needs {amount}")
+        return self.store.increment(user_id, -amount)
+
+    async def debit(self, user_id: str, amount: int) -> int:
+        """Take points if the user has them. Returns the new balance or raises InsufficientFundsError."""
+        async with self.locks.hold(user_id):
+            return self._debit(user_id, amount)
+
+    async def credit(self, user_id: str, amount: int) -> int:
+        """Add points to the balance only (refunds, game winnings, role sales). Returns the new balance."""
+        if amount <= 0:
+            raise ValueError("Credit amount must be positive")
+        async with self.locks.hold(user_id):
+            return self.store.increment(user_id, amount)
+
+    async def earn(self, user_id: str, amount: int, *args) -> int:
+        """Credit earned points (balance, lifetime, weekly) under the user's lock. Returns the new balance."""
+        async with self.locks.hold(user_id):
+            self._earn(user_id, amount, *args)
+            return self.store.data.get(user_id, 0)
+
+    async def transfer(self, from_user: str, to_user: str, amount: int) -> Tuple[int, int]:
+        """Move points between two users in one SQLite transaction. Returns both new balances."""
+        if from_user == to_user:
+            raise ValueError("Cannot transfer points to yourself")
+        async with self.locks.hold(from_user, to_user):
+            balances = {from_user: self.balance(from_user), to_user: self.balance(to_user)}
+            new_from, new_to = await io_service.run(
+                self.database.transfer_points, from_user, to_user, amount, balances
+            )
+            # Marked dirty so a flush snapshotted before the transfer can't leave stale rows behind
+            self.store.set(from_user, new_from)
+            self.store.set(to_user, new_to)
+            return new_from, new_to
@@ -0,0 +1,166 @@
+"""
+StarChan Bot Level Engine
+Integer level math plus a per-user cache of the current level and the lifetime
+total that reaches the next one, so every point grant is checked for a level-up
+with one comparison. Level-ups become events that a background consumer
+announces, one per user even when a batch jumps several levels.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from typing import Dict, Any, Optional, Callable, Awaitable, List, Tuple
+
+# Set up module logger
+logger = logging.getLogger('StarChan.LevelEngine')
+
+
+def level_for_points(points: int) -> int:
+    """Level for a lifetime total: int(sqrt(points / 100)) + 1, in exact integer math."""
+    if points <= 0:
+        return 1
+    return math.isqrt(int(points) // 100) + 1
+
+
+def points_for_level(level: int) -> int:
+    """Lifetime total at which a level starts (inverse of level_for_points)."""
+    if level <= 1:
+        return 0
+    return (level - 1) ** 2 * 100
+
+
+class LevelUpEvent:
+    """One user's pending level-up; later grants in the same window extend it."""
+
+    __slots__ = ("user_id", "from_level", "to_level", "channel", "member", "created")
+
+    def __init__(self, user_id: str, from_level: int, to_level: int, channel, member):
+        self.user_id = user_id
+        self.from_level = from_level
+        self.to_level = to_level
+        self.channel = channel
+        self.member = member
+        self.created = time.time()
+
+    @property
+    def levels_gained(self) -> int:
+        """How many levels the user climbed since the event was opened."""
+        return self.to_level - self.from_level
+
+
+class LevelEngine:
+    """Cached levels and next-level thresholds with coalesced level-up events.
+
+    Each cached entry is (level, level_start, next_threshold). A lookup whose total
+    falls inside [level_start, next_threshold) is answered from the cache; anything
+    else (admin level changes, a cold cache) is recomputed, so a stale entry can
+    never return a wrong level.
+    """
+
+    def __init__(self, on_level_up: Optional[Callable[[LevelUpEvent], Awaitable[None]]] = None,
+                 coalesce_window: float = 2.0):
+        self.on_level_up = on_level_up
+        self.coalesce_window = coalesce_window
+        self._cache: Dict[str, Tuple[int, int, int]] = {}
+        self._pending: Dict[str, LevelUpEvent] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"cache_hits": 0, "cache_misses": 0, "level_ups": 0, "events_sent": 0,
+                      "events_coalesced": 0, "failures": 0}
+
+    def _prime(self, user_id: str, points: int) -> Tuple[int, int, int]:
+        """Compute and cache a user's level band."""
+        level = level_for_points(points)
+        entry = (level, points_for_level(level), points_for_level(level + 1))
+        self._cache[user_id] = entry
+        self.stats["cache_misses"] += 1
+        return entry
+
+    def get_level(self, user_id: str, points: int) -> int:
+        """Level for a user's lifetime total, served from the cache when it still applies."""
+        entry = self._cache.get(user_id)
+        if entry is not None and entry[1] <= points < entry[2]:
+            self.stats["cache_hits"] += 1
+            return entry[0]
+        return self._prime(user_id, points)[0]
+
+    def get_next_threshold(self, user_id: str, points: int) -> int:
+        """Lifetime total needed for the user's next level."""
+        self.get_level(user_id, points)
+        return self._cache[user_id][2]
+
+    def record_points(self, user_id: str, old_total: int, new_total: int,
+                      channel=None, member=None) -> Optional[int]:
+        """Check a grant for a level-up. Returns the new level if one was crossed."""
+        entry = self._cache.get(user_id)
+        if entry is None or not entry[1] <= old_total < entry[2]:
+            entry = self._prime(user_id, old_total)
+        if new_total < entry[2]:
+            return None
+
+        old_level = entry[0]
+        new_level = self._prime(user_id, new_total)[0]
+        self.stats["level_ups"] += 1
+        event = self._pending.get(user_id)
+        if event is None:
+            self._pending[user_id] = LevelUpEvent(user_id, old_level, new_level, channel, member)
+        else:
+            # Same user again before the consumer ran: announce the final level once
+            event.to_level = new_level
+            event.channel = channel or event.channel
+            event.member = member or event.member
+            self.stats["events_coalesced"] += 1
+        if self._wake is not None:
+            self._wake.set()
+        return new_level
+
+    def invalidate(self, user_id: Optional[str] = None) -> None:
+        """Forget cached levels (one user, or everyone) after a direct edit of lifetime earnings."""
+        if user_id is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(user_id, None)
+
+    def drain(self) -> List[LevelUpEvent]:
+        """Take every pending level-up event."""
+        events = list(self._pending.values())
+        self._pending = {}
+        return events
+
+    def start(self) -> None:
+        """Start the event consumer on the running loop. Safe to call more than once."""
+        if self._task is not None and not self._task.done():
+            return
+        self._wake = asyncio.Event()
+        if self._pending:
+            self._wake.set()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        logger.info("Level engine event consumer started")
+
+    async def _run(self):
+        """Background task: wait for level-ups, let the window fill, announce each user once."""
+        while True:
+            await self._wake.wait()
+            await asyncio.sleep(self.coalesce_window)
+            self._wake.clear()
+            for event in self.drain():
+                await self._dispatch(event)
+
+    async def _dispatch(self, event: LevelUpEvent) -> None:
+        """Hand one event to the consumer; a failed announcement never stops the loop."""
+        if self.on_level_up is None:
+            return
+        try:
+            await self.on_level_up(event)
+            self.stats["events_sent"] += 1
+        except Exception as e:
+            self.stats["failures"] += 1
+            logger.error(f"Error announcing level up for {event.user_id}: {e}")
+
+    def get_status(self) -> Dict[str, Any]:
+        """Return engine metrics for debug commands."""
+        status = dict(self.stats)
+        status["cached_users"] = len(self._cache)
+        status["pending_events"] = len(self._pending)
+        return status
@@ -0,0 +1,177 @@
+"""
+StarChan Bot Membership Pruning
+Departed members are tombstoned when they leave (on_member_remove) or when the
+periodic reconciliation finds stored data for someone no longer in the server.
+Their data is purged in batches once a grace period passes, and a member who
+rejoins before then keeps everything, so leaderboard reads never clean up.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Any, Optional, Callable, Iterable, List, Tuple
+
+from persistence import io_service
+
+# Set up module logger
+logger = logging.getLogger('StarChan.Membership')
+
+
+class MembershipPruner:
+    """Tombstones for departed users and batched purges across registered datasets.
+
+    Each dataset registers keys() (the user ids it holds, as strings) and
+    purge(user_ids) (removes those users, returns how many it held). Tombstones
+    survive restarts through `state_store` (any object with get_state/set_state).
+    """
+
+    STATE_KEY = "member_tombstones"
+
+    def __init__(self, state_store=None, grace_period: float = 7 * 24 * 3600, batch_size: int = 500):
+        self.state_store = state_store
+        self.grace_period = grace_period
+        self.batch_size = batch_size
+        self._tombstones: Dict[str, float] = {}  # user_id -> time they were found gone
+        self._sources: Dict[str, Tuple[Callable[[], Iterable[str]], Callable[[List[str]], int]]] = {}
+        self._loaded = False
+        self.stats = {"departures": 0, "returns": 0, "reconciliations": 0, "last_reconcile_tombstoned": 0,
+                      "purged_users": 0, "purged_entries": 0, "purge_batches": 0, "errors": 0}
+
+    def register(self, name: str, keys: Callable[[], Iterable[str]], purge: Callable[[List[str]], int]) -> None:
+        """Add a dataset that holds per-user data."""
+        self._sources[name] = (keys, purge)
+
+    def _load(self) -> None:
+        """Read persisted tombstones once."""
+        if self._loaded:
+            return
+        self._loaded = True
+        if self.state_store is None:
+            return
+        try:
+            stored = self.state_store.get_state(self.STATE_KEY, {}) or {}
+            # Tombstones set before the load (early events) are newer; keep them
+            self._tombstones = {**{str(uid): float(ts) for uid, ts in stored.items()}, **self._tombstones}
+            logger.info(f"Loaded {len(self._tombstones)} member tombstones")
+        except Exception as e:
+            logger.error(f"Error loading member tombstones: {e}")
+
+    def _save(self) -> None:
+        """Persist tombstones on the I/O thread."""
+        if self.state_store is not None:
+            io_service.submit("member_tombstones", self.state_store.set_state, self.STATE_KEY, dict(self._tombstones))
+
+    def mark_departed(self, user_id, when: Optional[float] = None) -> bool:
+        """Tombstone a user. Returns False if they already were."""
+        self._load()
+        key = str(user_id)
+        if key in self._tombstones:
+            return False
+        self._tombstones[key] = when if when is not None else time.time()
+        self.stats["departures"] += 1
+        self._save()
+        return True
+
+    def mark_returned(self, user_id) -> bool:
+        """Cancel a user's tombstone (they rejoined in time). Returns False if there was none."""
+        self._load()
+        if self._tombstones.pop(str(user_id), None) is None:
+            return False
+        self.stats["returns"] += 1
+        self._save()
+        return True
+
+    def is_departed(self, user_id) -> bool:
+        """True while a user is tombstoned."""
+        self._load()
+        return str(user_id) in self._tombstones
+
+    def known_users(self) -> set:
+        """Every user id held by any registered dataset."""
+        known = set()
+        for name, (keys, _) in self._sources.items():
+            try:
+                known.update(str(key) for key in keys())
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Error listing users of {name}: {e}")
+        return known
+
+    def reconcile(self, guild) -> Dict[str, int]:
+        """Tombstone stored users who aren't (human) members and clear tombstones of members."""
+        self._load()
+        now = time.time()
+        tombstoned = restored = kept = 0
+        for key in self.known_users() | set(self._tombstones):
+            try:
+                member = guild.get_member(int(key))
+            except ValueError:
+                member = None
+            if member is None or member.bot:
+                if key not in self._tombstones:
+                    self._tombstones[key] = now
+                    tombstoned += 1
+            else:
+                kept += 1
+                if self._tombstones.pop(key, None) is not None:
+                    restored += 1
+        self.stats["reconciliations"] += 1
+        self.stats["last_reconcile_tombstoned"] = tombstoned
+        if tombstoned or restored:
+            self._save()
+            logger.info(f"Membership reconcile: {tombstoned} tombstoned, {restored} restored, {kept} members kept")
+        return {"tombstoned": tombstoned, "restored": restored, "kept": kept}
+
+    def due(self, now: Optional[float] = None) -> List[str]:
+        """Tombstoned users whose grace period has passed."""
+        self._load()
+        deadline = (now if now is not None else time.time()) - self.grace_period
+        return [key for key, departed_at in self._tombstones.items() if departed_at <= deadline]
+
+    def purge_batch(self, user_ids: List[str]) -> int:
+        """Remove a batch of tombstoned users from every dataset. Returns the entries removed.
+
+        Users without a tombstone (e.g. they rejoined since the batch was picked) are skipped.
+        """
+        self._load()
+        user_ids = [key for key in user_ids if key in self._tombstones]
+        if not user_ids:
+            return 0
+        removed = 0
+        for name, (_, purge) in self._sources.items():
+            try:
+                removed += purge(user_ids)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Error purging {len(user_ids)} users from {name}: {e}")
+        for key in user_ids:
+            self._tombstones.pop(key, None)
+        self.stats["purge_batches"] += 1
+        self.stats["purged_users"] += len(user_ids)
+        self.stats["purged_entries"] += removed
+        return removed
+
+    async def purge_due(self, now: Optional[float] = None) -> int:
+        """Purge every user past the grace period, one batch per loop iteration. Returns users purged."""
+        due = self.due(now)
+        purged = 0
+        for start in range(0, len(due), self.batch_size):
+            # Re-checked per batch: anyone who rejoined while earlier batches ran keeps their data
+            batch = [key for key in due[start:start + self.batch_size] if key in self._tombstones]
+            if batch:
+                self.purge_batch(batch)
+                purged += len(batch)
+            # Let gateway events run between batches
+            await asyncio.sleep(0)
+        if purged:
+            self._save()
+            logger.info(f"Purged data of {purged} departed users")
+        return purged
+
+    def get_status(self) -> Dict[str, Any]:
+        """Return pruning metrics for debug commands."""
+        status = dict(self.stats)
+        status["tombstones"] = len(self._tombstones)
+        status["due"] = len(self.due())
+        status["datasets"] = list(self._sources)
+        return status
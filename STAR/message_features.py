@@ -0,0 +1,72 @@
+"""
+StarChan Bot Message Features
+Extracts everything the bot needs to know about a message's text in one pass, with
+precompiled patterns. The immutable result is shared by the achievement pipeline,
+the counting game and the chatterbot so no one scans the same text twice.
+"""
+
+import re
+from typing import NamedTuple, Optional
+
+# Keywords for the birthday_celebration achievement
+BIRTHDAY_KEYWORDS = ["happy birthday", "bday", "🎂", "🎉", "🥳", "🎈", "🎁"]
+
+# Custom Discord emoji or a unicode emoji from the common blocks
+EMOJI_PATTERN = r'<:\w+:\d+>|[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF]'
+LINK_PATTERN = r'https?://|www\.|\b\w+\.\w{2,}\b'
+
+EMOJI_REGEX = re.compile(EMOJI_PATTERN)
+LINK_REGEX = re.compile(LINK_PATTERN)
+
+SHORT_MESSAGE_LENGTH = 5
+LONG_MESSAGE_LENGTH = 500
+
+
+class MessageFeatures(NamedTuple):
+    """Immutable description of a message's text."""
+    content: str
+    lower: str
+    length: int
+    is_command: bool
+    number: Optional[int]  # Parsed value when the whole message is digits (counting game)
+    has_emoji: bool
+    has_exclamation: bool
+    has_question: bool
+    has_link: bool
+    has_birthday: bool
+    is_caps: bool
+    is_short: bool
+    is_long: bool
+
+    @property
+    def is_number(self) -> bool:
+        """True if the message is a plain number."""
+        return self.number is not None
+
+
+def extract_features(content: str) -> MessageFeatures:
+    """Analyze a message's text once."""
+    lower = content.lower()
+    length = len(content)
+
+    # Cheap prefilters: unicode emoji need non-ASCII text, custom emoji need "<:", links need a dot or "://"
+    is_ascii = content.isascii()
+    has_emoji = (not is_ascii or '<:' in content) and EMOJI_REGEX.search(content) is not None
+    has_link = ('.' in content or '://' in content) and LINK_REGEX.search(content) is not None
+    has_birthday = any(keyword in lower for keyword in BIRTHDAY_KEYWORDS)
+
+    return MessageFeatures(
+        content=content,
+        lower=lower,
+        length=length,
+        is_command=content.startswith('!'),
+        number=int(content) if content.isdecimal() else None,
+        has_emoji=has_emoji,
+        has_exclamation='!' in content,
+        has_question='?' in content,
+        has_link=has_link,
+        has_birthday=has_birthday,
+        is_caps=length > 1 and content.isupper(),
+        is_short=0 < length <= SHORT_MESSAGE_LENGTH,
+        is_long=length >= LONG_MESSAGE_LENGTH
+    )
@@ -0,0 +1,249 @@
+"""
+StarChan Bot Message Pipeline
+Staged on_message processing: a cheap synchronous pre-filter builds a MessageActivity,
+a bounded asyncio queue buffers it and a worker coalesces activity per user into
+micro-batches that are applied in bulk (contributions, last active, achievements).
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Any, Optional, Callable, Awaitable, List
+
+# Set up module logger
+logger = logging.getLogger('StarChan.Pipeline')
+
+
+class MessageActivity:
+    """Per-user message activity; one per message, merged per user inside a batch."""
+
+    __slots__ = (
+        "user_id", "member", "channel", "count", "first_seen", "last_seen",
+        "has_emoji", "has_exclamation", "has_question", "has_link", "has_attachment",
+        "mention_count", "caps_messages", "short_messages", "question_messages",
+        "birthday_messages", "long_message"
+    )
+
+    def __init__(self, user_id: int, member, channel, timestamp: float):
+        self.user_id = user_id
+        self.member = member
+        self.channel = channel
+        self.count = 1
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.has_emoji = False
+        self.has_exclamation = False
+        self.has_question = False
+        self.has_link = False
+        self.has_attachment = False
+        self.mention_count = 0
+        # Per-message counts for the special achievements
+        self.caps_messages = 0
+        self.short_messages = 0
+        self.question_messages = 0
+        self.birthday_messages = 0
+        self.long_message = False
+
+    def merge(self, other: "MessageActivity") -> None:
+        """Fold a later message from the same user into this one."""
+        self.count += other.count
+        self.member = other.member
+        self.channel = other.channel
+        self.first_seen = min(self.first_seen, other.first_seen)
+        self.last_seen = max(self.last_seen, other.last_seen)
+        self.has_emoji = self.has_emoji or other.has_emoji
+        self.has_exclamation = self.has_exclamation or other.has_exclamation
+        self.has_question = self.has_question or other.has_question
+        self.has_link = self.has_link or other.has_link
+        self.has_attachment = self.has_attachment or other.has_attachment
+        self.mention_count = max(self.mention_count, other.mention_count)
+        self.caps_messages += other.caps_messages
+        self.short_messages += other.short_messages
+        self.question_messages += other.question_messages
+        self.birthday_messages += other.birthday_messages
+        self.long_message = self.long_message or other.long_message
+
+
+class MessagePipeline:
+    """Bounded queue plus a worker that applies per-user micro-batches.
+
+    When the queue is full the overflow policy decides what happens:
+    "merge" folds the activity into a per-user overflow map that joins the next
+    batch (nothing is lost, memory is bounded by active users), "drop" discards it.
+    """
+
+    POLICIES = ("merge", "drop")
+
+    def __init__(self, process_batch: Callable[[List[MessageActivity]], Awaitable[None]],
+                 max_queue: int = 5000, batch_window: float = 0.25, max_batch: int = 1000,
+                 overflow_policy: str = "merge"):
+        if overflow_policy not in self.POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+        self.process_batch = process_batch
+        self.max_queue = max_queue
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.overflow_policy = overflow_policy
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._overflow: Dict[int, MessageActivity] = {}
+        self._collecting: Optional[Dict[int, MessageActivity]] = None  # Batch the worker is still filling
+        self._task: Optional[asyncio.Task] = None
+
+        self.stats = {
+            "enqueued": 0,
+            "processed": 0,
+            "merged_overflow": 0,
+            "dropped": 0,
+            "batches": 0,
+            "errors": 0,
+            "max_queue_depth": 0,
+            "last_batch_users": 0,
+            "last_batch_messages": 0,
+            "last_batch_duration": 0.0,
+            "last_batch_max_wait": 0.0
+        }
+
+    def start(self) -> None:
+        """Start the worker on the running loop. Safe to call more than once."""
+        if self._task is not None and not self._task.done():
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.get_running_loop().create_task(self._worker())
+        logger.info(f"Message pipeline started (window={self.batch_window}s, queue={self.max_queue}, policy={self.overflow_policy})")
+
+    def submit(self, activity: MessageActivity) -> bool:
+        """Enqueue without awaiting. Returns False if the activity was dropped."""
+        self.start()
+        try:
+            self._queue.put_nowait(activity)
+        except asyncio.QueueFull:
+            if self.overflow_policy == "drop":
+                self.stats["dropped"] += 1
+                return False
+            pending = self._overflow.get(activity.user_id)
+            if pending is None:
+                self._overflow[activity.user_id] = activity
+            else:
+                pending.merge(activity)
+            self.stats["merged_overflow"] += 1
+            return True
+
+        self.stats["enqueued"] += 1
+        depth = self._queue.qsize()
+        if depth > self.stats["max_queue_depth"]:
+            self.stats["max_queue_depth"] = depth
+        return True
+
+    async def _collect_batch(self) -> Dict[int, MessageActivity]:
+        """Wait for the first activity, then coalesce everything that arrives within the window."""
+        first = await self._queue.get()
+        batch: Dict[int, MessageActivity] = {first.user_id: first}
+        # Visible to drain() in case the loop stops while the window is open
+        self._collecting = batch
+        received = 1
+        deadline = time.monotonic() + self.batch_window
+
+        while received < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                activity = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            received += 1
+            pending = batch.get(activity.user_id)
+            if pending is None:
+                batch[activity.user_id] = activity
+            else:
+                pending.merge(activity)
+
+        # Fold in whatever overflowed while the queue was full
+        if self._overflow:
+            overflow, self._overflow = self._overflow, {}
+            for user_id, activity in overflow.items():
+                pending = batch.get(user_id)
+                if pending is None:
+                    batch[user_id] = activity
+                else:
+                    pending.merge(activity)
+        self._collecting = None
+        return batch
+
+    async def _worker(self):
+        """Background task: collect micro-batches and hand them to process_batch."""
+        while True:
+            batch = await self._collect_batch()
+            activities = list(batch.values())
+            messages = sum(activity.count for activity in activities)
+            oldest = min(activity.first_seen for activity in activities)
+
+            start = time.perf_counter()
+            try:
+                await self.process_batch(activities)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Error processing message batch of {len(activities)} users: {e}")
+
+            self.stats["batches"] += 1
+            self.stats["processed"] += messages
+            self.stats["last_batch_users"] = len(activities)
+            self.stats["last_batch_messages"] = messages
+            self.stats["last_batch_duration"] = time.perf_counter() - start
+            self.stats["last_batch_max_wait"] = time.time() - oldest
+
+    def drain(self) -> int:
+        """Apply everything still pending, synchronously, after the event loop has stopped.
+
+        Covers the batch the worker was collecting, the queue and the overflow map.
+        process_batch only touches memory, so its coroutine is stepped without a loop
+        (I/O jobs it submits then run inline). Returns the number of messages applied.
+        """
+        batch: Dict[int, MessageActivity] = self._collecting or {}
+        self._collecting = None
+        pending: List[MessageActivity] = []
+        if self._queue is not None:
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+        overflow, self._overflow = self._overflow, {}
+        pending.extend(overflow.values())
+        for activity in pending:
+            existing = batch.get(activity.user_id)
+            if existing is None:
+                batch[activity.user_id] = activity
+            else:
+                existing.merge(activity)
+        if not batch:
+            return 0
+
+        activities = list(batch.values())
+        messages = sum(activity.count for activity in activities)
+        coroutine = self.process_batch(activities)
+        try:
+            coroutine.send(None)
+        except StopIteration:
+            pass
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Error draining message batch of {len(activities)} users: {e}")
+        else:
+            coroutine.close()
+            self.stats["errors"] += 1
+            logger.error(f"Message batch of {len(activities)} users waited on I/O during the drain; not applied")
+            return 0
+        self.stats["batches"] += 1
+        self.stats["processed"] += messages
+        logger.info(f"Drained {messages} pending messages from {len(activities)} users")
+        return messages
+
+    def get_status(self) -> Dict[str, Any]:
+        """Return queue depth and backpressure metrics for debug commands."""
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "overflow_users": len(self._overflow),
+            "policy": self.overflow_policy,
+            **self.stats
+        }
@@ -0,0 +1,298 @@
+"""
+StarChan Bot Notifications
+Outbound achievement notification queue: handlers enqueue and return at once, a
+worker groups each user's unlocks into one embed, paces sends per Discord route
+with token buckets and retries transient failures with exponential backoff.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Dict, Any, Optional, Callable, List, Tuple
+
+import discord
+
+# Set up module logger
+logger = logging.getLogger('StarChan.Notifications')
+
+
+class TokenBucket:
+    """Allows `capacity` sends at once, refilled at `rate` sends per second."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    async def acquire(self) -> float:
+        """Wait for a token and take it. Returns the time spent waiting."""
+        waited = 0.0
+        delay = self.delay()
+        while delay > 0:
+            await asyncio.sleep(delay)
+            waited += delay
+            delay = self.delay()
+        self.tokens -= 1
+        return waited
+
+    def penalize(self, retry_after: float) -> None:
+        """Empty the bucket after a 429 so the next send waits at least retry_after."""
+        self._refill()
+        self.tokens = min(self.tokens, 1 - retry_after * self.rate)
+
+
+class PendingNotification:
+    """A user's unlocks waiting to be announced together."""
+
+    __slots__ = ("user", "achievements", "queued_at")
+
+    def __init__(self, user):
+        self.user = user
+        self.achievements: List[Any] = []
+        self.queued_at = time.time()
+
+
+def build_achievement_embed(user, achievements: List[Any], for_dm: bool = False) -> discord.Embed:
+    """One embed for one or several unlocks of the same user."""
+    total_reward = sum(achievement.reward_points for achievement in achievements) * 10
+    if len(achievements) == 1:
+        achievement = achievements[0]
+        embed = discord.Embed(
+            title=f"🏆 Achievement Unlocked! {achievement.emoji}",
+            description=f"**{achievement.name}**\n{achievement.description}",
+            color=discord.Color.gold()
+        )
+        embed.add_field(name="Category", value=achievement.category.title(), inline=True)
+        if achievement.reward_role:
+            embed.add_field(name="Role Reward", value=achievement.reward_role, inline=True)
+        footer = f"Achievement ID: {achievement.id}"
+    else:
+        embed = discord.Embed(
+            title=f"🏆 {len(achievements)} Achievements Unlocked!",
+            description="\n".join(
+                f"{achievement.emoji} **{achievement.name}** - {achievement.description}"
+                for achievement in achievements
+            ),
+            color=discord.Color.gold()
+        )
+        footer = "Achievement IDs: " + ", ".join(achievement.id for achievement in achievements)
+    if total_reward > 0:
+        embed.add_field(name="Reward", value=f"{total_reward:,} contribution points (10x bonus!)", inline=True)
+    if not for_dm:
+        avatar = getattr(user, "display_avatar", None)
+        embed.set_author(name=user.display_name, icon_url=avatar.url if avatar else None)
+        footer = f"User ID: {user.id} | {footer}"
+    embed.set_footer(text=footer[:2048])
+    return embed
+
+
+class AchievementNotifier:
+    """Queue plus worker for achievement announcements (channel post and DM).
+
+    Unlocks for the same user that arrive within `batch_window` seconds share one
+    embed (at most `max_per_embed` per embed). Each Discord route gets its own token
+    bucket, so a burst of unlocks is paced instead of tripping 429s; DMs are paced per
+    recipient and by one shared cap across all recipients. Failed sends are retried
+    with backoff and permanent errors (closed DMs, missing channel) are not.
+    """
+
+    # Discord allows about 5 messages per 5 seconds per channel; DMs open a channel each
+    CHANNEL_RATE = (1.0, 5)
+    DM_RATE = (1.0, 3)
+    DM_GLOBAL_RATE = (5.0, 10)
+
+    def __init__(self, channel_id: Callable[[], Optional[int]], batch_window: float = 1.5,
+                 max_per_embed: int = 10, max_retries: int = 4, backoff_base: float = 1.0,
+                 max_pending_users: int = 1000):
+        self.channel_id = channel_id
+        self.batch_window = batch_window
+        self.max_per_embed = max_per_embed
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_pending_users = max_pending_users
+        self.bot = None
+        self._pending: Dict[int, PendingNotification] = {}
+        self._in_flight: List[PendingNotification] = []  # Taken by the worker, not yet delivered
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._dm_bucket = TokenBucket(*self.DM_GLOBAL_RATE)
+        self._draining = False
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"queued": 0, "grouped": 0, "embeds_sent": 0, "dms_sent": 0, "retries": 0,
+                      "failures": 0, "dropped": 0, "rate_limit_wait": 0.0}
+
+    def enqueue(self, bot, user, achievement) -> None:
+        """Queue one unlock. Never blocks; the worker starts on first use."""
+        self.bot = bot
+        pending = self._pending.get(user.id)
+        if pending is None:
+            if len(self._pending) >= self.max_pending_users:
+                self.stats["dropped"] += 1
+                logger.warning(f"Notification queue full, dropping {achievement.id} for {user.id}")
+                return
+            pending = self._pending[user.id] = PendingNotification(user)
+        else:
+            self.stats["grouped"] += 1
+        if all(existing.id != achievement.id for existing in pending.achievements):
+            pending.achievements.append(achievement)
+        self.stats["queued"] += 1
+        self.start()
+        if self._wake is not None:
+            self._wake.set()
+
+    def start(self) -> None:
+        """Start the worker if a loop is running. Safe to call more than once."""
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._wake = asyncio.Event()
+        if self._pending:
+            self._wake.set()
+        self._task = loop.create_task(self._run())
+        logger.info("Achievement notification worker started")
+
+    def _take_pending(self) -> List[PendingNotification]:
+        """Take every pending notification, oldest first."""
+        pending = sorted(self._pending.values(), key=lambda item: item.queued_at)
+        self._pending = {}
+        return pending
+
+    def undelivered(self) -> int:
+        """Unlocks queued or being sent that haven't been delivered yet."""
+        return sum(len(item.achievements) for item in list(self._pending.values()) + self._in_flight)
+
+    async def drain(self, timeout: float = 10.0) -> int:
+        """Send everything still queued, for at most timeout seconds (shutdown). Returns the unlocks left over."""
+        self._draining = True
+        self.start()
+        if self._wake is not None:
+            self._wake.set()
+        deadline = time.monotonic() + timeout
+        while self.undelivered() and self._task is not None and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        left = self.undelivered()
+        if left:
+            logger.warning(f"Shutting down with {left} achievement notifications undelivered")
+        return left
+
+    async def _run(self):
+        """Background task: let a window of unlocks accumulate, then send them grouped."""
+        while True:
+            await self._wake.wait()
+            if not self._draining:
+                await asyncio.sleep(self.batch_window)
+            self._wake.clear()
+            self._in_flight = self._take_pending()
+            while self._in_flight:
+                pending = self._in_flight[0]
+                try:
+                    await self._deliver(pending)
+                except Exception as e:
+                    self.stats["failures"] += 1
+                    logger.error(f"Error delivering achievement notification for {pending.user.id}: {e}")
+                self._in_flight.pop(0)
+            self._prune_buckets()
+
+    def _bucket(self, route: str, rate: Tuple[float, int]) -> TokenBucket:
+        bucket = self._buckets.get(route)
+        if bucket is None:
+            bucket = self._buckets[route] = TokenBucket(*rate)
+        return bucket
+
+    def _prune_buckets(self) -> None:
+        """Forget per-recipient DM buckets that have refilled; a new one starts full anyway."""
+        idle = [route for route, bucket in self._buckets.items()
+                if route.startswith("dm:") and bucket.delay() == 0 and bucket.tokens >= bucket.capacity]
+        for route in idle:
+            del self._buckets[route]
+
+    async def _deliver(self, pending: PendingNotification) -> None:
+        """Post one user's unlocks to the achievement channel and their DMs."""
+        user = pending.user
+        channel_id = self.channel_id()
+        channel = self.bot.get_channel(channel_id) if channel_id else None
+        if channel is None and channel_id:
+            logger.warning(f"Achievement channel {channel_id} not found; only DMing {user.display_name}")
+
+        for start in range(0, len(pending.achievements), self.max_per_embed):
+            chunk = pending.achievements[start:start + self.max_per_embed]
+            names = ", ".join(achievement.name for achievement in chunk)
+            if channel is not None:
+                message = (f"🎉 {user.mention} unlocked an achievement!" if len(chunk) == 1
+                           else f"🎉 {user.mention} unlocked {len(chunk)} achievements!")
+                embed = build_achievement_embed(user, chunk)
+                if await self._send(f"channel:{channel.id}", self.CHANNEL_RATE,
+                                    lambda: channel.send(message, embed=embed)):
+                    self.stats["embeds_sent"] += 1
+                    logger.info(f"✅ Achievement notification sent to #{channel.name} for {user.display_name} - {names}")
+            dm_embed = build_achievement_embed(user, chunk, for_dm=True)
+            if await self._send(f"dm:{user.id}", self.DM_RATE, lambda: user.send(embed=dm_embed),
+                                shared=self._dm_bucket):
+                self.stats["dms_sent"] += 1
+
+    async def _send(self, route: str, rate: Tuple[float, int], send: Callable,
+                    shared: Optional[TokenBucket] = None) -> bool:
+        """Send through the route's bucket (and a shared cap, if given), retrying transient errors with backoff."""
+        bucket = self._bucket(route, rate)
+        for attempt in range(self.max_retries + 1):
+            self.stats["rate_limit_wait"] += await bucket.acquire()
+            if shared is not None:
+                self.stats["rate_limit_wait"] += await shared.acquire()
+            try:
+                await send()
+                return True
+            except (discord.Forbidden, discord.NotFound) as e:
+                # Closed DMs or a deleted channel: retrying can't help
+                logger.warning(f"⚠️ Notification on {route} not deliverable: {e}")
+                return False
+            except discord.RateLimited as e:
+                bucket.penalize(e.retry_after)
+                delay = e.retry_after
+            except discord.HTTPException as e:
+                if e.status == 429:
+                    bucket.penalize(self.backoff_base)
+                elif e.status < 500:
+                    logger.warning(f"⚠️ Notification on {route} rejected: {e}")
+                    return False
+                delay = self.backoff_base * 2 ** attempt
+            except (OSError, asyncio.TimeoutError) as e:
+                delay = self.backoff_base * 2 ** attempt
+                logger.debug(f"Notification on {route} failed ({e}), retrying")
+            if attempt < self.max_retries:
+                self.stats["retries"] += 1
+                await asyncio.sleep(delay + random.uniform(0, self.backoff_base))
+        self.stats["failures"] += 1
+        logger.error(f"❌ Giving up on notification for route {route} after {self.max_retries + 1} attempts")
+        return False
+
+    def get_status(self) -> Dict[str, Any]:
+        """Return queue metrics for debug commands."""
+        status = dict(self.stats)
+        status["pending_users"] = len(self._pending) + len(self._in_flight)
+        status["pending_achievements"] = self.undelivered()
+        status["routes"] = len(self._buckets)
+        return status
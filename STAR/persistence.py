@@ -0,0 +1,445 @@
+"""
+StarChan Bot Persistence Module
+Write-behind storage for the high-frequency user data (contributions, lifetime earnings, last active)
+and the I/O service that runs every blocking write on one dedicated thread.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Any, Optional, Set, List, Callable
+
+import json_codec
+
+# Set up module logger
+logger = logging.getLogger('StarChan.Persistence')
+
+
+def fsync_directory(path: str) -> None:
+    """Flush a directory entry (e.g. a rename) to disk. No-op where directories can't be opened (Windows)."""
+    if os.name == 'nt':
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write_json(filename: str, data: Any, pretty: bool = False) -> int:
+    """Write JSON to a temporary file and atomically rename it over the target (crash-safe).
+
+    The file and the rename are both fsynced before returning, so the new contents
+    are durable once this returns.
+    Machine files are written compact; pretty is for files meant to be read by people.
+    Returns the number of bytes written.
+    """
+    payload = json_codec.dumpb(data, pretty)
+    temp_file = f"{filename}.tmp"
+    with open(temp_file, 'wb') as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_file, filename)
+    fsync_directory(filename)
+    return len(payload)
+
+
+def snapshot_json(data: Any) -> Any:
+    """Copy the dicts and lists of a JSON-like value; leaves are immutable and shared.
+
+    Much cheaper than deepcopy, and enough to hand a point-in-time view to the I/O thread.
+    """
+    if isinstance(data, dict):
+        return {key: snapshot_json(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [snapshot_json(value) for value in data]
+    return data
+
+
+class IOService:
+    """Runs blocking persistence work on one dedicated thread, in submission order.
+
+    Callers snapshot their data on the event loop and submit the write; serialization,
+    file I/O and SQLite commits happen on the worker. A single thread keeps writes to
+    the same file or journal ordered. Without a running loop (startup, shutdown) work
+    runs inline. offloaded_seconds minus snapshot_seconds is the loop time saved.
+    """
+
+    def __init__(self, thread_name: str = "starchan-io"):
+        self.thread_name = thread_name
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._versions: Dict[str, int] = {}
+        self._pending_json: Dict[str, Any] = {}  # filename -> newest snapshot not written yet
+        self.stats = {
+            "jobs": 0,
+            "inline_jobs": 0,
+            "coalesced": 0,
+            "errors": 0,
+            "bytes_written": 0,
+            "offloaded_seconds": 0.0,
+            "snapshot_seconds": 0.0,
+            "max_job_seconds": 0.0
+        }
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """The single-thread executor (created on first use)."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=self.thread_name)
+        return self._executor
+
+    def _timed(self, func: Callable, *args) -> Any:
+        """Run a job on the worker and account for its duration."""
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            duration = time.perf_counter() - start
+            self.stats["jobs"] += 1
+            self.stats["offloaded_seconds"] += duration
+            self.stats["max_job_seconds"] = max(self.stats["max_job_seconds"], duration)
+
+    def note_snapshot(self, seconds: float) -> None:
+        """Record time spent on the loop preparing a snapshot for the worker."""
+        self.stats["snapshot_seconds"] += seconds
+
+    async def run(self, func: Callable, *args) -> Any:
+        """Run a job on the I/O thread and await its result (exceptions propagate)."""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, partial(self._timed, func, *args))
+
+    def submit(self, name: str, func: Callable, *args,
+               on_error: Optional[Callable[[Exception], None]] = None) -> None:
+        """Fire-and-forget a job. on_error runs on the loop (or inline) if the job fails."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is None:
+            self.stats["inline_jobs"] += 1
+            try:
+                func(*args)
+            except Exception as e:
+                self._failed(name, on_error, e)
+            return
+        future = loop.run_in_executor(self.executor, partial(self._timed, func, *args))
+        future.add_done_callback(partial(self._done, name, on_error))
+
+    def _done(self, name: str, on_error, future) -> None:
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            self._failed(name, on_error, error)
+
+    def _failed(self, name: str, on_error, error: Exception) -> None:
+        self.stats["errors"] += 1
+        logger.error(f"I/O job {name} failed: {error}")
+        if on_error is not None:
+            try:
+                on_error(error)
+            except Exception as e:
+                logger.error(f"Error handler for I/O job {name} failed: {e}")
+
+    def write_json(self, filename: str, data: Any, pretty: bool = False) -> None:
+        """Snapshot data now and write it on the I/O thread; only the newest version of a file is written."""
+        start = time.perf_counter()
+        snapshot = snapshot_json(data)
+        with self._lock:
+            version = self._versions.get(filename, 0) + 1
+            self._versions[filename] = version
+            self._pending_json[filename] = snapshot
+        self.note_snapshot(time.perf_counter() - start)
+        self.submit(f"json:{os.path.basename(filename)}", self._write_json_version, filename, version, snapshot, pretty)
+
+    def _write_json_version(self, filename: str, version: int, snapshot: Any, pretty: bool) -> None:
+        """Worker side of write_json: skip versions a newer submission superseded."""
+        with self._lock:
+            if self._versions.get(filename) != version:
+                self.stats["coalesced"] += 1
+                return
+        self.stats["bytes_written"] += atomic_write_json(filename, snapshot, pretty)
+        with self._lock:
+            if self._versions.get(filename) == version:
+                self._pending_json.pop(filename, None)
+
+    def pending_json(self, filename: str) -> Any:
+        """A copy of the newest unwritten snapshot of a file, or None (read-your-writes for loaders)."""
+        with self._lock:
+            snapshot = self._pending_json.get(filename)
+        return snapshot_json(snapshot) if snapshot is not None else None
+
+    def shutdown(self) -> None:
+        """Wait for every queued write and stop the worker thread."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def get_status(self) -> Dict[str, Any]:
+        """Return I/O metrics for debug commands."""
+        status = dict(self.stats)
+        status["loop_seconds_saved"] = max(0.0, status["offloaded_seconds"] - status["snapshot_seconds"])
+        with self._lock:
+            status["pending_files"] = len(self._pending_json)
+        status["json_backend"] = json_codec.BACKEND
+        return status
+
+
+# Global I/O service shared by the stores, DataManager and the achievement system
+io_service = IOService()
+
+
+class JsonFileBackend:
+    """Persists a full snapshot of a store to a single JSON file."""
+
+    incremental = False
+
+    def __init__(self, filename: str):
+        self.filename = filename
+
+    def write(self, snapshot: Dict[str, Any], removed: Set[str], full: bool = True) -> None:
+        """Write the full snapshot. Runs in a worker thread."""
+        atomic_write_json(self.filename, snapshot)
+
+
+class WriteBehindStore:
+    """Keeps a dict in memory, marks changed keys dirty and flushes them in batches.
+
+    A flush happens when the timer fires, when the dirty-count threshold is hit
+    and on shutdown. Serialization and disk I/O run on the I/O thread so the event
+    loop (and the gateway heartbeat) never waits on the disk.
+    """
+
+    def __init__(self, name: str, backend, data: Optional[Dict[str, Any]] = None,
+                 flush_interval: float = 10.0, dirty_threshold: int = 250):
+        self.name = name
+        self.backend = backend
+        self.data: Dict[str, Any] = data if data is not None else {}
+        self.flush_interval = flush_interval
+        self.dirty_threshold = dirty_threshold
+
+        self._dirty: Set[str] = set()
+        self._full_dirty = False  # Set when callers changed the dict without naming keys
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.stats = {
+            "flushes": 0,
+            "keys_flushed": 0,
+            "errors": 0,
+            "last_flush": 0.0,
+            "last_flush_duration": 0.0
+        }
+
+    @property
+    def dirty_count(self) -> int:
+        """Number of keys waiting to be written."""
+        return len(self.data) if self._full_dirty else len(self._dirty)
+
+    @property
+    def flushing(self) -> bool:
+        """True while an async flush is writing a snapshot."""
+        return self._flush_lock is not None and self._flush_lock.locked()
+
+    def mark_dirty(self, key: str) -> None:
+        """Record that a single key changed."""
+        self._dirty.add(key)
+        if self._wake is not None and len(self._dirty) >= self.dirty_threshold:
+            self._wake.set()
+
+    def mark_all_dirty(self) -> None:
+        """Record that the dict changed in ways we can't name (legacy save_* callers)."""
+        self._full_dirty = True
+        if self._wake is not None:
+            self._wake.set()
+
+    def set(self, key: str, value: Any) -> None:
+        """Set a value and mark it dirty."""
+        self.data[key] = value
+        self.mark_dirty(key)
+
+    def increment(self, key: str, amount: int) -> int:
+        """Increment a numeric value, mark it dirty and return the new value."""
+        new_value = self.data.get(key, 0) + amount
+        self.data[key] = new_value
+        self.mark_dirty(key)
+        return new_value
+
+    def discard(self, key: str) -> bool:
+        """Remove a key; the next flush deletes it from the backend. Returns False if it wasn't there."""
+        if key not in self.data:
+            return False
+        del self.data[key]
+        self.mark_dirty(key)
+        return True
+
+    def reset(self, data: Optional[Dict[str, Any]] = None) -> None:
+        """Replace the contents and drop pending changes (after they were flushed or archived)."""
+        self.data.clear()
+        if data:
+            self.data.update(data)
+        self._dirty = set()
+        self._full_dirty = False
+
+    def _has_pending(self) -> bool:
+        """True when a flush has something to write."""
+        return bool(self._dirty) or self._full_dirty
+
+    def _take_snapshot(self):
+        """Copy the pending changes on the event loop so the worker never sees a dict mid-mutation."""
+        full = not self.backend.incremental or self._full_dirty
+        if not full:
+            keys = self._dirty
+            snapshot = {key: self.data[key] for key in keys if key in self.data}
+            removed = {key for key in keys if key not in self.data}
+        else:
+            keys = set(self.data) | self._dirty
+            snapshot = dict(self.data)
+            removed = {key for key in self._dirty if key not in self.data}
+
+        self._dirty = set()
+        self._full_dirty = False
+        return snapshot, removed, keys, full
+
+    def _restore(self, snapshot: Dict[str, Any], removed: Set[str], keys: Set[str], full: bool) -> None:
+        """Mark a failed snapshot's keys dirty again so the next flush retries them."""
+        self._dirty |= keys
+        self._full_dirty = self._full_dirty or full
+
+    def _write(self, snapshot: Dict[str, Any], removed: Set[str], full: bool) -> float:
+        """Run the backend write and return how long it took."""
+        start = time.perf_counter()
+        self.backend.write(snapshot, removed, full)
+        return time.perf_counter() - start
+
+    async def flush(self) -> bool:
+        """Flush dirty keys in an executor. Returns True when nothing is left pending."""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+
+        async with self._flush_lock:
+            if not self._has_pending():
+                return True
+
+            start = time.perf_counter()
+            snapshot, removed, keys, full = self._take_snapshot()
+            io_service.note_snapshot(time.perf_counter() - start)
+            try:
+                duration = await io_service.run(self._write, snapshot, removed, full)
+            except Exception as e:
+                # Put the keys back so the next flush retries them
+                self._restore(snapshot, removed, keys, full)
+                self.stats["errors"] += 1
+                logger.error(f"Error flushing {self.name} store: {e}")
+                return False
+
+            self.stats["flushes"] += 1
+            self.stats["keys_flushed"] += len(keys)
+            self.stats["last_flush"] = time.time()
+            self.stats["last_flush_duration"] = duration
+            logger.debug(f"Flushed {len(keys)} keys from {self.name} store in {duration * 1000:.1f}ms")
+            return True
+
+    def flush_sync(self) -> bool:
+        """Flush on the calling thread. Used at shutdown once the event loop is gone."""
+        if not self._has_pending():
+            return True
+
+        snapshot, removed, keys, full = self._take_snapshot()
+        try:
+            self._write(snapshot, removed, full)
+            self.stats["flushes"] += 1
+            self.stats["keys_flushed"] += len(keys)
+            self.stats["last_flush"] = time.time()
+            return True
+        except Exception as e:
+            self._restore(snapshot, removed, keys, full)
+            self.stats["errors"] += 1
+            logger.error(f"Error flushing {self.name} store during shutdown: {e}")
+            return False
+
+    async def _flush_loop(self):
+        """Background task: flush on the timer or as soon as the threshold is hit."""
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        """Start the background flush task. Safe to call more than once (e.g. on reconnects)."""
+        if self._task is not None and not self._task.done():
+            return
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.get_running_loop().create_task(self._flush_loop())
+        logger.info(f"Write-behind store '{self.name}' started (interval={self.flush_interval}s, threshold={self.dirty_threshold})")
+
+    async def close(self) -> None:
+        """Stop the background task and write everything that is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def get_status(self) -> Dict[str, Any]:
+        """Return store metrics for debug commands."""
+        return {
+            "name": self.name,
+            "keys": len(self.data),
+            "dirty": self.dirty_count,
+            **self.stats
+        }
+
+
+class StoreManager:
+    """Groups the write-behind stores so they can be started, flushed and closed together."""
+
+    def __init__(self):
+        self.stores: List[WriteBehindStore] = []
+
+    def register(self, store: WriteBehindStore) -> WriteBehindStore:
+        """Register a store and return it."""
+        self.stores.append(store)
+        return store
+
+    def start_all(self) -> None:
+        """Start every store's flush task."""
+        for store in self.stores:
+            store.start()
+
+    async def flush_all(self) -> None:
+        """Flush every store now."""
+        for store in self.stores:
+            await store.flush()
+
+    async def close_all(self) -> None:
+        """Stop every store and write pending changes."""
+        for store in self.stores:
+            await store.close()
+
+    def flush_all_sync(self) -> None:
+        """Finish queued I/O, then flush every store on the calling thread (shutdown path)."""
+        io_service.shutdown()
+        for store in self.stores:
+            store.flush_sync()
+
+    def get_status(self) -> List[Dict[str, Any]]:
+        """Return metrics for every store."""
+        return [store.get_status() for store in self.stores]
+
+
+# Global store manager instance
+store_manager = StoreManager()
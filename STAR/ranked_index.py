@@ -0,0 +1,93 @@
+"""
+StarChan Bot Ranked Index
+Incrementally maintained leaderboard: a sorted list of (-score, key) plus a
+key -> score map. Updates and rank lookups are binary searches, top-K is a slice,
+so leaderboards never re-sort every user.
+"""
+
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple, Iterable
+
+
+class RankedIndex:
+    """Scores kept in descending order with O(log n) rank queries."""
+
+    def __init__(self, scores: Optional[Dict[str, int]] = None):
+        self._scores: Dict[str, int] = {}
+        self._order: List[Tuple[int, str]] = []
+        if scores:
+            self.load(scores.items())
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._scores
+
+    def load(self, items: Iterable[Tuple[str, int]]) -> None:
+        """Replace the contents with one sort (startup / rebuilds)."""
+        self._scores = {key: score for key, score in items}
+        self._order = sorted((-score, key) for key, score in self._scores.items())
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        self._scores.clear()
+        self._order.clear()
+
+    def score(self, key: str, default: int = 0) -> int:
+        """Current score of a key."""
+        return self._scores.get(key, default)
+
+    def set(self, key: str, score: int) -> None:
+        """Set a key's score, moving it to its new position."""
+        old = self._scores.get(key)
+        if old == score:
+            return
+        if old is not None:
+            del self._order[bisect_left(self._order, (-old, key))]
+        self._scores[key] = score
+        insort(self._order, (-score, key))
+
+    def increment(self, key: str, amount: int) -> int:
+        """Add to a key's score and return the new value."""
+        new_score = self._scores.get(key, 0) + amount
+        self.set(key, new_score)
+        return new_score
+
+    def remove(self, key: str) -> bool:
+        """Drop a key. Returns False if it wasn't ranked."""
+        old = self._scores.pop(key, None)
+        if old is None:
+            return False
+        del self._order[bisect_left(self._order, (-old, key))]
+        return True
+
+    def rank(self, key: str) -> Optional[int]:
+        """1-based competition rank (ties share a rank), or None if unranked."""
+        score = self._scores.get(key)
+        if score is None:
+            return None
+        # "" sorts before every key, so this counts strictly higher scores
+        return bisect_left(self._order, (-score, "")) + 1
+
+    def top(self, limit: int = 10) -> List[Tuple[str, int]]:
+        """Highest scores first as (key, score) pairs."""
+        return [(key, -negative) for negative, key in self._order[:limit]]
+
+    def page(self, start: int, count: int) -> List[Tuple[str, int]]:
+        """Entries at 0-based positions [start, start + count)."""
+        return [(key, -negative) for negative, key in self._order[start:start + count]]
+
+    def neighbors(self, key: str, radius: int = 2) -> List[Tuple[int, str, int]]:
+        """(position, key, score) entries around a key, positions 1-based."""
+        score = self._scores.get(key)
+        if score is None:
+            return []
+        position = bisect_left(self._order, (-score, key))
+        start = max(0, position - radius)
+        return [(start + offset + 1, entry_key, -negative)
+                for offset, (negative, entry_key) in enumerate(self._order[start:position + radius + 1])]
+
+    def items(self) -> Dict[str, int]:
+        """Copy of the key -> score map."""
+        return dict(self._scores)
@@ -0,0 +1,132 @@
+"""
+StarChan Bot Reaction Aggregator
+Fast path for on_reaction_add: reactions are counted per user in memory, points
+are credited in bulk every few seconds and achievement evaluation runs at most
+once per user per interval, so a reaction storm costs a dict update per event.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Any, Optional, Callable
+
+# Set up module logger
+logger = logging.getLogger('StarChan.Reactions')
+
+
+class ReactionActivity:
+    """A user's reactions not yet credited (points) or evaluated (achievements)."""
+
+    __slots__ = ("user_id", "user", "channel", "points", "reactions", "next_eval")
+
+    def __init__(self, user, channel):
+        self.user_id = user.id
+        self.user = user
+        self.channel = channel
+        self.points = 0
+        self.reactions = 0
+        self.next_eval = 0.0  # A user's first reaction is evaluated at the next flush
+
+
+class ReactionAggregator:
+    """Counts reactions per user and applies them in batches.
+
+    apply_points(user, count, channel) credits the points of every reaction since the
+    last flush; evaluate(user, count, channel) sees every reaction since the user's
+    last evaluation. Both are synchronous and run on the event loop.
+    """
+
+    def __init__(self, apply_points: Callable[[Any, int, Any], None],
+                 evaluate: Callable[[Any, int, Any], None],
+                 flush_interval: float = 2.0, eval_interval: float = 10.0):
+        self.apply_points = apply_points
+        self.evaluate = evaluate
+        self.flush_interval = flush_interval
+        self.eval_interval = eval_interval
+        self._users: Dict[int, ReactionActivity] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"reactions": 0, "flushes": 0, "points_applied": 0,
+                      "evaluations": 0, "errors": 0, "last_flush_users": 0}
+
+    def record(self, user, channel) -> None:
+        """Count one reaction. Never blocks; the worker starts on first use."""
+        activity = self._users.get(user.id)
+        if activity is None:
+            activity = self._users[user.id] = ReactionActivity(user, channel)
+        else:
+            activity.user = user
+            activity.channel = channel
+        activity.points += 1
+        activity.reactions += 1
+        self.stats["reactions"] += 1
+        self.start()
+        if self._wake is not None:
+            self._wake.set()
+
+    def start(self) -> None:
+        """Start the worker if a loop is running. Safe to call more than once."""
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._wake = asyncio.Event()
+        if self._users:
+            self._wake.set()
+        self._task = loop.create_task(self._run())
+        logger.info(f"Reaction aggregator started (flush={self.flush_interval}s, eval={self.eval_interval}s)")
+
+    async def _run(self):
+        """Background task: flush a window of reactions, then sleep until the next one or a due evaluation."""
+        while True:
+            timeout = self._next_due()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            await asyncio.sleep(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def _next_due(self) -> Optional[float]:
+        """Seconds until the earliest deferred evaluation, or None if there is none."""
+        due = [activity.next_eval for activity in self._users.values() if activity.reactions]
+        if not due:
+            return None
+        return max(0.0, min(due) - time.time())
+
+    def flush(self, force: bool = False) -> int:
+        """Credit pending points and run due evaluations (all of them if force). Returns users touched."""
+        now = time.time()
+        touched = 0
+        for user_id, activity in list(self._users.items()):
+            try:
+                if activity.points:
+                    points, activity.points = activity.points, 0
+                    self.apply_points(activity.user, points, activity.channel)
+                    self.stats["points_applied"] += points
+                    touched += 1
+                if activity.reactions and (force or now >= activity.next_eval):
+                    reactions, activity.reactions = activity.reactions, 0
+                    activity.next_eval = now + self.eval_interval
+                    self.evaluate(activity.user, reactions, activity.channel)
+                    self.stats["evaluations"] += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Error flushing reactions for {user_id}: {e}")
+            # Idle users are forgotten once their debounce window has passed
+            if not activity.points and not activity.reactions and now >= activity.next_eval:
+                del self._users[user_id]
+        self.stats["flushes"] += 1
+        self.stats["last_flush_users"] = touched
+        return touched
+
+    def get_status(self) -> Dict[str, Any]:
+        """Return aggregator metrics for debug commands."""
+        status = dict(self.stats)
+        status["tracked_users"] = len(self._users)
+        status["pending_points"] = sum(activity.points for activity in self._users.values())
+        status["pending_evaluations"] = sum(1 for activity in self._users.values() if activity.reactions)
+        return status
@@ -0,0 +1,242 @@
+"""
+StarChan Bot Scheduler
+One background task runs every registered job (rollovers, flushes, cleanup) at its
+interval or calendar boundary, with jitter, catch-up of runs missed while the bot
+was down or the loop was stalled, and per-job run-time metrics.
+"""
+
+import asyncio
+import datetime
+import inspect
+import logging
+import random
+import time
+from typing import Dict, Any, Optional, Callable, List, Set
+
+# Set up module logger
+logger = logging.getLogger('StarChan.Scheduler')
+
+
+def next_daily_boundary(now: float, hour: int = 0) -> float:
+    """Next hh:00 UTC strictly after now."""
+    current = datetime.datetime.fromtimestamp(now, datetime.timezone.utc)
+    boundary = current.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if boundary.timestamp() <= now:
+        boundary += datetime.timedelta(days=1)
+    return boundary.timestamp()
+
+
+def next_weekly_boundary(now: float, weekday: int = 0, hour: int = 0) -> float:
+    """Next weekday hh:00 UTC strictly after now (weekday 0 = Monday)."""
+    current = datetime.datetime.fromtimestamp(now, datetime.timezone.utc)
+    boundary = current.replace(hour=hour, minute=0, second=0, microsecond=0)
+    boundary += datetime.timedelta(days=(weekday - current.weekday()) % 7)
+    if boundary.timestamp() <= now:
+        boundary += datetime.timedelta(days=7)
+    return boundary.timestamp()
+
+
+class ScheduledJob:
+    """A registered job, its next run time and its metrics."""
+
+    __slots__ = (
+        "name", "func", "interval", "next_after", "jitter", "catch_up", "in_executor",
+        "next_run", "due", "running", "runs", "failures", "missed", "last_run",
+        "last_duration", "max_duration", "total_duration", "last_error"
+    )
+
+    def __init__(self, name: str, func: Callable, interval: Optional[float],
+                 next_after: Optional[Callable[[float], float]], jitter: float,
+                 catch_up: bool, in_executor: bool):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.next_after = next_after
+        self.jitter = jitter
+        self.catch_up = catch_up
+        self.in_executor = in_executor
+        self.next_run = 0.0  # When the job will actually run (due time plus jitter)
+        self.due = 0.0  # The nominal slot, used to count missed runs
+        self.running = False
+        self.runs = 0
+        self.failures = 0
+        self.missed = 0
+        self.last_run = 0.0
+        self.last_duration = 0.0
+        self.max_duration = 0.0
+        self.total_duration = 0.0
+        self.last_error: Optional[str] = None
+
+    def slot_after(self, moment: float) -> float:
+        """The first nominal slot strictly after moment."""
+        if self.next_after is not None:
+            return self.next_after(moment)
+        return moment + self.interval
+
+    def schedule(self, due: float) -> None:
+        """Set the next slot; jitter only ever delays, so boundary jobs never run early."""
+        self.due = due
+        self.next_run = due + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Return job metrics for debug commands."""
+        return {
+            "name": self.name,
+            "runs": self.runs,
+            "failures": self.failures,
+            "missed": self.missed,
+            "next_run_in": max(0.0, self.next_run - time.time()),
+            "last_duration": self.last_duration,
+            "max_duration": self.max_duration,
+            "avg_duration": self.total_duration / self.runs if self.runs else 0.0,
+            "last_error": self.last_error
+        }
+
+
+class Scheduler:
+    """Runs registered jobs from a single background task.
+
+    Interval jobs run every `interval` seconds; boundary jobs use `next_after(now)`
+    (e.g. next midnight UTC). Last-run times are kept in `state_store` (any object
+    with get_state/set_state), so a boundary crossed while the bot was offline is
+    caught up once at startup instead of by the first user command.
+    """
+
+    STATE_KEY = "scheduler_last_runs"
+
+    def __init__(self, state_store=None):
+        self.state_store = state_store
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self._last_runs: Dict[str, float] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._runs: Set[asyncio.Task] = set()
+
+    def register(self, name: str, func: Callable, interval: Optional[float] = None,
+                 next_after: Optional[Callable[[float], float]] = None, jitter: float = 0.0,
+                 catch_up: bool = True, in_executor: bool = False) -> ScheduledJob:
+        """Register a sync or async job. Give either an interval or a next_after function."""
+        if (interval is None) == (next_after is None):
+            raise ValueError(f"Job {name} needs exactly one of interval or next_after")
+        job = ScheduledJob(name, func, interval, next_after, jitter, catch_up, in_executor)
+        self.jobs[name] = job
+        if self._task is not None:
+            self._schedule_initial(job, time.time())
+            self._wake.set()
+        return job
+
+    def _schedule_initial(self, job: ScheduledJob, now: float) -> None:
+        """First run: catch up a slot missed since the last recorded run, else wait for the next one."""
+        last_run = self._last_runs.get(job.name)
+        if job.catch_up and last_run is not None:
+            due = job.slot_after(last_run)
+            if due <= now:
+                # Count every slot skipped while offline, run once
+                while due <= now:
+                    job.missed += 1
+                    due = job.slot_after(due)
+                logger.info(f"Scheduler: catching up {job.name} ({job.missed} missed runs)")
+                job.schedule(now)
+                return
+        job.schedule(job.slot_after(now))
+
+    def start(self) -> None:
+        """Start the scheduler task on the running loop. Safe to call more than once."""
+        if self._task is not None and not self._task.done():
+            return
+        if self.state_store is not None:
+            try:
+                self._last_runs = self.state_store.get_state(self.STATE_KEY, {}) or {}
+            except Exception as e:
+                logger.error(f"Error loading scheduler state: {e}")
+        now = time.time()
+        for job in self.jobs.values():
+            self._schedule_initial(job, now)
+        self._wake = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        logger.info(f"Scheduler started with {len(self.jobs)} jobs: {', '.join(self.jobs)}")
+
+    async def _run(self):
+        """Background task: sleep until the earliest job is due, run it, repeat."""
+        while True:
+            now = time.time()
+            pending = [job for job in self.jobs.values() if not job.running]
+            if not pending:
+                await self._wait(None)
+                continue
+            job = min(pending, key=lambda j: j.next_run)
+            if job.next_run > now:
+                await self._wait(job.next_run - now)
+                continue
+
+            # A stalled loop or suspended host can sleep through several slots: run once, count the rest
+            due = job.slot_after(job.due)
+            while due <= now:
+                job.missed += 1
+                due = job.slot_after(due)
+            job.schedule(due)
+            job.running = True
+            # Keep a reference so the run isn't garbage collected mid-flight
+            task = asyncio.get_running_loop().create_task(self._execute(job))
+            self._runs.add(task)
+            task.add_done_callback(self._runs.discard)
+
+    async def _wait(self, timeout: Optional[float]) -> None:
+        """Sleep until the timeout or until a job is registered or finishes."""
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wake.clear()
+
+    async def _execute(self, job: ScheduledJob) -> None:
+        """Run one job and record its metrics; a failing job never stops the scheduler."""
+        start = time.perf_counter()
+        try:
+            if job.in_executor:
+                result = await asyncio.get_running_loop().run_in_executor(None, job.func)
+            else:
+                result = job.func()
+            if inspect.isawaitable(result):
+                await result
+            job.last_error = None
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e)
+            logger.error(f"Scheduled job {job.name} failed: {e}")
+        finally:
+            duration = time.perf_counter() - start
+            job.running = False
+            job.runs += 1
+            job.last_run = time.time()
+            job.last_duration = duration
+            job.total_duration += duration
+            job.max_duration = max(job.max_duration, duration)
+            self._record_run(job)
+            if self._wake is not None:
+                self._wake.set()
+
+    def _record_run(self, job: ScheduledJob) -> None:
+        """Persist the last run time so restarts can catch up missed slots."""
+        if not job.catch_up:
+            return
+        self._last_runs[job.name] = job.last_run
+        if self.state_store is None:
+            return
+        try:
+            self.state_store.set_state(self.STATE_KEY, self._last_runs)
+        except Exception as e:
+            logger.error(f"Error saving scheduler state: {e}")
+
+    async def run_now(self, name: str) -> bool:
+        """Run a job immediately (debug/admin). Returns False for unknown or busy jobs."""
+        job = self.jobs.get(name)
+        if job is None or job.running:
+            return False
+        job.running = True
+        await self._execute(job)
+        return True
+
+    def get_status(self) -> List[Dict[str, Any]]:
+        """Return metrics for every job."""
+        return [job.get_status() for job in self.jobs.values()]
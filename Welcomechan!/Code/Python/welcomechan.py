@@ -10,6 +10,42 @@ import json
 import os
 import time
 import collections
+import csv
+import io
+from bisect import bisect_left
+
+# Fast JSON when available: orjson, then ujson, then the standard library
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    try:
+        import ujson
+    except ImportError:
+        ujson = None
+
+def json_loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    if ujson is not None:
+        return ujson.loads(data)
+    return json.loads(data)
+
+def json_dumpb(data):
+    # Compact output: these files are only read by the bot
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    if ujson is not None:
+        return ujson.dumps(data, ensure_ascii=False).encode("utf-8")
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def load_json_file(filename):
+    with open(filename, "rb") as f:
+        return json_loads(f.read())
+
+def save_json_file(filename, data):
+    with open(filename, "wb") as f:
+        f.write(json_dumpb(data))
 
 intents = discord.Intents.default()
 intents.message_content = True
@@ -40,13 +76,11 @@ COUNTING_FILE = "counting_state.json"
 
 def load_counting_state():
     if os.path.exists(COUNTING_FILE):
-        with open(COUNTING_FILE, "r") as f:
-            return json.load(f)
+        return load_json_file(COUNTING_FILE)
     return {"channel_id": None, "current": 0, "last_user": None}
 
 def save_counting_state(state):
-    with open(COUNTING_FILE, "w") as f:
-        json.dump(state, f)
+    save_json_file(COUNTING_FILE, state)
 
 counting_state = load_counting_state()
 
@@ -55,26 +89,22 @@ CONTRIB_FILE = "contributions.json"
 
 def load_contributions():
     if os.path.exists(CONTRIB_FILE):
-        with open(CONTRIB_FILE, "r") as f:
-            return json.load(f)
+        return load_json_file(CONTRIB_FILE)
     return {}
 
 def save_contributions(data):
-    with open(CONTRIB_FILE, "w") as f:
-        json.dump(data, f)
+    save_json_file(CONTRIB_FILE, data)
 
 # Add at the top, after your other file constants:
 LAST_ACTIVE_FILE = "last_active.json"
 
 def load_last_active():
     if os.path.exists(LAST_ACTIVE_FILE):
-        with open(LAST_ACTIVE_FILE, "r") as f:
-            return json.load(f)
+        return load_json_file(LAST_ACTIVE_FILE)
     return {}
 
 def save_last_active(data):
-    with open(LAST_ACTIVE_FILE, "w") as f:
-        json.dump(data, f)
+    save_json_file(LAST_ACTIVE_FILE, data)
 
 @bot.command(name="devsetlevel")
 async def devsetlevel(ctx, member: discord.Member = None, level: int = 1):
@@ -130,6 +160,47 @@ async def devlevelup(ctx, member: discord.Member = None, levels: int = 1):
 # Initialize last_active from file
 last_active = load_last_active()
 
+# Activity index for !showlurkers: users bucketed by the UTC day they were last active
+DAY_SECONDS = 24 * 3600
+activity_days = {}  # user_id -> day number
+activity_buckets = {}  # day number -> set of user_ids
+
+def index_activity(user_id, timestamp):
+    day = int(timestamp // DAY_SECONDS)
+    old = activity_days.get(user_id)
+    if old is not None and old >= day:
+        return
+    if old is not None:
+        activity_buckets[old].discard(user_id)
+        if not activity_buckets[old]:
+            del activity_buckets[old]
+    activity_days[user_id] = day
+    activity_buckets.setdefault(day, set()).add(user_id)
+
+for _user_id, _timestamp in last_active.items():
+    index_activity(_user_id, _timestamp)
+
+def active_since(timestamp):
+    cutoff_day = int(timestamp // DAY_SECONDS)
+    active = set()
+    for day, users in activity_buckets.items():
+        if day >= cutoff_day:
+            active |= users
+    return active
+
+# Human members sorted by join time per guild; dropped by on_member_join/on_member_remove
+join_index = {}  # guild_id -> [(joined_at, member_id), ...]
+
+def joined_before(guild, timestamp):
+    order = join_index.get(guild.id)
+    if order is None:
+        order = join_index[guild.id] = sorted(
+            (member.joined_at.timestamp(), member.id)
+            for member in guild.members
+            if not member.bot and member.joined_at
+        )
+    return order[:bisect_left(order, (timestamp, -1))]
+
 contributions = load_contributions()
 
 MAIN_SERVER_ID = 1351673459545079949  # Replace with your actual server ID
@@ -230,13 +301,11 @@ RETROGAME_SCORE_FILE = "retrogame_scores.json"
 
 def load_retrogame_scores():
     if os.path.exists(RETROGAME_SCORE_FILE):
-        with open(RETROGAME_SCORE_FILE, "r") as f:
-            return json.load(f)
+        return load_json_file(RETROGAME_SCORE_FILE)
     return {}
 
 def save_retrogame_scores(scores):
-    with open(RETROGAME_SCORE_FILE, "w") as f:
-        json.dump(scores, f)
+    save_json_file(RETROGAME_SCORE_FILE, scores)
 
 retrogame_scores = load_retrogame_scores()
 
@@ -525,6 +594,17 @@ async def checkmylevel(ctx):
     await ctx.send(f"{ctx.author.mention}, you have {points} contribution points (Level {level})!")
 
 
+@bot.event
+async def on_member_join(member):
+    # The member list changed: rebuild the join order on the next !showlurkers
+    join_index.pop(member.guild.id, None)
+
+
+@bot.event
+async def on_member_remove(member):
+    join_index.pop(member.guild.id, None)
+
+
 @bot.event
 async def on_reaction_add(reaction, user):
     if not user.bot:
@@ -927,6 +1007,7 @@ async def on_message(message):
     if message.author.bot:
         return
     last_active[str(message.author.id)] = time.time()
+    index_activity(str(message.author.id), last_active[str(message.author.id)])
     save_last_active(last_active)
     is_command = message.content.startswith("!")
     is_counting = (
@@ -957,29 +1038,69 @@ async def on_message(message):
     await bot.process_commands(message)
 
 # LURKERS COMMAND -----------------------------------------------------------------------------------------------------------------------------------
+LURKERS_PER_PAGE = 25
+
+def format_day(timestamp):
+    return time.strftime('%Y-%m-%d', time.gmtime(timestamp))
+
 @bot.command()
 @commands.has_permissions(administrator=True)
-async def showlurkers(ctx):
+async def showlurkers(ctx, days: int = 16, page: str = "1"):
     """
-    Show members who joined more than 16 days ago and have not sent a message in the last 16 days.
-    Usage: !showlurkers
+    Show members who joined more than N days ago (default 16) and have not sent a message since.
+    Usage: !showlurkers [days] [page|csv]
     """
-    from datetime import datetime, timedelta, timezone
-    now = datetime.now(timezone.utc)
-    threshold = now - timedelta(days=16)
-    lurkers = []
-    for member in ctx.guild.members:
-        if member.bot:
-            continue
-        if member.joined_at and member.joined_at < threshold:
-            last = last_active.get(str(member.id), 0)
-            # If never active or last active >16 days ago
-            if last == 0 or (time.time() - last) > 16 * 24 * 3600:
-                lurkers.append(f"{member.mention} (joined {member.joined_at.strftime('%Y-%m-%d')})")
-    if lurkers:
-        await ctx.send("👀 **Inactive members (joined >16 days ago, no recent messages):**\n" + "\n".join(lurkers))
-    else:
+    if days < 1:
+        await ctx.send("Days must be at least 1!")
+        return
+    cutoff = time.time() - days * DAY_SECONDS
+    active = active_since(cutoff)
+    # Never-active members first, then the longest inactive
+    lurkers = [
+        (member_id, joined, activity_days.get(str(member_id)))
+        for joined, member_id in joined_before(ctx.guild, cutoff)
+        if str(member_id) not in active
+    ]
+    lurkers.sort(key=lambda row: -1 if row[2] is None else row[2])
+    if not lurkers:
         await ctx.send("No inactive members found!")
+        return
+
+    if page.lower() == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["user_id", "name", "joined_at", "last_active"])
+        for member_id, joined, last_day in lurkers:
+            member = ctx.guild.get_member(member_id)
+            writer.writerow([member_id, member.display_name if member else "", format_day(joined),
+                             format_day(last_day * DAY_SECONDS) if last_day is not None else "never"])
+        report = discord.File(io.BytesIO(buffer.getvalue().encode("utf-8")), filename=f"lurkers_{days}d.csv")
+        await ctx.send(f"👀 **{len(lurkers)} inactive members** (joined >{days} days ago, no messages since)", file=report)
+        return
+
+    try:
+        page_number = int(page)
+    except ValueError:
+        await ctx.send("Page must be a number or `csv`!")
+        return
+    total_pages = (len(lurkers) + LURKERS_PER_PAGE - 1) // LURKERS_PER_PAGE
+    page_number = min(max(page_number, 1), total_pages)
+    start = (page_number - 1) * LURKERS_PER_PAGE
+    lines = [
+        f"<@{member_id}> (joined {format_day(joined)}, last active "
+        f"{format_day(last_day * DAY_SECONDS) if last_day is not None else 'never'})"
+        for member_id, joined, last_day in lurkers[start:start + LURKERS_PER_PAGE]
+    ]
+    embed = discord.Embed(
+        title="👀 Inactive Members",
+        description=f"Joined more than {days} days ago, no messages since.\n\n" + "\n".join(lines),
+        color=discord.Color.orange()
+    )
+    footer = f"Page {page_number}/{total_pages} • {len(lurkers)} members"
+    if page_number < total_pages:
+        footer += f" • !showlurkers {days} {page_number + 1} for more"
+    embed.set_footer(text=footer + f" • !showlurkers {days} csv for the full list")
+    await ctx.send(embed=embed)
 
 @bot.command(name="retrogameleaderboard")
 async def retrogameleaderboard(ctx):
@@ -1037,7 +1158,7 @@ async def helpwc(ctx):
         "📝 `!modpost <id> <msg>` — Post a message as the bot in any channel by ID\n"
         "👢 `!kick @user [reason]` — Kick a user from the server\n"
         "🔨 `!ban @user [reason]` — Ban a user from the server\n"
-        "👀 `!showlurkers` — Show users inactive for >16 days\n"
+        "👀 `!showlurkers [days] [page|csv]` — Show users inactive for >16 days\n"
         "🛠️ `!devsetlevel [@user] [level]` — Test the level up embed (owner only)\n"
         "🛠️ `!devlevelup [@user] [levels]` — Instantly level up any user (owner only)\n"
         "\n"